@@ -1,12 +1,20 @@
 import streamlit as st
-import base64
 import os
-import tempfile
 import time
 from PIL import Image
-import subprocess
 import sys
 
+# Конвертери знаходяться у scorm_converter/ і імпортують один одного напряму
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scorm_converter'))
+
+from ingest import IngestionError, ingest_upload
+from cache import ResultCache
+from jobs import ConversionJobs, JobQueueFull
+from minify import DEFAULT_MINIFY_MODE, MINIFY_MODES
+from scheduler import MemoryBudget
+from storage import ArtifactStore
+from worker_pool import WorkerPool
+
 # Налаштування сторінки
 st.set_page_config(
     page_title="SCORM Конвертер | HTML та PDF у SCORM пакети",
@@ -95,61 +103,31 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Функція для створення завантажувальних посилань
-def get_binary_file_downloader_html(bin_file, file_label='Файл'):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    b64 = base64.b64encode(data).decode()
-    href = f'<a href="data:application/octet-stream;base64,{b64}" download="{os.path.basename(bin_file)}" style="background-color: #4361ee; color: white; padding: 0.5rem 1rem; text-decoration: none; border-radius: 0.3rem; font-weight: bold; display: inline-block; text-align: center; margin: 1rem 0;">{file_label}</a>'
-    return href
-
-
-# Функції для конвертації файлів через підпроцеси
-def convert_pdf_to_scorm_subprocess(input_path, output_path, title=None, scorm_version="2004", extract_images=True):
-    cmd = [sys.executable, "pdf_converter.py", input_path, "--output", output_path]
-
-    if title:
-        cmd.extend(["--title", title])
-
-    cmd.extend(["--scorm-version", scorm_version])
-
-    if not extract_images:
-        cmd.append("--no-images")
-
-    try:
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        stdout, stderr = process.communicate()
-
-        if process.returncode != 0:
-            st.error(f"Помилка при виконанні pdf_converter.py: {stderr}")
-            return False
-
-        return os.path.exists(output_path)
-    except Exception as e:
-        st.error(f"Помилка при запуску підпроцесу: {str(e)}")
-        return False
-
-
-def convert_html_to_scorm_subprocess(input_path, output_path, title=None, scorm_version="2004", include_resources=True):
-    cmd = [sys.executable, "html_converter.py", input_path, "--output", output_path]
-
-    if title:
-        cmd.extend(["--title", title])
-
-    cmd.extend(["--scorm-version", scorm_version])
-
-    try:
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        stdout, stderr = process.communicate()
-
-        if process.returncode != 0:
-            st.error(f"Помилка при виконанні html_converter.py: {stderr}")
-            return False
-
-        return os.path.exists(output_path)
-    except Exception as e:
-        st.error(f"Помилка при запуску підпроцесу: {str(e)}")
-        return False
+# Спільний для всіх сесій пул фонових конвертацій. Конвертації виконуються в заздалегідь
+# запущених процесах, повторні конвертації того самого файлу з тими самими налаштуваннями
+# віддаються з кешу результатів
+@st.cache_resource
+def get_conversion_jobs():
+    # Кількість одночасних завдань обмежує бюджет пам'яті: великі PDF виконуються по одному,
+    # дрібні файли - паралельно на всіх ядрах
+    job_slots = max(2, min(8, os.cpu_count() or 1))
+    # Пошкоджений PDF може аварійно завершити або переповнити пам'ять лише процес пулу;
+    # такі завдання повторюються один раз зі зниженою роздільністю
+    pool = WorkerPool(processes=job_slots, max_jobs_per_worker=50, memory_limit=4 * 1024 ** 3,
+                      cpu_limit=10 * 60, job_timeout=15 * 60)
+    # Завдання, стан яких сесія перестала опитувати (сторінку закрито), скасовуються;
+    # завершені забуваються разом із видаленням їхніх файлів зі сховища
+    return ConversionJobs(max_workers=job_slots, max_pending=8, cache=ResultCache(max_bytes=1024 ** 3),
+                          pool=pool, budget=MemoryBudget(), time_budget=10 * 60, abandon_after=60,
+                          finished_ttl=60 * 60)
+
+
+# Дискове сховище вхідних файлів та готових пакетів, застарілі файли видаляються автоматично
+@st.cache_resource
+def get_artifact_store():
+    # Директорії завдань, що ще конвертуються, не видаляються навіть після max_age
+    return ArtifactStore(max_age=60 * 60, max_bytes=2 * 1024 ** 3,
+                         in_use=lambda: get_conversion_jobs().active_paths())
 
 
 # Головний заголовок
@@ -215,134 +193,133 @@ with col2:
     else:
         include_resources = st.checkbox("Включати зовнішні ресурси", value=True)
 
+# Оптимізація пакету
+with st.expander("Додаткові налаштування"):
+    minify = st.selectbox("Мініфікація CSS, JavaScript та HTML:", MINIFY_MODES,
+                          index=MINIFY_MODES.index(DEFAULT_MINIFY_MODE),
+                          help="off - вимкнено, safe - коментарі та зайві пробіли, "
+                               "full - агресивніше, з видаленням console.log/debug/info")
+    if conversion_type == "HTML в SCORM":
+        prune_css = st.checkbox("Видаляти CSS-правила, що не застосовуються до документа", value=True)
+        optimize_images = st.checkbox("Зменшувати зображення до розміру відображення", value=True)
+        lazy_loading = st.checkbox("Відкладене завантаження медіа нижче першого екрана", value=True)
+
 # Заголовок перед кнопкою
 title = st.text_input("Назва курсу (опціонально):", "")
 
 # Кнопка конвертації
 if st.button(f"Конвертувати в SCORM зараз"):
-    if uploaded_file is not None:
-        with st.spinner('Конвертація у процесі...'):
-            # Створюємо тимчасову директорію для обробки файлів
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Шлях до завантаженого файлу
-                file_path = os.path.join(temp_dir, uploaded_file.name)
-
-                # Зберігаємо завантажений файл
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-
-                # Шлях до вихідного SCORM-пакету
-                output_filename = f"{os.path.splitext(uploaded_file.name)[0]}_scorm.zip"
-                output_path = os.path.join(temp_dir, output_filename)
-
-                # Виконуємо конвертацію
-                if conversion_type == "PDF в SCORM":
-                    # Симуляція процесу для тестування (в кінцевому рішенні використовувати реальну конвертацію)
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-
-                    status_text.text("Початок конвертації PDF файлу...")
-                    progress_bar.progress(10)
-                    time.sleep(0.5)
-
-                    status_text.text("Обробка сторінок PDF...")
-                    progress_bar.progress(30)
-                    time.sleep(1)
-
-                    status_text.text("Створення SCORM-структури...")
-                    progress_bar.progress(60)
-                    time.sleep(0.7)
-
-                    status_text.text("Генерація SCORM-пакету...")
-                    progress_bar.progress(90)
-                    time.sleep(0.8)
-
-                    # Тут був би виклик реальної функції, замість цього створюємо фіктивний файл для демонстрації
-                    # result = convert_pdf_to_scorm_subprocess(file_path, output_path, title, scorm_version.split()[1], extract_images)
-
-                    # Для демонстрації створюємо фіктивний файл
-                    with open(output_path, 'wb') as f:
-                        f.write(b'Demo SCORM package')
-                    result = True
-
-                    progress_bar.progress(100)
-                    status_text.text("Конвертація завершена!")
-
-                else:  # HTML в SCORM
-                    # Симуляція процесу для тестування (в кінцевому рішенні використовувати реальну конвертацію)
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-
-                    status_text.text("Початок конвертації HTML файлу...")
-                    progress_bar.progress(10)
-                    time.sleep(0.5)
-
-                    status_text.text("Аналіз структури HTML...")
-                    progress_bar.progress(30)
-                    time.sleep(0.8)
-
-                    status_text.text("Копіювання ресурсів...")
-                    progress_bar.progress(50)
-                    time.sleep(0.7)
-
-                    status_text.text("Створення SCORM-структури...")
-                    progress_bar.progress(70)
-                    time.sleep(0.5)
-
-                    status_text.text("Генерація SCORM-пакету...")
-                    progress_bar.progress(90)
-                    time.sleep(0.8)
-
-                    # Тут був би виклик реальної функції, замість цього створюємо фіктивний файл для демонстрації
-                    # result = convert_html_to_scorm_subprocess(file_path, output_path, title, scorm_version.split()[1], include_resources)
-
-                    # Для демонстрації створюємо фіктивний файл
-                    with open(output_path, 'wb') as f:
-                        f.write(b'Demo SCORM package')
-                    result = True
-
-                    progress_bar.progress(100)
-                    status_text.text("Конвертація завершена!")
-
-                # Перевіряємо результат конвертації
-                if result:
-                    # Копіюємо результат у тимчасовий файл для відображення
-                    temp_output = os.path.join(".", "temp_" + output_filename)
-                    with open(output_path, 'rb') as src_file, open(temp_output, 'wb') as dst_file:
-                        dst_file.write(src_file.read())
-
-                    st.success("SCORM-пакет успішно створено!")
-
-                    # Деталі по створеному пакету
-                    st.markdown(f"""
-                    <div style='background-color: #e6f7ff; padding: 1rem; border-radius: 0.5rem; margin: 1rem 0;'>
-                        <h3>📚 SCORM-пакет готовий!</h3>
-                        <p><strong>Назва:</strong> {title if title else os.path.splitext(uploaded_file.name)[0]}</p>
-                        <p><strong>Версія SCORM:</strong> {scorm_version}</p>
-                        <p><strong>Формат:</strong> {conversion_type.split()[0]}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                    # Створюємо посилання для завантаження результату
-                    st.markdown(
-                        get_binary_file_downloader_html(temp_output, f"Завантажити SCORM-пакет ({output_filename})"),
-                        unsafe_allow_html=True
-                    )
-
-                    # Інструкції по використанню
-                    with st.expander("Як використовувати SCORM-пакет?"):
-                        st.markdown("""
-                        1. **Завантажте** створений SCORM-пакет на свій комп'ютер
-                        2. **Увійдіть** у вашу систему LMS (Moodle, Canvas, Blackboard, тощо)
-                        3. **Створіть** новий курс або модуль
-                        4. **Імпортуйте** SCORM-пакет згідно з інструкціями вашої LMS
-                        5. **Налаштуйте** параметри відображення та оцінювання
-                        6. **Опублікуйте** курс для ваших студентів
-                        """)
-                else:
-                    st.error("Помилка під час конвертації. Перевірте вхідний файл і спробуйте знову.")
-    else:
+    upload = None
+    if uploaded_file is None:
         st.warning("Будь ласка, завантажте файл для конвертації.")
+    else:
+        # Створюємо директорію завдання - вона має існувати довше за поточний запуск скрипта
+        job_dir = get_artifact_store().create_job_dir()
+
+        # Записуємо завантаження на диск частинами та відхиляємо непридатні файли до конвертації
+        expected_kind = 'pdf' if conversion_type == "PDF в SCORM" else 'html'
+        try:
+            uploaded_file.seek(0)
+            upload = ingest_upload(uploaded_file, job_dir, uploaded_file.name, expected_kinds=[expected_kind])
+        except IngestionError as e:
+            st.error(f"Файл відхилено: {e}")
+
+    if upload:
+        file_path = upload['path']
+
+        # Шлях до вихідного SCORM-пакету
+        output_filename = f"{os.path.splitext(os.path.basename(file_path))[0]}_scorm.zip"
+        output_path = os.path.join(job_dir, output_filename)
+
+        # Ставимо конвертацію у фонову чергу
+        # Проба, зроблена при завантаженні, передається далі - файл не аналізується вдруге
+        options = {'title': title or None, 'scorm_version': scorm_version.split()[1], 'probe': upload['probe'],
+                   'minify': minify}
+        if upload['kind'] == 'pdf':
+            options['extract_images'] = extract_images
+        else:
+            options.update(include_resources=include_resources, prune_css=prune_css,
+                           optimize_images=optimize_images, lazy_loading=lazy_loading)
+
+        try:
+            job_id = get_conversion_jobs().submit(upload['kind'], file_path, output_path, **options)
+            st.session_state['current_job'] = {
+                'id': job_id,
+                'title': title or upload['probe'].get('title') or os.path.splitext(uploaded_file.name)[0],
+                'scorm_version': scorm_version,
+                'format': conversion_type.split()[0],
+                'output_path': output_path,
+                'output_filename': output_filename
+            }
+        except JobQueueFull:
+            st.error("Сервіс зараз перевантажений. Спробуйте ще раз за кілька хвилин.")
+
+# Стан поточної конвертації цієї сесії
+current_job = st.session_state.get('current_job')
+if current_job:
+    job = get_conversion_jobs().status(current_job['id'])
+
+    if job is None:
+        del st.session_state['current_job']
+    elif job['state'] in ('queued', 'running'):
+        st.progress(min(100, int(job['progress'] * 100)))
+        st.text(job['message'])
+
+        if st.button("Скасувати конвертацію"):
+            get_conversion_jobs().cancel(current_job['id'])
+            st.rerun()
+
+        # Опитуємо стан завдання - конвертація йде у фоні і не блокує інші сесії
+        time.sleep(0.5)
+        st.rerun()
+    elif job['state'] == 'done':
+        st.success("SCORM-пакет успішно створено!")
+
+        # Деталі по створеному пакету
+        st.markdown(f"""
+        <div style='background-color: #e6f7ff; padding: 1rem; border-radius: 0.5rem; margin: 1rem 0;'>
+            <h3>📚 SCORM-пакет готовий!</h3>
+            <p><strong>Назва:</strong> {current_job['title']}</p>
+            <p><strong>Версія SCORM:</strong> {current_job['scorm_version']}</p>
+            <p><strong>Формат:</strong> {current_job['format']}</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        report = job.get('report') or {}
+        if 'requests_before' in report:
+            st.caption(f"Запитів до ресурсів: {report['requests_before']} → {report['requests_after']} "
+                       f"(вбудовано таблиць стилів: {report['inlined_stylesheets']}, "
+                       f"зображень: {report['inlined_images']})")
+
+        # Кнопка завантаження віддає файл з диску через медіа-endpoint Streamlit,
+        # а не вбудовує його в сторінку як base64
+        if os.path.exists(current_job['output_path']):
+            with open(current_job['output_path'], 'rb') as package_file:
+                st.download_button(
+                    f"Завантажити SCORM-пакет ({current_job['output_filename']})",
+                    data=package_file,
+                    file_name=current_job['output_filename'],
+                    mime='application/zip'
+                )
+        else:
+            st.warning("Файл пакету вже видалено зі сервера. Будь ласка, виконайте конвертацію повторно.")
+
+        # Інструкції по використанню
+        with st.expander("Як використовувати SCORM-пакет?"):
+            st.markdown("""
+            1. **Завантажте** створений SCORM-пакет на свій комп'ютер
+            2. **Увійдіть** у вашу систему LMS (Moodle, Canvas, Blackboard, тощо)
+            3. **Створіть** новий курс або модуль
+            4. **Імпортуйте** SCORM-пакет згідно з інструкціями вашої LMS
+            5. **Налаштуйте** параметри відображення та оцінювання
+            6. **Опублікуйте** курс для ваших студентів
+            """)
+    elif job['state'] == 'cancelled':
+        st.warning(job['error'])
+    else:
+        st.error("Помилка під час конвертації. Перевірте вхідний файл і спробуйте знову.")
+        if job['error']:
+            st.caption(job['error'])
 
 st.markdown("</div>", unsafe_allow_html=True)
 
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HTTP API конвертера для автоматизованих клієнтів
+
+Сервіс на стандартній бібліотеці (http.server) з трьома основними операціями:
+
+    POST   /jobs?kind=pdf&title=...&scorm_version=2004   тіло запиту - вміст файлу
+           (також minify, zoom, include_resources, prune_css, css_allow, inline_max_kb,
+           inline_budget_kb, optimize_images, lazy_loading - див. parse_conversion_options)
+    GET    /jobs/<id>                                    стан завдання (JSON)
+    GET    /jobs/<id>/package                            готовий SCORM-пакет
+    DELETE /jobs/<id>                                    скасування завдання
+    GET    /health                                       навантаження сервісу
+
+Тіло запиту записується на диск частинами (див. ingest.py), пакет віддається частинами
+з диску - пам'ять сервісу не залежить від розміру файлів. Кількість одночасних з'єднань
+і черга завдань обмежені: при перевантаженні сервіс одразу відповідає 503 з заголовком
+Retry-After замість того, щоб накопичувати запити.
+
+Використання:
+    python api.py --port 8080 --jobs 2
+"""
+
+import argparse
+import hmac
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+from asset_inlining import INLINE_BUDGET_BYTES, INLINE_MAX_BYTES
+from batch import conversion_options
+from cache import ResultCache
+from css_pruning import DEFAULT_CSS_ALLOWLIST
+from ingest import IngestionError, ingest_upload
+from jobs import ConversionJobs, JobQueueFull
+from minify import DEFAULT_MINIFY_MODE, MINIFY_MODES
+from scheduler import MemoryBudget
+from storage import ArtifactStore
+from worker_pool import WorkerPool
+
+# Розмір частини при віддачі пакету
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Через скільки секунд радимо клієнту повторити запит при перевантаженні
+RETRY_AFTER = 30
+
+# Поля стану завдання, що не віддаються клієнтам (шляхи на сервері тощо)
+PRIVATE_JOB_FIELDS = ('input_path', 'output_path', 'options', 'polled_at', 'finished_at')
+
+JOB_PATH = re.compile(r'^/jobs/([0-9a-f]{32})(/package)?$')
+
+# Символи, що не допускаються в імені пакету (ім'я потрапляє в заголовок Content-Disposition)
+UNSAFE_NAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+# Максимальна довжина імені пакету без розширення
+MAX_NAME_LENGTH = 100
+
+# Максимальний масштаб рендерингу сторінок PDF, який може запросити клієнт
+MAX_ZOOM = 4.0
+
+# Максимальна кількість шаблонів css_allow в одному запиті
+MAX_CSS_ALLOW = 100
+
+# Значення логічних параметрів запиту
+FLAG_VALUES = {'1': True, 'true': True, 'yes': True, '0': False, 'false': False, 'no': False}
+
+
+def parse_conversion_options(params):
+    """
+    Розбирає параметри конвертації з рядка запиту
+
+    Ресурси поза директорією завантаженого документа (allow_external_resources) через API
+    не дозволяються - завантажені файли не є довіреними.
+
+    Args:
+        params (dict): Параметри запиту: назва -> список значень (результат parse_qs)
+
+    Returns:
+        dict: Аргументи batch.conversion_options (крім kind та scorm_version)
+
+    Raises:
+        ValueError: Якщо значення параметра некоректне (текст - для відповіді клієнту)
+    """
+    def value(name):
+        return params[name][-1] if name in params else None
+
+    def flag(name, default=True):
+        raw = value(name)
+        if raw is None:
+            return default
+        if raw.lower() not in FLAG_VALUES:
+            raise ValueError(f"Параметр {name} має бути true або false")
+        return FLAG_VALUES[raw.lower()]
+
+    def kilobytes(name, default):
+        raw = value(name)
+        if raw is None:
+            return default
+        try:
+            size = float(raw)
+        except ValueError:
+            size = -1
+        if not 0 <= size <= 1024 ** 2:
+            raise ValueError(f"Параметр {name} має бути невід'ємною кількістю КБ")
+        return int(size * 1024)
+
+    minify = value('minify') or DEFAULT_MINIFY_MODE
+    if minify not in MINIFY_MODES:
+        raise ValueError(f"Параметр minify має бути одним із: {', '.join(MINIFY_MODES)}")
+    css_allow = params.get('css_allow', [])
+    if len(css_allow) > MAX_CSS_ALLOW:
+        raise ValueError(f"Можна вказати не більше {MAX_CSS_ALLOW} параметрів css_allow")
+    zoom = value('zoom')
+    if zoom is not None:
+        try:
+            zoom = float(zoom)
+        except ValueError:
+            zoom = 0
+        if not 0 < zoom <= MAX_ZOOM:
+            raise ValueError(f"Параметр zoom має бути числом від 0 до {MAX_ZOOM}")
+
+    return {
+        'include_resources': flag('include_resources'),
+        'zoom': zoom,
+        'minify': minify,
+        'html_options': {
+            'inline_max_bytes': kilobytes('inline_max_kb', INLINE_MAX_BYTES),
+            'inline_budget_bytes': kilobytes('inline_budget_kb', INLINE_BUDGET_BYTES),
+            'prune_css': flag('prune_css'),
+            'css_allowlist': DEFAULT_CSS_ALLOWLIST + tuple(css_allow),
+            'optimize_images': flag('optimize_images'),
+            'lazy_loading': flag('lazy_loading')
+        }
+    }
+
+
+def package_name(filename):
+    """
+    Формує ім'я SCORM-пакету з імені файлу від клієнта
+
+    Залишаються лише латинські літери, цифри, '.', '_' і '-' - ім'я безпечно
+    для файлової системи та заголовків відповіді.
+
+    Args:
+        filename (str): Ім'я файлу від клієнта (може бути None)
+
+    Returns:
+        str: Ім'я пакету виду '<ім'я>_scorm.zip'
+    """
+    base = os.path.basename((filename or '').replace('\\', '/'))
+    stem = UNSAFE_NAME_CHARS.sub('_', os.path.splitext(base)[0]).strip('._')[:MAX_NAME_LENGTH]
+    return f"{stem or 'upload'}_scorm.zip"
+
+
+def content_disposition(filename):
+    """
+    Формує значення заголовка Content-Disposition для завантаження файлу
+
+    Ім'я передається у лапках (лише ASCII без лапок і керуючих символів) і додатково
+    у форматі RFC 5987 (filename*).
+
+    Args:
+        filename (str): Ім'я файлу
+
+    Returns:
+        str: Значення заголовка
+    """
+    fallback = ''.join(c if ' ' <= c < '\x7f' and c not in '"\\' else '_' for c in filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+class RequestBody:
+    """Файлоподібна обгортка, що читає з сокета не більше Content-Length байтів"""
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.stream.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+class ConversionAPIHandler(BaseHTTPRequestHandler):
+    """Обробник запитів HTTP API (стан сервісу - в self.server)"""
+
+    server_version = 'SCORMConverterAPI/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {'error': message}, headers)
+
+    def authorized(self):
+        token = self.server.api_token
+        if not token:
+            return True
+        supplied = self.headers.get('Authorization', '')
+        if hmac.compare_digest(supplied.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+            return True
+        self.send_error_json(401, "Потрібен заголовок Authorization: Bearer <токен>")
+        return False
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        path = urlparse(self.path).path
+        if path == '/health':
+            self.send_json(200, self.server.jobs.snapshot())
+            return
+
+        match = JOB_PATH.match(path)
+        job = self.server.jobs.status(match.group(1)) if match else None
+        if job is not None and job['state'] == 'done' and not os.path.exists(job['output_path']):
+            # Директорію завдання видалено зі сховища - завдання більше не відстежується
+            self.server.jobs.forget(job['id'])
+            job = None
+        if job is None:
+            self.send_error_json(404, "Завдання не знайдено")
+        elif match.group(2):
+            self.send_package(job)
+        else:
+            self.send_json(200, {name: value for name, value in job.items() if name not in PRIVATE_JOB_FIELDS})
+
+    def do_DELETE(self):
+        if not self.authorized():
+            return
+        match = JOB_PATH.match(urlparse(self.path).path)
+        if not match or match.group(2) or self.server.jobs.status(match.group(1)) is None:
+            self.send_error_json(404, "Завдання не знайдено")
+            return
+        cancelled = self.server.jobs.cancel(match.group(1))
+        self.send_json(200 if cancelled else 409, {'id': match.group(1), 'cancelled': cancelled})
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        url = urlparse(self.path)
+        if url.path != '/jobs':
+            self.send_error_json(404, "Невідомий шлях")
+            return
+
+        length = self.headers.get('Content-Length')
+        if length is None or not length.isdigit():
+            self.send_error_json(411, "Потрібен заголовок Content-Length")
+            return
+        length = int(length)
+        if length > self.server.max_upload_bytes:
+            self.close_connection = True
+            self.send_error_json(413, f"Файл перевищує {self.server.max_upload_bytes // (1024 * 1024)} МБ")
+            return
+
+        # Перевантажений сервіс відповідає до читання тіла запиту
+        if self.server.jobs.snapshot()['queued'] >= self.server.jobs.max_pending:
+            self.close_connection = True
+            self.send_error_json(503, "Черга завдань заповнена", {'Retry-After': str(RETRY_AFTER)})
+            return
+
+        params = parse_qs(url.query)
+        query = {name: values[-1] for name, values in params.items()}
+        kind = query.get('kind')
+        if kind not in (None, 'pdf', 'html', 'docx'):
+            self.close_connection = True
+            self.send_error_json(400, "Параметр kind має бути pdf, html або docx")
+            return
+        options = {'title': query.get('title') or None, 'scorm_version': query.get('scorm_version', '2004')}
+        if options['scorm_version'] not in ('1.2', '2004'):
+            self.close_connection = True
+            self.send_error_json(400, "Параметр scorm_version має бути 1.2 або 2004")
+            return
+        try:
+            conversion = parse_conversion_options(params)
+        except ValueError as e:
+            self.close_connection = True
+            self.send_error_json(400, str(e))
+            return
+        filename = query.get('filename') or self.headers.get('X-Filename') or f"upload.{kind or 'bin'}"
+
+        job_dir = self.server.store.create_job_dir()
+        try:
+            upload = ingest_upload(RequestBody(self.rfile, length), job_dir, filename,
+                                   expected_kinds=[kind] if kind else None,
+                                   limits={'max_bytes': self.server.max_upload_bytes})
+        except IngestionError as e:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            self.close_connection = True
+            self.send_error_json(422, str(e))
+            return
+        except OSError as e:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            self.close_connection = True
+            self.send_error_json(500, "Не вдалося зберегти завантажений файл")
+            self.log_message("Помилка збереження завантаження: %s", e)
+            return
+
+        output_filename = package_name(filename)
+        options.update(conversion_options(upload['kind'], options['scorm_version'], **conversion))
+        try:
+            job_id = self.server.jobs.submit(upload['kind'], upload['path'],
+                                             os.path.join(job_dir, output_filename),
+                                             probe=upload['probe'], **options)
+        except JobQueueFull as e:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            self.send_error_json(503, str(e), {'Retry-After': str(RETRY_AFTER)})
+            return
+
+        self.send_json(202, {
+            'id': job_id,
+            'kind': upload['kind'],
+            'probe': upload['probe'],
+            'status_url': f"/jobs/{job_id}",
+            'package_url': f"/jobs/{job_id}/package"
+        }, {'Location': f"/jobs/{job_id}"})
+
+    def send_package(self, job):
+        if job['state'] in ('queued', 'running'):
+            self.send_error_json(409, "Пакет ще не готовий", {'Retry-After': '2'})
+            return
+        if job['state'] != 'done':
+            self.send_error_json(409, job['error'] or "Конвертація не вдалася")
+            return
+
+        try:
+            package = open(job['output_path'], 'rb')
+        except FileNotFoundError:
+            self.server.jobs.forget(job['id'])
+            self.send_error_json(410, "Пакет вже видалено зі сервера")
+            return
+
+        with package:
+            size = os.fstat(package.fileno()).st_size
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/zip')
+            self.send_header('Content-Length', str(size))
+            self.send_header('Content-Disposition', content_disposition(os.path.basename(job['output_path'])))
+            self.end_headers()
+            shutil.copyfileobj(package, self.wfile, DOWNLOAD_CHUNK_SIZE)
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+
+class ConversionAPIServer(ThreadingHTTPServer):
+    """
+    HTTP-сервер з обмеженою кількістю одночасних з'єднань
+
+    Args:
+        address (tuple): (хост, порт)
+        jobs (ConversionJobs): Черга конвертацій
+        store (ArtifactStore): Сховище вхідних файлів і пакетів
+        max_connections (int): Максимальна кількість одночасних з'єднань; понад неї
+            сервер відповідає 503 без створення потоку
+        max_upload_bytes (int): Максимальний розмір завантаженого файлу
+        api_token (str): Токен доступу (заголовок Authorization: Bearer); None - без перевірки
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, jobs, store, max_connections=32, max_upload_bytes=25 * 1024 * 1024,
+                 api_token=None):
+        super().__init__(address, ConversionAPIHandler)
+        self.jobs = jobs
+        self.store = store
+        self.max_upload_bytes = max_upload_bytes
+        self.api_token = api_token
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            body = json.dumps({'error': "Сервіс перевантажено"}, ensure_ascii=False).encode('utf-8')
+            try:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\n"
+                                b"Content-Type: application/json; charset=utf-8\r\n"
+                                + f"Retry-After: {RETRY_AFTER}\r\nContent-Length: {len(body)}\r\n".encode('ascii')
+                                + b"Connection: close\r\n\r\n" + body)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        super().process_request(request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+
+def create_server(host='127.0.0.1', port=8080, workers=2, max_pending=16, max_connections=32, api_token=None):
+    """
+    Створює сервер HTTP API разом з пулом процесів, кешем і сховищем
+
+    Returns:
+        ConversionAPIServer: Сервер (запуск - serve_forever())
+    """
+    pool = WorkerPool(processes=workers, max_jobs_per_worker=50, memory_limit=4 * 1024 ** 3,
+                      cpu_limit=10 * 60, job_timeout=15 * 60, quiet=True)
+    # Окреме від Streamlit-застосунку сховище - у них різний час зберігання пакетів
+    store = ArtifactStore(root=os.path.join(tempfile.gettempdir(), 'scorm_converter_api'),
+                          max_age=24 * 60 * 60, max_bytes=4 * 1024 ** 3, in_use=lambda: jobs.active_paths())
+    # Завершені завдання забуваються разом із видаленням їхніх директорій зі сховища
+    jobs = ConversionJobs(max_workers=workers, max_pending=max_pending, cache=ResultCache(max_bytes=1024 ** 3),
+                          pool=pool, budget=MemoryBudget(), time_budget=10 * 60, finished_ttl=store.max_age)
+    return ConversionAPIServer((host, port), jobs, store, max_connections=max_connections, api_token=api_token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP API конвертера навчальних матеріалів у SCORM')
+    parser.add_argument('--host', default='127.0.0.1', help='Адреса для прослуховування')
+    parser.add_argument('--port', '-p', type=int, default=8080, help='Порт')
+    parser.add_argument('--jobs', '-j', type=int, default=2, help='Кількість одночасних конвертацій')
+    parser.add_argument('--max-pending', type=int, default=16, help='Максимальна довжина черги завдань')
+    parser.add_argument('--max-connections', type=int, default=32, help='Максимальна кількість одночасних з\'єднань')
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.jobs, args.max_pending, args.max_connections,
+                           api_token=os.environ.get('SCORM_API_TOKEN'))
+    print(f"HTTP API конвертера слухає на http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.jobs.pool.close()
+
+
+if __name__ == "__main__":
+    main()
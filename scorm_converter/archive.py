@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Детерміноване пакування SCORM
+
+Однаковий вхідний файл з однаковими параметрами має давати побайтово однаковий
+пакет: файли додаються до архіву у відсортованому порядку з фіксованими часовими
+мітками, а ідентифікатор курсу виводиться з вмісту вхідного файлу замість uuid4().
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import zipfile
+
+from cancellation import check_cancelled
+
+# Мінімальна дата, яку підтримує формат ZIP
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+
+
+def content_course_id(source_path, **options):
+    """
+    Обчислює ідентифікатор курсу з вмісту вхідного файлу та параметрів конвертації
+
+    Args:
+        source_path (str): Шлях до вхідного файлу
+        **options: Параметри, що впливають на пакет (назва, версія SCORM тощо)
+
+    Returns:
+        str: Ідентифікатор у форматі UUID
+    """
+    digest = hashlib.sha256()
+    with open(source_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    digest.update(json.dumps(options, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+    return str(uuid.UUID(hex=digest.hexdigest()[:32]))
+
+
+def write_scorm_zip(content_dir, output_path, cancel_token=None):
+    """
+    Пакує директорію контенту в ZIP-архів з відтворюваним вмістом
+
+    Args:
+        content_dir (str): Директорія контенту SCORM-пакету
+        output_path (str): Шлях до ZIP-архіву
+        cancel_token (CancellationToken): Токен скасування, що перевіряється між файлами
+    """
+    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(content_dir):
+            # Фіксований порядок обходу незалежно від файлової системи
+            dirs.sort()
+            for file in sorted(files):
+                check_cancelled(cancel_token)
+                file_path = os.path.join(root, file)
+                info = zipfile.ZipInfo(os.path.relpath(file_path, content_dir).replace(os.sep, '/'),
+                                       date_time=ZIP_TIMESTAMP)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                with open(file_path, 'rb') as src, zipf.open(info, 'w') as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
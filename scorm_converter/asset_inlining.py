@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Вбудовування дрібних ресурсів у HTML-документ пакету
+
+Сторінка курсу відкривається в iframe LMS, і кожна дрібна іконка чи таблиця стилів -
+окремий запит до LMS. Після збирання ресурсів (див. html_resources.ResourceCrawler)
+невеликі таблиці стилів замінюються блоками <style>, а невеликі зображення - data URI.
+Загальний обсяг вбудованого вмісту обмежено бюджетом, тому великі ресурси залишаються
+зовнішніми і HTML не роздувається. Шрифти не вбудовуються: політика безпеки сторінки
+(CONTENT_SECURITY_POLICY) дозволяє data URI лише для зображень.
+
+Файли, на які після вбудовування не залишилось посилань, видаляються з пакету, якщо
+їхні імена не згадуються в скриптах.
+"""
+
+import base64
+import os
+import posixpath
+from urllib.parse import quote
+
+from html_resources import is_local_reference, rewrite_css_urls, rewrite_tag_urls, split_reference
+
+# Максимальний розмір ресурсу, що вбудовується (байтів)
+INLINE_MAX_BYTES = 4 * 1024
+
+# Максимальний загальний обсяг вбудованого вмісту на документ (байтів)
+INLINE_BUDGET_BYTES = 256 * 1024
+
+# Типи зображень, що можуть стати data URI
+INLINE_MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.svg': 'image/svg+xml',
+    '.webp': 'image/webp',
+    '.ico': 'image/x-icon',
+    '.bmp': 'image/bmp',
+    '.avif': 'image/avif'
+}
+
+
+def _is_stylesheet_link(tag):
+    rel = tag.get('rel') or []
+    rel = rel if isinstance(rel, list) else rel.split()
+    return 'stylesheet' in (value.lower() for value in rel) and isinstance(tag.get('href'), str)
+
+
+class _References:
+    """Посилання документа та таблиць стилів пакету на файли директорії ресурсів"""
+
+    def __init__(self, packaged):
+        self.packaged = packaged
+        self.counts = {}
+        # Файли, посилання на які не можна замінити data URI (srcset, #фрагмент SVG)
+        self.pinned = set()
+
+    def resolve(self, url, from_dir):
+        """Повертає шлях файлу відносно директорії ресурсів або None для зовнішніх посилань"""
+        if not is_local_reference(url):
+            return None
+        path, _ = split_reference(url)
+        if not path or path.startswith('/'):
+            return None
+        target = posixpath.normpath(posixpath.join(from_dir, path))
+        return target if target in self.packaged else None
+
+    def record(self, url, from_dir, pinned=False):
+        target = self.resolve(url, from_dir)
+        if target is not None:
+            self.counts[target] = self.counts.get(target, 0) + 1
+            if pinned or '#' in url:
+                self.pinned.add(target)
+        return url
+
+    def collect(self, soup, stylesheets):
+        """
+        Збирає посилання документа та таблиць стилів, досяжних з нього
+
+        Args:
+            soup (BeautifulSoup): Документ (лежить у корені директорії ресурсів)
+            stylesheets (dict): Шлях таблиці стилів -> її текст
+        """
+        self.counts.clear()
+        self.pinned.clear()
+        for tag in soup.find_all(True):
+            rewrite_tag_urls(tag, lambda url: self.record(url, ''),
+                             lambda url: self.record(url, '', pinned=True))
+        # Таблиця стилів без посилань на неї (вже вбудована) запитів не створює
+        visited = set()
+        pending = [relative for relative in self.counts if relative in stylesheets]
+        while pending:
+            relative = pending.pop()
+            if relative in visited:
+                continue
+            visited.add(relative)
+            rewrite_css_urls(stylesheets[relative], lambda url: self.record(url, posixpath.dirname(relative)))
+            pending.extend(target for target in self.counts if target in stylesheets and target not in visited)
+
+
+def _rebase_css(css_text, from_dir, to_dir):
+    """Переписує відносні посилання CSS з директорії from_dir на to_dir"""
+
+    def rebase(url):
+        if not is_local_reference(url):
+            return url
+        path, suffix = split_reference(url)
+        if not path or path.startswith('/'):
+            return url
+        target = posixpath.normpath(posixpath.join(from_dir, path))
+        return quote(posixpath.relpath(target, to_dir or '.'), safe='/') + suffix
+
+    return rewrite_css_urls(css_text, rebase)
+
+
+def _data_uri(path, mime_type):
+    with open(path, 'rb') as f:
+        return f"data:{mime_type};base64,{base64.b64encode(f.read()).decode('ascii')}"
+
+
+def _mentioned_in_scripts(relative, scripts):
+    name = posixpath.basename(relative)
+    return any(name in script for script in scripts)
+
+
+def inline_assets(soup, resources_dir, resources, max_asset_bytes=INLINE_MAX_BYTES,
+                  budget_bytes=INLINE_BUDGET_BYTES):
+    """
+    Вбудовує дрібні таблиці стилів і зображення в документ
+
+    Документ має лежати в корені директорії ресурсів, а посилання в ньому - вже вказувати
+    на файли пакету (після ResourceCrawler.crawl). Таблиці стилів вбудовуються першими
+    (у порядку документа), потім зображення - від найменших, доки не вичерпано бюджет.
+    Зображення з кількома посиланнями не вбудовуються: data URI повторювався б у кожному
+    посиланні, а файл браузер завантажує один раз.
+
+    Args:
+        soup (BeautifulSoup): Документ; змінюється на місці
+        resources_dir (str): Директорія ресурсів пакету
+        resources (dict): Файли пакету за категоріями (див. process_html_file); видалені
+            з пакету файли прибираються зі списків
+        max_asset_bytes (int): Максимальний розмір ресурсу для вбудовування; 0 - не вбудовувати
+        budget_bytes (int): Загальний обсяг вбудованого вмісту
+
+    Returns:
+        dict: Звіт: 'requests_before' та 'requests_after' - кількість різних файлів, на які
+            посилаються документ і таблиці стилів, 'inlined_stylesheets', 'inlined_images',
+            'inlined_bytes' - обсяг доданого до документа та CSS вмісту, 'removed_files'
+    """
+    packaged = {relative for files in resources.values() for relative in files}
+    stylesheets = {}
+    for relative in resources.get('css', []):
+        with open(os.path.join(resources_dir, relative), 'r', encoding='utf-8', errors='surrogateescape') as f:
+            stylesheets[relative] = f.read()
+
+    references = _References(packaged)
+    references.collect(soup, stylesheets)
+    report = {
+        'requests_before': len(references.counts),
+        'requests_after': len(references.counts),
+        'inlined_stylesheets': 0,
+        'inlined_images': 0,
+        'inlined_bytes': 0,
+        'removed_files': 0
+    }
+    if max_asset_bytes <= 0 or budget_bytes <= 0:
+        return report
+
+    budget = budget_bytes
+    inlined = set()
+
+    # Таблиці стилів: <link rel="stylesheet"> -> <style> на тому ж місці (порядок каскаду зберігається)
+    for link in soup.find_all('link'):
+        if not _is_stylesheet_link(link):
+            continue
+        relative = references.resolve(link['href'], '')
+        if relative not in stylesheets or '#' in link['href']:
+            continue
+        css_text = _rebase_css(stylesheets[relative], posixpath.dirname(relative), '')
+        size = len(css_text.encode('utf-8', 'surrogateescape'))
+        if size > max_asset_bytes or size > budget or '</style' in css_text.lower():
+            continue
+        style = soup.new_tag('style')
+        if link.get('media'):
+            style['media'] = link['media']
+        style.string = css_text
+        link.replace_with(style)
+        budget -= size
+        inlined.add(relative)
+        report['inlined_stylesheets'] += 1
+        report['inlined_bytes'] += size
+
+    # Зображення: спершу найменші - найбільше зекономлених запитів на байт бюджету
+    references.collect(soup, stylesheets)
+    candidates = []
+    for relative, count in references.counts.items():
+        mime_type = INLINE_MIME_TYPES.get(os.path.splitext(relative)[1].lower())
+        if mime_type is None or count > 1 or relative in references.pinned:
+            continue
+        size = os.path.getsize(os.path.join(resources_dir, relative))
+        if size <= max_asset_bytes:
+            candidates.append((size, relative, mime_type))
+
+    data_uris = {}
+    for size, relative, mime_type in sorted(candidates):
+        cost = (size + 2) // 3 * 4 + len(mime_type) + 13
+        if cost > budget:
+            continue
+        data_uris[relative] = _data_uri(os.path.join(resources_dir, relative), mime_type)
+        budget -= cost
+        report['inlined_images'] += 1
+        report['inlined_bytes'] += cost
+
+    if data_uris:
+        def replace(url, from_dir):
+            return data_uris.get(references.resolve(url, from_dir), url)
+
+        for tag in soup.find_all(True):
+            rewrite_tag_urls(tag, lambda url: replace(url, ''))
+        for relative, css_text in stylesheets.items():
+            new_text = rewrite_css_urls(css_text, lambda url: replace(url, posixpath.dirname(relative)))
+            if new_text != css_text:
+                stylesheets[relative] = new_text
+                with open(os.path.join(resources_dir, relative), 'w', encoding='utf-8',
+                          errors='surrogateescape') as f:
+                    f.write(new_text)
+        inlined.update(data_uris)
+
+    # Вбудовані файли без посилань видаляються, якщо скрипти не звертаються до них за іменем
+    references.collect(soup, stylesheets)
+    scripts = [script.string for script in soup.find_all('script') if script.string]
+    for relative in resources.get('js', []):
+        with open(os.path.join(resources_dir, relative), 'r', encoding='utf-8', errors='ignore') as f:
+            scripts.append(f.read())
+    for relative in sorted(inlined):
+        if relative in references.counts or _mentioned_in_scripts(relative, scripts):
+            continue
+        os.remove(os.path.join(resources_dir, relative))
+        for files in resources.values():
+            if relative in files:
+                files.remove(relative)
+        report['removed_files'] += 1
+
+    report['requests_after'] = len(references.counts)
+    return report
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Пакетна конвертація без інтерактивних запитів
+
+Приймає файли, директорії та glob-шаблони, визначає тип кожного файлу за вмістом і
+конвертує їх паралельно в пулі процесів. Результат кожного файлу (стан, час, розмір
+пакету) записується в журнал JSON Lines. Файли, пакети яких новіші за вхідний файл,
+пропускаються.
+
+Використання:
+    python main.py --batch docs/ "exports/**/*.html" --jobs 4 --output-dir out --log results.jsonl
+"""
+
+import glob
+import json
+import os
+import time
+
+from ingest import IngestionError, detect_file_kind
+from jobs import ConversionJobs
+from minify import DEFAULT_MINIFY_MODE
+from worker_pool import WorkerPool
+
+# Розширення файлів, що розглядаються при обході директорій
+BATCH_EXTENSIONS = ('.pdf', '.docx', '.html', '.htm')
+
+# Інтервал опитування стану завдань
+POLL_INTERVAL = 0.2
+
+
+def glob_base_dir(pattern):
+    """Повертає частину glob-шаблону до першого компонента із символами підстановки"""
+    parts = []
+    for part in pattern.replace('\\', '/').split('/'):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return '/'.join(parts) or '.'
+
+
+def expand_inputs(patterns):
+    """
+    Розгортає файли, директорії та glob-шаблони у список вхідних файлів
+
+    Args:
+        patterns (list): Шляхи до файлів, директорій або glob-шаблони
+
+    Returns:
+        list: Пари (шлях до файлу, базова директорія для відносного шляху пакету)
+    """
+    inputs = []
+    seen = set()
+
+    def add(path, base_dir):
+        real_path = os.path.realpath(path)
+        if real_path not in seen:
+            seen.add(real_path)
+            inputs.append((path, base_dir))
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs.sort()
+                for file in sorted(files):
+                    if file.lower().endswith(BATCH_EXTENSIONS):
+                        add(os.path.join(root, file), pattern)
+        elif os.path.isfile(pattern):
+            add(pattern, os.path.dirname(pattern))
+        else:
+            base_dir = glob_base_dir(pattern)
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    add(path, base_dir)
+    return inputs
+
+
+def batch_output_path(input_path, base_dir, output_dir=None):
+    """
+    Визначає шлях до пакету для вхідного файлу
+
+    Без output_dir пакет створюється поруч із вхідним файлом, інакше - в output_dir
+    зі збереженням структури піддиректорій відносно base_dir. Ім'я пакету зберігає
+    розширення вхідного файлу (intro.pdf_scorm.zip), щоб intro.pdf та intro.html
+    в одній директорії не перезаписували пакети одне одного.
+    """
+    name = f"{os.path.basename(input_path)}_scorm.zip"
+    if not output_dir:
+        return os.path.join(os.path.dirname(input_path), name)
+    relative_dir = os.path.relpath(os.path.dirname(input_path), base_dir or '.')
+    return os.path.normpath(os.path.join(output_dir, relative_dir, name))
+
+
+def is_up_to_date(input_path, output_path):
+    """Перевіряє, чи пакет існує і новіший за вхідний файл"""
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    except OSError:
+        return False
+
+
+def conversion_options(kind, scorm_version='2004', include_resources=True, zoom=None, minify=DEFAULT_MINIFY_MODE,
+                       html_options=None):
+    """
+    Збирає аргументи конвертера для типу файлу
+
+    Args:
+        kind (str): Тип вхідного файлу ('pdf', 'html' або 'docx')
+        scorm_version (str): Версія SCORM ('1.2' або '2004')
+        include_resources (bool): Чи включати пов'язані ресурси для HTML
+        zoom (float): Масштаб рендерингу сторінок PDF; None - стандартний
+        minify (str): Режим мініфікації пакету (див. minify.MINIFY_MODES)
+        html_options (dict): Додаткові аргументи convert_html_to_scorm (prune_css,
+            inline_max_bytes тощо)
+
+    Returns:
+        dict: Аргументи для ConversionJobs.submit
+    """
+    options = {'scorm_version': scorm_version, 'minify': minify}
+    if kind == 'html':
+        options['include_resources'] = include_resources
+        options.update(html_options or {})
+    if kind == 'pdf' and zoom:
+        options['zoom'] = zoom
+    return options
+
+
+def run_batch(patterns, output_dir=None, jobs=None, scorm_version='2004', include_resources=True,
+              zoom=None, force=False, log_path=None, job_timeout=None, minify=DEFAULT_MINIFY_MODE,
+              html_options=None):
+    """
+    Конвертує набір файлів паралельно
+
+    Args:
+        patterns (list): Файли, директорії або glob-шаблони
+        output_dir (str): Директорія для пакетів (за замовчуванням - поруч із вхідними файлами)
+        jobs (int): Кількість паралельних процесів (за замовчуванням - за кількістю ядер)
+        scorm_version (str): Версія SCORM ('1.2' або '2004')
+        include_resources (bool): Чи включати пов'язані ресурси для HTML
+        zoom (float): Масштаб рендерингу сторінок PDF (за замовчуванням - стандартний)
+        force (bool): Конвертувати навіть файли з актуальними пакетами
+        log_path (str): Шлях до журналу результатів (JSON Lines); None - без журналу
+        job_timeout (float): Максимальна тривалість конвертації одного файлу в секундах
+        minify (str): Режим мініфікації пакетів (див. minify.MINIFY_MODES)
+        html_options (dict): Додаткові аргументи конвертації HTML (див. conversion_options)
+
+    Returns:
+        dict: Кількість файлів за станами ('done', 'failed', 'skipped' тощо)
+    """
+    jobs = jobs or os.cpu_count() or 1
+    counts = {}
+    log_file = open(log_path, 'a', encoding='utf-8') if log_path else None
+
+    def record(entry):
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+        size = f", {entry['output_bytes']} байт" if entry.get('output_bytes') else ''
+        error = f" - {entry['error']}" if entry.get('error') else ''
+        print(f"[{entry['status']}] {entry['input']}{size}{error}")
+        if log_file:
+            log_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            log_file.flush()
+
+    # Визначаємо завдання до запуску процесів: непідтримувані та актуальні файли не потребують пулу
+    tasks = []
+    for input_path, base_dir in expand_inputs(patterns):
+        entry = {'input': input_path, 'kind': None, 'output': None, 'status': None,
+                 'seconds': 0.0, 'output_bytes': None, 'error': None}
+        try:
+            entry['kind'] = detect_file_kind(input_path)
+        except (IngestionError, OSError) as e:
+            entry['status'], entry['error'] = 'unsupported', str(e)
+            record(entry)
+            continue
+        if entry['kind'] is None:
+            entry['status'], entry['error'] = 'unsupported', "Формат файлу не підтримується"
+            record(entry)
+            continue
+
+        entry['output'] = batch_output_path(input_path, base_dir, output_dir)
+        if not force and is_up_to_date(input_path, entry['output']):
+            entry['status'], entry['output_bytes'] = 'skipped', os.path.getsize(entry['output'])
+            record(entry)
+            continue
+        tasks.append(entry)
+
+    if tasks:
+        print(f"Конвертація {len(tasks)} файлів у {min(jobs, len(tasks))} процесах...")
+        pool = WorkerPool(processes=min(jobs, len(tasks)), job_timeout=job_timeout, quiet=True)
+        conversions = ConversionJobs(max_workers=pool.processes, max_pending=len(tasks), pool=pool)
+        try:
+            pending = {}
+            for entry in tasks:
+                os.makedirs(os.path.dirname(entry['output']) or '.', exist_ok=True)
+                options = conversion_options(entry['kind'], scorm_version, include_resources, zoom, minify,
+                                             html_options)
+                job_id = conversions.submit(entry['kind'], entry['input'], entry['output'], **options)
+                pending[job_id] = (entry, time.monotonic())
+
+            while pending:
+                time.sleep(POLL_INTERVAL)
+                for job_id in list(pending):
+                    status = conversions.status(job_id)
+                    if status['state'] in ('queued', 'running'):
+                        continue
+                    entry, started = pending.pop(job_id)
+                    conversions.forget(job_id)
+                    entry['status'] = status['state']
+                    entry['seconds'] = round(status['elapsed'] or time.monotonic() - started, 3)
+                    entry['error'] = status['error']
+                    if status['state'] == 'done':
+                        entry['output_bytes'] = os.path.getsize(entry['output'])
+                    if status['report']:
+                        entry['report'] = status['report']
+                    record(entry)
+        finally:
+            pool.close()
+
+    if log_file:
+        log_file.close()
+
+    summary = ', '.join(f"{status}: {count}" for status, count in sorted(counts.items()))
+    print(f"Пакетну конвертацію завершено ({summary or 'файлів не знайдено'})")
+    return counts
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Порівняння швидкості перетворення HTML у process_html_file
+
+Попередня реалізація робила окремі проходи find_all для стилів, скриптів і коментарів
+та серіалізувала все дерево для пошуку кожного проблемного домену. Скрипт вимірює
+її разом з rewrite_html_document на test.html і синтетичному документі, схожому на
+експорт із LMS, і перевіряє, що результати однакові.
+
+Використання:
+    python bench_html.py --size-mb 20 --repeat 3
+    python bench_html.py --file course.html
+"""
+
+import argparse
+import os
+import time
+
+from bs4 import BeautifulSoup
+from bs4.element import Comment
+
+from html_converter import CONTENT_SECURITY_POLICY, PROBLEMATIC_DOMAINS, rewrite_html_document
+
+SECTION_TEMPLATE = '''
+<!-- Розділ {n}: експортовано з LMS -->
+<style>.section-{n} {{ margin: 0 auto; padding: 12px; color: #2c3e50; }}</style>
+<section class="section section-{n}" id="section-{n}" data-index="{n}">
+  <h2>Розділ {n}</h2>
+  <p>Текст розділу {n} з <a href="page_{n}.html">посиланням</a> та <strong>виділенням</strong>.
+     Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt.</p>
+  <img src="images/figure_{n}.png" alt="Рисунок {n}" width="640" height="360">
+  <ul><li>Пункт 1</li><li>Пункт 2</li><li>Пункт 3</li></ul>
+  <script>window.lmsSections = (window.lmsSections || []).concat([{n}]);</script>
+</section>
+'''
+
+
+def synthetic_document(size_bytes):
+    """Створює HTML заданого розміру з типовою для експорту LMS структурою"""
+    parts = ['<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n<title>Синтетичний курс</title>\n',
+             '<script src="vendor/player.js"></script>\n</head>\n<body>\n']
+    size = sum(len(part) for part in parts)
+    n = 0
+    while size < size_bytes:
+        section = SECTION_TEMPLATE.format(n=n)
+        parts.append(section)
+        size += len(section.encode('utf-8'))
+        n += 1
+    parts.append('</body>\n</html>\n')
+    return ''.join(parts)
+
+
+def legacy_rewrite(soup):
+    """Попередня реалізація: окремі проходи та серіалізація для пошуку доменів"""
+    all_styles = []
+    for style in soup.find_all('style'):
+        all_styles.append(style.string or '')
+        style.decompose()
+    if all_styles:
+        head = soup.find('head')
+        if head:
+            style_tag = soup.new_tag('style')
+            style_tag.string = '\n'.join(all_styles)
+            head.append(style_tag)
+
+    all_scripts = []
+    for script in soup.find_all('script'):
+        if not script.has_attr('src'):
+            all_scripts.append(script.string or '')
+        script.decompose()
+    if all_scripts:
+        body = soup.find('body')
+        if body:
+            script_tag = soup.new_tag('script')
+            script_tag.string = '\n'.join(all_scripts)
+            body.append(script_tag)
+
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+
+    head = soup.find('head')
+    if head:
+        meta_csp = soup.new_tag('meta')
+        meta_csp['http-equiv'] = 'Content-Security-Policy'
+        meta_csp['content'] = CONTENT_SECURITY_POLICY
+        head.insert(0, meta_csp)
+
+    return any(domain in str(soup) for domain in PROBLEMATIC_DOMAINS)
+
+
+def single_pass_rewrite(soup):
+    return rewrite_html_document(soup)['problematic_urls']
+
+
+def measure(html_content, rewrite, repeat):
+    """
+    Вимірює найкращий час перетворення та серіалізації (без розбору)
+
+    Returns:
+        tuple: (секунди, серіалізований результат, чи знайдено проблемні домени)
+    """
+    best = None
+    for _ in range(repeat):
+        soup = BeautifulSoup(html_content, 'html.parser')
+        started = time.perf_counter()
+        problematic = rewrite(soup)
+        output = str(soup)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output, problematic
+
+
+def compare(name, html_content, repeat):
+    started = time.perf_counter()
+    BeautifulSoup(html_content, 'html.parser')
+    parse_time = time.perf_counter() - started
+
+    legacy_time, legacy_output, legacy_problematic = measure(html_content, legacy_rewrite, repeat)
+    new_time, new_output, new_problematic = measure(html_content, single_pass_rewrite, repeat)
+    identical = legacy_output == new_output and legacy_problematic == new_problematic
+
+    print(f"{name}: {len(html_content.encode('utf-8')) / 1024 ** 2:.1f} МБ, розбір {parse_time:.2f} с")
+    print(f"  попередня реалізація: {legacy_time:.3f} с")
+    print(f"  один прохід:          {new_time:.3f} с  (прискорення x{legacy_time / new_time:.1f})")
+    print(f"  результати {'однакові' if identical else 'ВІДРІЗНЯЮТЬСЯ'}")
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Порівняння швидкості перетворення HTML')
+    parser.add_argument('--file', action='append', help='HTML-файл для вимірювання (можна вказати кілька)')
+    parser.add_argument('--size-mb', type=float, default=20, help='Розмір синтетичного документа в МБ')
+    parser.add_argument('--repeat', type=int, default=3, help='Кількість повторів (береться найкращий час)')
+    args = parser.parse_args()
+
+    files = args.file or [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.html')]
+    identical = True
+    for path in files:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            identical = compare(os.path.basename(path), f.read(), args.repeat) and identical
+    if args.size_mb > 0:
+        identical = compare("синтетичний документ", synthetic_document(int(args.size_mb * 1024 ** 2)),
+                            args.repeat) and identical
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Порівняння парсерів HTML за швидкістю та точністю
+
+Для кожного встановленого парсера (див. html_parsing.PARSER_BACKENDS) вимірюється час
+розбору та повної обробки документа (rewrite_html_document і серіалізація). Точність
+оцінюється порівнянням з 'html.parser': чи збігаються текст документа, послідовність
+тегів та атрибути. Парсери, що додають обов'язкові теги (html, head, body), не
+вважаються неточними через ці теги.
+
+Використання:
+    python bench_parsers.py --size-mb 5 --repeat 3
+    python bench_parsers.py --file course.html --size-mb 0
+"""
+
+import argparse
+import os
+import re
+import time
+
+from bench_html import synthetic_document
+from html_converter import rewrite_html_document
+from html_parsing import FALLBACK_PARSER, available_parsers, parse_html
+
+# Теги, які парсери додають до документа самостійно
+IMPLIED_TAGS = ('html', 'head', 'body')
+
+
+def document_signature(soup):
+    """
+    Повертає ознаки документа для порівняння точності розбору
+
+    Returns:
+        tuple: (текст зі згорнутими пробілами, послідовність тегів, атрибути тегів)
+    """
+    tags = [tag for tag in soup.find_all(True) if tag.name not in IMPLIED_TAGS]
+    text = re.sub(r'\s+', ' ', soup.get_text()).strip()
+    attributes = [sorted((name, ' '.join(value) if isinstance(value, list) else value)
+                         for name, value in tag.attrs.items()) for tag in tags]
+    return text, [tag.name for tag in tags], attributes
+
+
+def best_time(action, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compare(name, html_content, parsers, repeat):
+    print(f"{name}: {len(html_content.encode('utf-8')) / 1024 ** 2:.1f} МБ")
+    reference = document_signature(parse_html(html_content, FALLBACK_PARSER))
+
+    def process(parser):
+        soup = parse_html(html_content, parser)
+        rewrite_html_document(soup)
+        return str(soup)
+
+    results = {}
+    for parser in parsers:
+        parse_time = best_time(lambda: parse_html(html_content, parser), repeat)
+        total_time = best_time(lambda: process(parser), repeat)
+        signature = document_signature(parse_html(html_content, parser))
+        differences = [label for label, ours, theirs in zip(('текст', 'теги', 'атрибути'), signature, reference)
+                       if ours != theirs]
+        results[parser] = (parse_time, total_time, not differences)
+        fidelity = 'як html.parser' if not differences else f"відрізняється: {', '.join(differences)}"
+        print(f"  {parser:12} розбір {parse_time:7.3f} с, обробка {total_time:7.3f} с, {fidelity}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Порівняння парсерів HTML')
+    parser.add_argument('--file', action='append', help='HTML-файл для вимірювання (можна вказати кілька)')
+    parser.add_argument('--size-mb', type=float, default=5, help='Розмір синтетичного документа в МБ')
+    parser.add_argument('--repeat', type=int, default=3, help='Кількість повторів (береться найкращий час)')
+    args = parser.parse_args()
+
+    parsers = available_parsers()
+    print(f"Доступні парсери: {', '.join(parsers)}")
+
+    documents = []
+    for path in args.file or [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.html')]:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            documents.append((os.path.basename(path), f.read()))
+    if args.size_mb > 0:
+        documents.append(("синтетичний документ", synthetic_document(int(args.size_mb * 1024 ** 2))))
+
+    # Найшвидший парсер, точний на всіх документах
+    totals = {name: 0.0 for name in parsers}
+    for name, html_content in documents:
+        for backend, (_, total_time, exact) in compare(name, html_content, parsers, args.repeat).items():
+            totals[backend] = totals[backend] + total_time if exact and totals[backend] is not None else None
+    candidates = [(total, name) for name, total in totals.items() if total is not None]
+    if candidates:
+        print(f"Рекомендований парсер: {min(candidates)[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Кеш результатів конвертації
+
+Ключ кешу - хеш вмісту вхідного файлу разом з нормалізованими параметрами конвертації,
+тож повторне завантаження того самого файлу з тими самими налаштуваннями віддає готовий
+пакет без конвертації. Пакети зберігаються на диску, найдавніше використані видаляються
+при перевищенні розміру кешу. Коректність кешу спирається на детерміноване пакування
+(див. archive.py).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from checkpoint import file_sha256
+from probe import default_title, probe_file
+from progress import ProgressReporter
+
+# Змінюється разом з форматом пакету, щоб старі записи кешу не використовувались
+CACHE_VERSION = 6
+
+# Параметри, що не впливають на вміст пакету
+IGNORED_OPTIONS = ('progress_callback', 'cancel_token', 'debug', 'work_dir', 'resume', 'probe')
+
+
+def normalize_options(source_path, options, kind=None):
+    """
+    Залишає лише параметри, що впливають на вміст пакету
+
+    Args:
+        source_path (str): Шлях до вхідного файлу
+        options (dict): Параметри конвертації
+        kind (str): Тип вхідного файлу - для визначення назви курсу з метаданих документа
+
+    Returns:
+        dict: Нормалізовані параметри
+    """
+    normalized = {name: value for name, value in options.items()
+                  if name not in IGNORED_OPTIONS and value is not None}
+    # Без назви курсу конвертер бере її з метаданих документа або з імені файлу
+    if not normalized.get('title'):
+        probe = options.get('probe')
+        if probe is None and kind:
+            try:
+                probe = probe_file(source_path, kind)
+            except (ValueError, OSError):
+                probe = None
+        normalized['title'] = default_title(source_path, probe)
+    return normalized
+
+
+def is_cacheable(kind, options):
+    """
+    Перевіряє, чи результат визначається лише вмістом вхідного файлу
+
+    HTML із зовнішніми ресурсами залежить також від файлів поруч з документом,
+    тому такі конвертації не кешуються.
+    """
+    if kind == 'html' and options.get('include_resources', True):
+        return False
+    return True
+
+
+def cache_key(source_path, kind, options):
+    """
+    Обчислює ключ кешу
+
+    Args:
+        source_path (str): Шлях до вхідного файлу
+        kind (str): Тип вхідного файлу ('pdf', 'html' або 'docx')
+        options (dict): Параметри конвертації
+
+    Returns:
+        str: Шістнадцятковий SHA-256
+    """
+    description = json.dumps({
+        'version': CACHE_VERSION,
+        'kind': kind,
+        'source': file_sha256(source_path),
+        'options': normalize_options(source_path, options, kind)
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Дисковий кеш SCORM-пакетів з видаленням найдавніше використаних записів
+
+    Args:
+        root (str): Коренева директорія кешу
+        max_bytes (int): Максимальний загальний розмір кешу в байтах
+    """
+
+    def __init__(self, root=None, max_bytes=1024 ** 3):
+        self.root = root or os.path.join(tempfile.gettempdir(), 'scorm_converter_cache')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, key):
+        """Повертає шлях до запису кешу"""
+        return os.path.join(self.root, key[:2], f"{key}.zip")
+
+    def get(self, key, dest_path):
+        """
+        Копіює пакет з кешу
+
+        Args:
+            key (str): Ключ кешу
+            dest_path (str): Шлях, куди скопіювати пакет
+
+        Returns:
+            bool: True, якщо запис знайдено
+        """
+        path = self.path_for(key)
+        with self._lock:
+            try:
+                # Оновлений час зміни - ознака нещодавнього використання для LRU
+                os.utime(path)
+            except FileNotFoundError:
+                return False
+
+        tmp_path = f"{dest_path}.part"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        return True
+
+    def put(self, key, package_path):
+        """
+        Зберігає пакет у кеші та видаляє найдавніші записи при перевищенні розміру
+
+        Args:
+            key (str): Ключ кешу
+            package_path (str): Шлях до готового пакету
+        """
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Запис через тимчасовий файл - читачі ніколи не бачать неповний пакет
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        os.close(fd)
+        try:
+            shutil.copyfile(package_path, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """
+        Видаляє найдавніше використані записи, поки кеш більший за max_bytes
+
+        Returns:
+            int: Кількість видалених записів
+        """
+        with self._lock:
+            entries = []
+            for root, _, files in os.walk(self.root):
+                for file in files:
+                    if not file.endswith('.zip'):
+                        continue
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            removed = 0
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            return removed
+
+
+def cached_convert(convert, kind, source_path, output_path, cache=None, progress_callback=None, **options):
+    """
+    Виконує конвертацію через кеш результатів
+
+    Args:
+        convert (callable): Функція convert_*_to_scorm
+        kind (str): Тип вхідного файлу ('pdf', 'html' або 'docx')
+        source_path (str): Шлях до вхідного файлу
+        output_path (str): Шлях до вихідного SCORM-пакету
+        cache (ResultCache): Кеш результатів; None - конвертація без кешу
+        progress_callback (callable): Функція, що отримує події прогресу
+        **options: Додаткові аргументи функції конвертації
+
+    Returns:
+        bool: True, якщо пакет створено або взято з кешу
+    """
+    if cache is None or not is_cacheable(kind, options):
+        return convert(source_path, output_path, progress_callback=progress_callback, **options)
+
+    key = cache_key(source_path, kind, options)
+    if cache.get(key, output_path):
+        progress = ProgressReporter(progress_callback)
+        progress.emit('done', "SCORM-пакет взято з кешу", output_path=output_path,
+                      package_bytes=os.path.getsize(output_path), cached=True)
+        return True
+
+    result = convert(source_path, output_path, progress_callback=progress_callback, **options)
+    if result and os.path.exists(output_path):
+        try:
+            cache.put(key, output_path)
+        except OSError as e:
+            # Помилка кешу не повинна впливати на результат конвертації
+            print(f"Не вдалося зберегти пакет у кеші: {e}")
+    return result
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Скасування конвертацій
+
+Токен скасування передається конвертеру і перевіряється між сторінками та між
+копіюваннями ресурсів. Токен спрацьовує при явному скасуванні (наприклад, користувач
+закрив сторінку) або коли вичерпано ліміт часу завдання. Конвертер зупиняється в
+найближчій точці перевірки, видаляє тимчасові файли та частковий пакет і викидає
+ConversionCancelled.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+# Повідомлення за причинами скасування
+CANCEL_MESSAGES = {
+    'cancelled': "Конвертацію скасовано",
+    'abandoned': "Конвертацію скасовано: результат більше ніхто не очікує",
+    'time_budget': "Конвертацію зупинено: вичерпано ліміт часу"
+}
+
+
+class ConversionCancelled(Exception):
+    """
+    Конвертацію скасовано
+
+    Args:
+        reason (str): Причина: 'cancelled', 'abandoned' або 'time_budget'
+    """
+
+    def __init__(self, reason='cancelled'):
+        super().__init__(CANCEL_MESSAGES.get(reason, CANCEL_MESSAGES['cancelled']))
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Ознака скасування конвертації з необов'язковим лімітом часу
+
+    Args:
+        time_budget (float): Ліміт часу в секундах від створення токена; None - без ліміту
+        event: Подія, встановлення якої означає скасування (threading.Event або
+            multiprocessing.Event для скасування з іншого процесу)
+    """
+
+    def __init__(self, time_budget=None, event=None):
+        self._event = event or threading.Event()
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+        self._reason = None
+
+    def cancel(self, reason='cancelled'):
+        """Скасовує конвертацію (перша вказана причина зберігається)"""
+        if self._reason is None:
+            self._reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """True, якщо конвертацію скасовано або вичерпано ліміт часу"""
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel('time_budget')
+            return True
+        return False
+
+    @property
+    def reason(self):
+        """Причина скасування або None"""
+        if self._reason is None and self._event.is_set():
+            return 'cancelled'
+        return self._reason
+
+    def remaining(self):
+        """Повертає залишок ліміту часу в секундах або None, якщо ліміту немає"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """
+        Перевіряє токен
+
+        Raises:
+            ConversionCancelled: Якщо конвертацію скасовано
+        """
+        if self.cancelled:
+            raise ConversionCancelled(self.reason)
+
+
+def check_cancelled(cancel_token):
+    """Перевіряє токен скасування, якщо його передано (див. CancellationToken.check)"""
+    if cancel_token is not None:
+        cancel_token.check()
+
+
+def discard_partial(*paths):
+    """Видаляє тимчасові директорії та частково записані файли скасованої конвертації"""
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Журнал робочої директорії для відновлюваних конвертацій
+
+Журнал (journal.jsonl) записується у робочу директорію конвертації: перший рядок
+описує вхідний файл та параметри, кожен наступний - завершену сторінку з хешем
+її вихідного файлу. Після збою конвертацію можна продовжити, пропустивши сторінки,
+файли яких існують і мають записаний хеш.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+JOURNAL_FILENAME = 'journal.jsonl'
+
+
+class WorkDirError(ValueError):
+    """Вказана директорія не порожня і не є робочою директорією конвертації"""
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Обчислює SHA-256 файлу, читаючи його частинами
+
+    Args:
+        path (str): Шлях до файлу
+        chunk_size (int): Розмір частини для читання
+
+    Returns:
+        str: Хеш у шістнадцятковому вигляді
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionJournal:
+    """
+    Журнал завершених сторінок у робочій директорії конвертації
+
+    Args:
+        work_dir (str): Робоча директорія конвертації
+        source_path (str): Шлях до вхідного файлу
+        options (dict): Параметри, що впливають на вихідні файли (масштаб, розбиття тощо)
+        resume (bool): Продовжити попередню конвертацію замість того, щоб почати з нуля
+
+    Raises:
+        WorkDirError: Якщо робоча директорія не порожня і не містить журналу конвертації
+    """
+
+    def __init__(self, work_dir, source_path, options=None, resume=False):
+        self.work_dir = work_dir
+        self.path = os.path.join(work_dir, JOURNAL_FILENAME)
+        self.header = {
+            'type': 'header',
+            'source_sha256': file_sha256(source_path),
+            'options': options or {}
+        }
+        self.pages = {}
+        self._lock = threading.Lock()
+
+        if resume and self._load():
+            print(f"Відновлення конвертації: у журналі {len(self.pages)} завершених сторінок")
+        else:
+            mismatched = os.path.exists(self.path)
+            self._reset()
+            if resume:
+                reason = "не відповідає вхідному файлу" if mismatched else "відсутній"
+                print(f"Журнал {reason}, конвертація почнеться з початку")
+
+    def _load(self):
+        """Зчитує журнал; повертає False, якщо він відсутній або створений для іншого входу"""
+        if not os.path.exists(self.path):
+            return False
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Останній рядок міг залишитися недописаним під час збою
+                break
+
+        if not entries or entries[0] != self.header:
+            return False
+
+        for entry in entries[1:]:
+            if entry.get('type') == 'page':
+                self.pages[entry['page']] = entry
+        return True
+
+    def _reset(self):
+        """Очищує робочу директорію та починає новий журнал"""
+        if os.path.isdir(self.work_dir) and os.listdir(self.work_dir):
+            # Не видаляємо директорії, які не були створені конвертером
+            if not os.path.exists(self.path):
+                raise WorkDirError(f"Директорія '{self.work_dir}' не порожня і не містить журналу конвертації - "
+                                   f"це не робоча директорія конвертера")
+            shutil.rmtree(self.work_dir)
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.pages = {}
+        self._append(self.header)
+
+    def _append(self, entry):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def completed_pages(self, base_dir):
+        """
+        Повертає сторінки, вихідні файли яких існують і збігаються з хешем у журналі
+
+        Args:
+            base_dir (str): Директорія, відносно якої записані шляхи файлів
+
+        Returns:
+            dict: Номер сторінки -> відносний шлях до файлу
+        """
+        verified = {}
+        for page_num, entry in sorted(self.pages.items()):
+            file_path = os.path.join(base_dir, entry['file'])
+            if os.path.isfile(file_path) and file_sha256(file_path) == entry['sha256']:
+                verified[page_num] = entry['file']
+            else:
+                print(f"  Сторінка {page_num}: вихідний файл відсутній або пошкоджений, буде створено повторно")
+
+        if verified:
+            print(f"Перевірено {len(verified)} раніше створених сторінок")
+        return verified
+
+    def record_page(self, page_num, rel_path, sha256):
+        """
+        Записує завершену сторінку в журнал (безпечно для виклику з кількох потоків)
+
+        Args:
+            page_num (int): Номер сторінки (з 1)
+            rel_path (str): Відносний шлях до вихідного файлу
+            sha256 (str): Хеш вмісту вихідного файлу
+        """
+        entry = {'type': 'page', 'page': page_num, 'file': rel_path, 'sha256': sha256}
+        with self._lock:
+            self._append(entry)
+            self.pages[page_num] = entry
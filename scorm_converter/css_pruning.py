@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Видалення CSS-правил, що не застосовуються до документа
+
+Експортовані з LMS сторінки часто містять сотні кілобайтів CSS фреймворків, з яких
+використовується кілька відсотків. Кожен селектор правила перевіряється на розібраному
+документі: спершу швидко - чи є в документі всі класи та id селектора, потім через
+soupsieve. Селектор, що не знаходить жодного елемента, видаляється зі списку
+селекторів, правило без селекторів - повністю. Порожні @media, @supports тощо теж
+видаляються, інші at-правила (@font-face, @keyframes, @import) залишаються.
+
+Стани, що виникають лише під час роботи сторінки (:hover, :focus, ::before, :checked,
+[open], [aria-expanded] тощо), при перевірці відкидаються. Класи й id, що додаються скриптами, зберігаються, якщо вони
+відповідають шаблонам списку дозволених (DEFAULT_CSS_ALLOWLIST або параметр allowlist)
+або згадуються в тексті скриптів документа. Селектори, які soupsieve не може
+розібрати, залишаються без змін.
+"""
+
+import fnmatch
+import os
+import re
+
+import soupsieve
+
+# Шаблони (fnmatch) класів та id, які скрипти сторінок зазвичай додають динамічно
+DEFAULT_CSS_ALLOWLIST = ('active', 'open', 'show', 'showing', 'hide', 'hidden', 'visible', 'selected',
+                         'disabled', 'collapsed', 'collapsing', 'fade', 'in', 'current', 'completed',
+                         'is-*', 'has-*', 'js-*')
+
+# At-правила, що містять інші правила і теж очищуються
+NESTED_AT_RULES = ('media', 'supports', 'container', 'layer', 'document', '-moz-document')
+
+# Лексеми CSS, важливі для пошуку меж правил; коментарі та рядки пропускаються цілком
+CSS_TOKEN_RE = re.compile(r'/\*.*?(?:\*/|$)|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[{};]', re.DOTALL)
+
+# Псевдокласи та псевдоелементи, що залежать від дій користувача чи стану сторінки
+# (зокрема стани форм і розкриття, на яких побудовані вкладки та акордеони без JavaScript)
+DYNAMIC_PSEUDO_RE = re.compile(
+    r'::?(?:hover|focus|focus-within|focus-visible|active|visited|link|any-link|target|target-within|'
+    r'before|after|first-line|first-letter|placeholder|placeholder-shown|selection|marker|backdrop|'
+    r'autofill|fullscreen|modal|popover-open|user-invalid|user-valid|invalid|valid|'
+    r'checked|indeterminate|disabled|enabled|default|open|closed|read-only|read-write|required|optional|'
+    r'in-range|out-of-range|blank|playing|paused|current|past|future|'
+    r'-(?:webkit|moz|ms|o)-[\w-]+)(?![\w-])(?:\([^()]*\))?|::[\w-]+(?:\([^()]*\))?',
+    re.IGNORECASE)
+
+# Атрибути стану, які змінюють користувач або скрипти (details[open], [aria-expanded] тощо)
+DYNAMIC_ATTRIBUTE_RE = re.compile(
+    r'\[\s*(?:open|checked|selected|disabled|hidden|expanded|aria-[\w-]+|data-state)\s*'
+    r'(?:[~|^$*]?=\s*(?:"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[^\]\s]*)\s*(?:[iIsS]\s*)?)?\]',
+    re.IGNORECASE)
+
+SELECTOR_NAME_RE = re.compile(r'([.#])((?:[\w-]|\\[0-9a-fA-F]{1,6}\s?|\\.)+)')
+CSS_ESCAPE_RE = re.compile(r'\\([0-9a-fA-F]{1,6})\s?|\\(.)', re.DOTALL)
+
+
+def _unescape(name):
+    return CSS_ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 16)) if m.group(1) else m.group(2), name)
+
+
+def split_selectors(prelude):
+    """Розділяє список селекторів за комами верхнього рівня (поза дужками та рядками)"""
+    selectors, depth, quote, start = [], 0, None, 0
+    for position, char in enumerate(prelude):
+        if quote:
+            if char == quote and prelude[position - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:position].strip())
+            start = position + 1
+    selectors.append(prelude[start:].strip())
+    return [selector for selector in selectors if selector]
+
+
+def split_compounds(selector):
+    """
+    Розділяє селектор на складені селектори за комбінаторами верхнього рівня
+
+    Returns:
+        tuple: (список складених селекторів, список комбінаторів між ними: ' ', '>', '+' або '~')
+    """
+    compounds, combinators, current, pending, depth, quote = [], [], [], None, 0, None
+    for char in selector:
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif depth == 0 and (char.isspace() or char in '>+~'):
+            if char in '>+~' or pending is None:
+                pending = char if char in '>+~' else (pending or ' ')
+            continue
+        if pending is not None and current:
+            compounds.append(''.join(current))
+            combinators.append(pending)
+            current = []
+        pending = None
+        current.append(char)
+    if current:
+        compounds.append(''.join(current))
+    return compounds, combinators
+
+
+def _strip_arguments(selector):
+    """Прибирає вміст дужок і атрибутних селекторів ([...] та (...))"""
+    while True:
+        reduced = re.sub(r'\([^()]*\)|\[[^\[\]]*\]', '', selector)
+        if reduced == selector:
+            return selector
+        selector = reduced
+
+
+class _SelectorMatcher:
+    """
+    Перевіряє, чи може селектор застосуватися до документа
+
+    Елементи документа індексуються за класами, id та тегами в порядку документа, тому
+    селектор перевіряється лише на невеликій множині кандидатів: елементах з найрідшою
+    ознакою селектора або їхніх нащадках, а не обходом усього документа.
+    """
+
+    def __init__(self, soup, allowlist, scripts):
+        self.soup = soup
+        self.allowlist = tuple(allowlist or ())
+        self.scripts = '\n'.join(scripts)
+        self.elements = soup.find_all(True)
+        self.index = {}
+        # Для кожного елемента - межа його піддерева в self.elements
+        self.position = {}
+        self.subtree_end = [len(self.elements)] * len(self.elements)
+        stack = []
+        for number, tag in enumerate(self.elements):
+            self.position[id(tag)] = number
+            while stack and self.elements[stack[-1]] is not tag.parent:
+                self.subtree_end[stack.pop()] = number
+            stack.append(number)
+            self.index.setdefault(('', tag.name.lower()), []).append(tag)
+            classes = tag.get('class') or []
+            for name in (classes if isinstance(classes, list) else classes.split()):
+                self.index.setdefault(('.', name), []).append(tag)
+            if isinstance(tag.get('id'), str):
+                self.index.setdefault(('#', tag['id']), []).append(tag)
+        self._known = {}
+        self._ranges_cache = {}
+
+    def _dynamic_name(self, name):
+        """Чи може клас або id з'явитися на сторінці під час роботи скриптів"""
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.allowlist) or name in self.scripts
+
+    def may_match(self, selector):
+        """
+        Перевіряє, чи може селектор знайти елемент документа
+
+        Args:
+            selector (str): Окремий селектор (без ком верхнього рівня)
+
+        Returns:
+            bool: False, лише якщо селектор точно не застосовується
+        """
+        if selector in self._known:
+            return self._known[selector]
+
+        # Класи та id поза дужками (:not(), :is() тощо) обов'язково мають бути на сторінці
+        names = [(kind, _unescape(name)) for kind, name in SELECTOR_NAME_RE.findall(_strip_arguments(selector))]
+        missing = [name for kind, name in names if (kind, name) not in self.index]
+
+        if any(not self._dynamic_name(name) for name in missing):
+            matches = False
+        elif missing:
+            # Динамічних класів у документі немає - перевірити селектор на ньому неможливо
+            matches = True
+        else:
+            static = DYNAMIC_ATTRIBUTE_RE.sub('', DYNAMIC_PSEUDO_RE.sub('', selector)).strip()
+            if not static or static[-1] in '>+~':
+                matches = True
+            else:
+                try:
+                    matches = self._select(static)
+                except Exception:
+                    # Непідтримуваний синтаксис - правило залишаємо
+                    matches = True
+        self._known[selector] = matches
+        return matches
+
+    def _candidates(self, selector):
+        """Повертає елементи, серед яких треба шукати збіг, або None - шукати в усьому документі"""
+        compounds, combinators = split_compounds(selector)
+        best = None
+        for number, compound in enumerate(compounds):
+            stripped = _strip_arguments(compound)
+            keys = [(kind, _unescape(name)) for kind, name in SELECTOR_NAME_RE.findall(stripped)]
+            tag_name = re.match(r'[A-Za-z][\w-]*(?![\w|-])', stripped)
+            if tag_name and '|' not in stripped:
+                keys.append(('', tag_name.group(0).lower()))
+            if number == len(compounds) - 1:
+                mode = 'self'
+            elif all(combinator in ' >' for combinator in combinators[number:]):
+                mode = 'descendants'
+            else:
+                mode = 'siblings'
+            for key in keys:
+                cost, ranges = self._ranges(key, mode)
+                if ranges is not None and (best is None or cost < best[0]):
+                    best = (cost, ranges)
+        return None if best is None else best[1]
+
+    def _ranges(self, key, mode):
+        """
+        Діапазони self.elements, де може бути елемент, що відповідає селектору
+
+        Args:
+            key (tuple): Ознака складеного селектора: ('.', клас), ('#', id) або ('', тег)
+            mode (str): 'self' - складений селектор описує сам елемент, 'descendants' - його
+                предка, 'siblings' - попередній сусідній елемент (чи його предка)
+
+        Returns:
+            tuple: (кількість кандидатів, діапазони) або (None, None)
+        """
+        if (key, mode) in self._ranges_cache:
+            return self._ranges_cache[key, mode]
+        positions = [self.position[id(tag)] for tag in self.index.get(key, [])]
+        if mode == 'self':
+            ranges = [(number, number + 1) for number in positions]
+        elif mode == 'descendants':
+            ranges = [(number + 1, self.subtree_end[number]) for number in positions]
+        else:
+            # Сусідні елементи: шукаємо в піддереві батьківського елемента
+            parents = {self.position.get(id(self.elements[number].parent)) for number in positions}
+            ranges = None if None in parents else [(parent + 1, self.subtree_end[parent]) for parent in parents]
+        result = (None, None) if ranges is None else (sum(end - begin for begin, end in ranges), ranges)
+        self._ranges_cache[key, mode] = result
+        return result
+
+    def _select(self, selector):
+        ranges = self._candidates(selector)
+        if ranges is None:
+            return soupsieve.select_one(selector, self.soup) is not None
+        compiled = soupsieve.compile(selector)
+        return any(compiled.match(self.elements[number])
+                   for begin, end in ranges for number in range(begin, end))
+
+
+def css_statements(css_text):
+    """
+    Розбиває CSS на інструкції верхнього рівня
+
+    Yields:
+        tuple: (prelude, body або None для інструкцій на кшталт @import, текст інструкції)
+    """
+    depth, start, body_start = 0, 0, None
+    for match in CSS_TOKEN_RE.finditer(css_text):
+        token = match.group(0)
+        if token == '{':
+            if depth == 0:
+                body_start = match.end()
+            depth += 1
+        elif token == '}':
+            if depth == 0:
+                continue
+            depth -= 1
+            if depth == 0:
+                yield css_text[start:body_start - 1], css_text[body_start:match.start()], css_text[start:match.end()]
+                start = match.end()
+        elif token == ';' and depth == 0:
+            yield css_text[start:match.start()], None, css_text[start:match.end()]
+            start = match.end()
+    if css_text[start:].strip():
+        yield css_text[start:], None, css_text[start:]
+
+
+def strip_css_comments(text):
+    """Видаляє коментарі з тексту CSS (рядки не змінюються)"""
+    return CSS_TOKEN_RE.sub(lambda m: '' if m.group(0).startswith('/*') else m.group(0), text)
+
+
+def prune_stylesheet(css_text, matcher):
+    """
+    Видаляє з CSS правила, що не застосовуються до документа
+
+    Returns:
+        tuple: (новий текст CSS, кількість видалених правил)
+    """
+    parts, removed = [], 0
+    for prelude, body, text in css_statements(css_text):
+        head = strip_css_comments(prelude).strip()
+        if body is None or not head:
+            parts.append(text)
+            continue
+
+        if head.startswith('@'):
+            name = re.match(r'@([\w-]*)', head).group(1).lower()
+            if name not in NESTED_AT_RULES:
+                parts.append(text)
+                continue
+            new_body, nested_removed = prune_stylesheet(body, matcher)
+            removed += nested_removed
+            if not strip_css_comments(new_body).strip():
+                removed += 1
+                continue
+            parts.append(text if new_body == body else f"{prelude}{{{new_body}}}")
+            continue
+
+        selectors = split_selectors(head)
+        kept = [selector for selector in selectors if matcher.may_match(selector)]
+        if not kept:
+            removed += 1
+            # Пробіли перед правилом зберігаються, щоб не склеювати сусідні інструкції
+            leading = text[:len(text) - len(text.lstrip())]
+            parts.append(leading if '\n' in leading else '')
+            continue
+        if len(kept) < len(selectors):
+            leading = prelude[:len(prelude) - len(prelude.lstrip())]
+            parts.append(f"{leading}{', '.join(kept)} {{{body}}}")
+        else:
+            parts.append(text)
+    return ''.join(parts), removed
+
+
+def prune_unused_css(soup, resources_dir, resources, allowlist=DEFAULT_CSS_ALLOWLIST):
+    """
+    Очищує блоки <style> документа та таблиці стилів пакету від правил, що не застосовуються
+
+    Args:
+        soup (BeautifulSoup): Документ; змінюється на місці
+        resources_dir (str): Директорія ресурсів пакету
+        resources (dict): Файли пакету за категоріями (див. process_html_file)
+        allowlist (iterable): Шаблони (fnmatch) класів та id, правила з якими не видаляються
+
+    Returns:
+        dict: Звіт: 'css_rules_removed', 'css_bytes_before', 'css_bytes_removed'
+    """
+    scripts = [script.string for script in soup.find_all('script') if script.string]
+    for relative in resources.get('js', []):
+        with open(os.path.join(resources_dir, relative), 'r', encoding='utf-8', errors='ignore') as f:
+            scripts.append(f.read())
+    matcher = _SelectorMatcher(soup, allowlist, scripts)
+    report = {'css_rules_removed': 0, 'css_bytes_before': 0, 'css_bytes_removed': 0}
+
+    def prune(css_text):
+        new_text, removed = prune_stylesheet(css_text, matcher)
+        before = len(css_text.encode('utf-8', 'surrogateescape'))
+        report['css_rules_removed'] += removed
+        report['css_bytes_before'] += before
+        report['css_bytes_removed'] += before - len(new_text.encode('utf-8', 'surrogateescape'))
+        return new_text
+
+    for style in soup.find_all('style'):
+        if style.string:
+            new_text = prune(style.string)
+            if new_text != style.string:
+                style.string = new_text
+
+    for relative in resources.get('css', []):
+        path = os.path.join(resources_dir, relative)
+        with open(path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+            css_text = f.read()
+        new_text = prune(css_text)
+        if new_text != css_text:
+            with open(path, 'w', encoding='utf-8', errors='surrogateescape') as f:
+                f.write(new_text)
+    return report
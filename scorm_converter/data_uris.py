@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Винесення вбудованих data URI з HTML-документа в окремі файли
+
+Експорти "Зберегти як HTML" з Google Docs та Word вбудовують кожне зображення як
+base64 data URI, часто одне й те саме зображення десятки разів. Браузер розбирає такий
+документ у iframe LMS значно довше, ніж документ з посиланнями на файли. Data URI з
+атрибутів ресурсів (див. html_resources.URL_ATTRIBUTES), srcset, атрибутів style та
+блоків <style> декодуються у файли EMBEDDED_DIR, названі за хешем вмісту, - однаковий
+вміст зберігається один раз.
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+from urllib.parse import unquote_to_bytes
+
+from html_resources import resource_bucket, rewrite_tag_urls
+
+# Куди кладуться файли з вбудованих data URI (відносно директорії ресурсів)
+EMBEDDED_DIR = '_embedded'
+
+# Розширення файлів за типом вмісту data URI; інші типи залишаються вбудованими
+EMBEDDED_EXTENSIONS = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg',
+    'image/gif': '.gif',
+    'image/svg+xml': '.svg',
+    'image/webp': '.webp',
+    'image/bmp': '.bmp',
+    'image/x-icon': '.ico',
+    'image/vnd.microsoft.icon': '.ico',
+    'image/avif': '.avif',
+    'font/woff': '.woff',
+    'font/woff2': '.woff2',
+    'font/ttf': '.ttf',
+    'font/otf': '.otf',
+    'application/font-woff': '.woff',
+    'application/x-font-woff': '.woff',
+    'application/x-font-ttf': '.ttf',
+    'audio/mpeg': '.mp3',
+    'audio/ogg': '.ogg',
+    'audio/wav': '.wav',
+    'video/mp4': '.mp4',
+    'video/webm': '.webm'
+}
+
+DATA_URI_RE = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?P<params>(?:;[^,;]*)*?)(?P<base64>;base64)?,'
+                         r'(?P<data>.*)$', re.IGNORECASE | re.DOTALL)
+
+
+def decode_data_uri(url):
+    """
+    Декодує data URI
+
+    Args:
+        url (str): Посилання
+
+    Returns:
+        tuple: (тип вмісту в нижньому регістрі, байти) або None, якщо це не data URI
+            чи його не вдалося декодувати
+    """
+    match = DATA_URI_RE.match(url.strip())
+    if not match:
+        return None
+    mime_type = (match.group('mime') or 'text/plain').lower()
+    try:
+        if match.group('base64'):
+            # Пробіли та переноси рядків у base64 з експортів допустимі
+            data = base64.b64decode(re.sub(r'\s+', '', unquote_to_bytes(match.group('data')).decode('ascii')),
+                                    validate=True)
+        else:
+            data = unquote_to_bytes(match.group('data'))
+    except (binascii.Error, ValueError):
+        return None
+    return mime_type, data
+
+
+def extract_data_uris(soup, resources_dir):
+    """
+    Замінює data URI документа посиланнями на файли в EMBEDDED_DIR
+
+    Документ має лежати в корені директорії ресурсів.
+
+    Args:
+        soup (BeautifulSoup): Документ; змінюється на місці
+        resources_dir (str): Директорія ресурсів пакету
+
+    Returns:
+        tuple: (шляхи створених файлів відносно директорії ресурсів за категоріями,
+            звіт: 'embedded_uris' - кількість замінених data URI, 'embedded_files' - кількість
+            різних файлів, 'embedded_bytes_removed' - на скільки символів скоротився документ)
+    """
+    files = {}
+    report = {'embedded_uris': 0, 'embedded_files': 0, 'embedded_bytes_removed': 0}
+
+    def extract(url):
+        if not url[:5].lower() == 'data:':
+            return url
+        decoded = decode_data_uri(url)
+        if decoded is None or decoded[0] not in EMBEDDED_EXTENSIONS:
+            return url
+        mime_type, data = decoded
+        relative = f"{EMBEDDED_DIR}/{hashlib.sha256(data).hexdigest()[:16]}{EMBEDDED_EXTENSIONS[mime_type]}"
+        if relative not in files:
+            dest = os.path.join(resources_dir, *relative.split('/'))
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with open(dest, 'wb') as f:
+                f.write(data)
+            files[relative] = len(data)
+        report['embedded_uris'] += 1
+        report['embedded_bytes_removed'] += len(url) - len(relative)
+        return relative
+
+    for tag in soup.find_all(True):
+        rewrite_tag_urls(tag, extract)
+
+    buckets = {}
+    for relative in sorted(files):
+        buckets.setdefault(resource_bucket(relative), []).append(relative)
+    report['embedded_files'] = len(files)
+    return buckets, report
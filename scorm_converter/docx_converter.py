@@ -4,27 +4,44 @@
 import os
 import tempfile
 import shutil
-import zipfile
 import xml.etree.ElementTree as ET
 import xml.dom.minidom as minidom
 from datetime import datetime
-from uuid import uuid4
+from archive import content_course_id, write_scorm_zip
+from cancellation import ConversionCancelled, check_cancelled, discard_partial
+from minify import DEFAULT_MINIFY_MODE, minify_package
+from probe import default_title, probe_docx
+from progress import ProgressReporter
 
 
-def convert_docx_to_scorm(docx_path, output_path, title=None, scorm_version='2004'):
+def convert_docx_to_scorm(docx_path, output_path, title=None, scorm_version='2004', progress_callback=None,
+                          cancel_token=None, probe=None, minify=DEFAULT_MINIFY_MODE):
     """
     Конвертує DOCX-файл у SCORM-пакет
 
     Args:
         docx_path (str): Шлях до DOCX-файлу
         output_path (str): Шлях для збереження SCORM-пакету (.zip)
-        title (str): Назва курсу (за замовчуванням - назва DOCX-файлу)
+        title (str): Назва курсу (за замовчуванням - з властивостей документа або назва DOCX-файлу)
         scorm_version (str): Версія SCORM ('1.2' або '2004')
+        progress_callback (callable): Отримувач подій прогресу (див. progress.py);
+            за замовчуванням повідомлення друкуються в консоль
+        cancel_token (CancellationToken): Токен скасування або ліміту часу; перевіряється між
+            етапами та між файлами пакету
+        probe (dict): Готовий результат проби файлу (див. probe.probe_docx); інакше проба
+            виконується для визначення назви курсу
+        minify (str): Режим мініфікації CSS, JavaScript та HTML пакету (див. minify.MINIFY_MODES)
 
     Returns:
         bool: True у разі успіху, False - у разі помилки
+
+    Raises:
+        ConversionCancelled: Якщо конвертацію скасовано - тимчасові файли та частковий пакет видаляються
     """
+    progress = ProgressReporter(progress_callback)
     try:
+        progress.emit('start', f"Конвертація DOCX-файлу: {docx_path}")
+
         # Створення тимчасової директорії для роботи
         temp_dir = tempfile.mkdtemp()
         content_dir = os.path.join(temp_dir, 'content')
@@ -32,15 +49,20 @@ def convert_docx_to_scorm(docx_path, output_path, title=None, scorm_version='200
 
         # Базові метадані
         if not title:
-            title = os.path.splitext(os.path.basename(docx_path))[0]
+            try:
+                title = default_title(docx_path, probe or probe_docx(docx_path))
+            except (ValueError, OSError):
+                title = default_title(docx_path)
 
-        # Генерація ідентифікатора курсу
-        course_id = str(uuid4())
+        # Ідентифікатор курсу виводиться з вмісту, щоб пакет був відтворюваним
+        course_id = content_course_id(docx_path, title=title, scorm_version=scorm_version, minify=minify)
 
         # Копіювання DOCX-файлу
         docx_filename = os.path.basename(docx_path)
         docx_dest_path = os.path.join(content_dir, docx_filename)
         shutil.copyfile(docx_path, docx_dest_path)
+        progress.emit('resources', f"Скопійовано документ {docx_filename}",
+                      bytes_written=os.path.getsize(docx_dest_path))
 
         # Створення простої HTML-сторінки для відображення DOCX
         html_content = create_simple_viewer(docx_filename, title)
@@ -51,25 +73,28 @@ def convert_docx_to_scorm(docx_path, output_path, title=None, scorm_version='200
             f.write(html_content)
 
         # Створення маніфесту SCORM
+        check_cancelled(cancel_token)
+        progress.emit('package', "Створення SCORM-структури...")
         create_scorm_manifest(content_dir, title, docx_filename, course_id, scorm_version)
 
         # Додавання JavaScript для SCORM API
         create_scorm_api_js(content_dir, scorm_version)
+        minify_package(content_dir, minify, cancel_token, progress)
 
         # Створення ZIP-архіву
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(content_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    zipf.write(
-                        file_path,
-                        os.path.relpath(file_path, content_dir)
-                    )
+        progress.emit('zip', "Створення ZIP-архіву...")
+        write_scorm_zip(content_dir, output_path, cancel_token)
 
         # Очищення тимчасових файлів
         shutil.rmtree(temp_dir)
 
+        progress.emit('done', f"SCORM-пакет успішно створено: {output_path}",
+                      output_path=output_path, package_bytes=os.path.getsize(output_path))
         return True
+    except ConversionCancelled as e:
+        print(e)
+        discard_partial(output_path, locals().get('temp_dir'))
+        raise
     except Exception as e:
         print(f"Помилка при конвертації DOCX в SCORM: {e}")
         # Спроба очистити тимчасові файли у випадку помилки
@@ -5,19 +5,49 @@ import argparse
 import os
 import tempfile
 import shutil
-import zipfile
 import xml.etree.ElementTree as ET
 import xml.dom.minidom as minidom
 from datetime import datetime
-from uuid import uuid4
 import re
 from pathlib import Path
 from bs4 import BeautifulSoup
+from bs4.element import Comment, NavigableString, Tag
 import base64
 import sys
-
-
-def convert_html_to_scorm(html_path, output_path=None, title=None, scorm_version='2004', include_resources=True):
+from archive import content_course_id, write_scorm_zip
+from asset_inlining import INLINE_BUDGET_BYTES, INLINE_MAX_BYTES, inline_assets
+from cancellation import ConversionCancelled, check_cancelled, discard_partial
+from css_pruning import DEFAULT_CSS_ALLOWLIST, prune_unused_css
+from data_uris import extract_data_uris
+from html_parsing import parse_html
+from html_resources import ResourceCrawler, is_local_reference
+from image_optimization import recompress_images
+from lazy_media import apply_lazy_loading
+from minify import DEFAULT_MINIFY_MODE, minify_package
+from probe import default_title, probe_html
+from progress import ProgressReporter
+
+# Проблемні домени, які можуть потребувати AWS підписування
+PROBLEMATIC_DOMAINS = [
+    'cloudflare', 'cloudflarestorage', 'r2.',
+    'amazonaws', 's3.', 'cloudfront',
+    'storage.googleapis'
+]
+PROBLEMATIC_DOMAINS_RE = re.compile('|'.join(re.escape(domain) for domain in PROBLEMATIC_DOMAINS))
+
+# Політика безпеки контенту, що блокує зовнішні запити зі сторінки курсу
+CONTENT_SECURITY_POLICY = ("default-src 'self'; script-src 'self' 'unsafe-inline'; "
+                           "style-src 'self' 'unsafe-inline'; img-src 'self' data:;")
+
+# З якої кількості видалених дітей одного батька дешевше перебудувати список його дітей
+BULK_EXTRACT_MIN = 32
+
+
+def convert_html_to_scorm(html_path, output_path=None, title=None, scorm_version='2004', include_resources=True,
+                          progress_callback=None, cancel_token=None, parser=None, probe=None,
+                          inline_max_bytes=INLINE_MAX_BYTES, inline_budget_bytes=INLINE_BUDGET_BYTES,
+                          prune_css=True, css_allowlist=DEFAULT_CSS_ALLOWLIST, minify=DEFAULT_MINIFY_MODE,
+                          optimize_images=True, lazy_loading=True, allow_external_resources=False):
     """
     Конвертує HTML-файл та по в'язані ресурси у SCORM-пакет
 
@@ -27,10 +57,35 @@ def convert_html_to_scorm(html_path, output_path=None, title=None, scorm_version
         title (str): Назва курсу (за замовчуванням - назва HTML-файлу)
         scorm_version (str): Версія SCORM ('1.2' або '2004')
         include_resources (bool): Чи включати пов'язані ресурси (CSS, зображення тощо)
+        progress_callback (callable): Отримувач подій прогресу (див. progress.py);
+            за замовчуванням повідомлення друкуються в консоль
+        cancel_token (CancellationToken): Токен скасування або ліміту часу; перевіряється між
+            етапами та між файлами пакету
+        parser (str): Парсер HTML (див. html_parsing.resolve_parser)
+        probe (dict): Готовий результат проби файлу (див. probe.probe_html); інакше проба
+            виконується для визначення назви курсу
+        inline_max_bytes (int): Ресурси до цього розміру вбудовуються в документ (див.
+            asset_inlining.inline_assets); 0 - не вбудовувати
+        inline_budget_bytes (int): Загальний обсяг вбудованих у документ ресурсів
+        prune_css (bool): Чи видаляти CSS-правила, що не застосовуються до документа
+            (див. css_pruning.prune_unused_css)
+        css_allowlist (iterable): Шаблони класів та id, що додаються скриптами - правила
+            з ними не видаляються
+        minify (str): Режим мініфікації CSS, JavaScript та HTML пакету (див. minify.MINIFY_MODES)
+        optimize_images (bool): Чи зменшувати зображення до розміру відображення та перекодовувати
+            їх (див. image_optimization.recompress_images)
+        lazy_loading (bool): Чи додавати відкладене завантаження медіа нижче першого екрана
+            та розміри зображень (див. lazy_media.apply_lazy_loading)
+        allow_external_resources (bool): Дозволити ресурси поза директорією документа - лише для
+            довірених вхідних файлів (див. html_resources.ResourceCrawler)
 
     Returns:
         bool: True у разі успіху, False - у разі помилки
+
+    Raises:
+        ConversionCancelled: Якщо конвертацію скасовано - тимчасові файли та частковий пакет видаляються
     """
+    progress = ProgressReporter(progress_callback)
     try:
         # Перевірка існування HTML-файлу
         if not os.path.exists(html_path):
@@ -43,20 +98,14 @@ def convert_html_to_scorm(html_path, output_path=None, title=None, scorm_version
             output_name = os.path.splitext(os.path.basename(html_path))[0]
             output_path = os.path.join(output_dir, f"{output_name}_scorm.zip")
 
-        # Визначення назви курсу, якщо не вказано
-        if not title:
-            title = os.path.splitext(os.path.basename(html_path))[0]
+        progress.emit('start', f"Конвертація HTML-файлу: {html_path}")
 
-            # Спроба отримати заголовок з HTML-файлу
+        # Визначення назви курсу з <title>, якщо не вказано (читається лише заголовок документа)
+        if not title:
             try:
-                with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    html_content = f.read()
-                soup = BeautifulSoup(html_content, 'html.parser')
-                title_tag = soup.find('title')
-                if title_tag and title_tag.string:
-                    title = title_tag.string.strip()
-            except:
-                pass
+                title = default_title(html_path, probe or probe_html(html_path))
+            except OSError:
+                title = default_title(html_path)
 
         # Створення тимчасової директорії для роботи
         temp_dir = tempfile.mkdtemp()
@@ -67,17 +116,27 @@ def convert_html_to_scorm(html_path, output_path=None, title=None, scorm_version
         os.makedirs(content_dir, exist_ok=True)
         os.makedirs(resources_dir, exist_ok=True)
 
-        # Генерація ідентифікатора курсу
-        course_id = str(uuid4())
+        # Ідентифікатор курсу виводиться з вмісту, щоб пакет був відтворюваним
+        course_id = content_course_id(html_path, title=title, scorm_version=scorm_version,
+                                      include_resources=include_resources, inline_max_bytes=inline_max_bytes,
+                                      inline_budget_bytes=inline_budget_bytes, prune_css=prune_css,
+                                      css_allowlist=list(css_allowlist or ()), minify=minify,
+                                      optimize_images=optimize_images, lazy_loading=lazy_loading,
+                                      allow_external_resources=allow_external_resources)
 
         # Копіювання HTML-файлу та пов'язаних ресурсів
-        print("Обробка HTML-файлу та копіювання ресурсів...")
-        resource_data = process_html_file(html_path, content_dir, resources_dir, include_resources)
+        progress.emit('parse', "Обробка HTML-файлу та копіювання ресурсів...")
+        resource_data = process_html_file(html_path, content_dir, resources_dir, include_resources, parser,
+                                          cancel_token=cancel_token, progress=progress,
+                                          inline_max_bytes=inline_max_bytes, inline_budget_bytes=inline_budget_bytes,
+                                          prune_css=prune_css, css_allowlist=css_allowlist,
+                                          optimize_images=optimize_images, lazy_loading=lazy_loading,
+                                          allow_external_resources=allow_external_resources)
 
-        # Перевірка структури даних resources
-        print("Отримані ресурси:")
-        for key, value in resource_data.items():
-            print(f"{key}: {value}")
+        progress.emit('resources', "Файлів пакету: " + ', '.join(f"{key} - {len(files)}"
+                                                              for key, files in resource_data.items() if files))
+
+        check_cancelled(cancel_token)
 
         # Перевірка, чи є html ресурси
         if not resource_data['html']:
@@ -85,34 +144,36 @@ def convert_html_to_scorm(html_path, output_path=None, title=None, scorm_version
             return False
 
         # Створення обгортки для SCORM
-        print("Створення SCORM-обгортки...")
+        progress.emit('package', "Створення SCORM-обгортки...")
         index_path = create_scorm_wrapper(content_dir, title, os.path.basename(html_path), resource_data['html'])
 
         # Створення JavaScript для SCORM API
-        print("Створення JavaScript для SCORM API...")
+        progress.emit('package', "Створення JavaScript для SCORM API...")
         create_scorm_api_js(content_dir, scorm_version)
 
         # Створення маніфесту SCORM
-        print("Створення маніфесту SCORM...")
-        create_scorm_manifest(content_dir, title, resource_data, index_path, course_id, scorm_version)
+        progress.emit('package', "Створення маніфесту SCORM...")
+        create_scorm_manifest(content_dir, title, resource_data, index_path, course_id, scorm_version, progress)
+
+        # Мініфікація CSS, JavaScript та HTML пакету
+        minify_package(content_dir, minify, cancel_token, progress)
 
         # Створення ZIP-архіву
-        print("Створення ZIP-архіву...")
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(content_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    zipf.write(
-                        file_path,
-                        os.path.relpath(file_path, content_dir)
-                    )
+        check_cancelled(cancel_token)
+        progress.emit('zip', "Створення ZIP-архіву...")
+        write_scorm_zip(content_dir, output_path, cancel_token)
 
         # Очищення тимчасових файлів
         shutil.rmtree(temp_dir)
 
-        print(f"SCORM-пакет успішно створено: {output_path}")
+        progress.emit('done', f"SCORM-пакет успішно створено: {output_path}",
+                      output_path=output_path, package_bytes=os.path.getsize(output_path))
         return True
 
+    except ConversionCancelled as e:
+        print(e)
+        discard_partial(output_path, locals().get('temp_dir'))
+        raise
     except Exception as e:
         print(f"Помилка при конвертації HTML в SCORM: {e}")
         import traceback
@@ -126,14 +187,44 @@ def convert_html_to_scorm(html_path, output_path=None, title=None, scorm_version
         return False
 
 
-def process_html_file(html_path, content_dir, resources_dir, include_resources=True):
+def process_html_file(html_path, content_dir, resources_dir, include_resources=True, parser=None,
+                      cancel_token=None, progress=None, inline_max_bytes=INLINE_MAX_BYTES,
+                      inline_budget_bytes=INLINE_BUDGET_BYTES, prune_css=True, css_allowlist=DEFAULT_CSS_ALLOWLIST,
+                      optimize_images=True, lazy_loading=True, allow_external_resources=False):
     """
     Обробляє HTML-файл та копіює пов'язані ресурси, з можливістю додавання підписування AWS для зовнішніх ресурсів
+
+    Вбудовані в документ data URI виносяться в окремі файли (див. data_uris.extract_data_uris).
+
+    Args:
+        html_path (str): Шлях до HTML-файлу
+        content_dir (str): Директорія контенту пакету
+        resources_dir (str): Директорія ресурсів пакету
+        include_resources (bool): Чи копіювати локальні ресурси (див. html_resources.ResourceCrawler)
+        parser (str): Парсер HTML (див. html_parsing.resolve_parser)
+        cancel_token (CancellationToken): Токен скасування; перевіряється між копіюваннями ресурсів
+        progress (ProgressReporter): Отримувач подій прогресу розбору, копіювання ресурсів і звітів
+            про винесення data URI, очищення CSS, оптимізацію зображень, відкладене
+            завантаження та вбудовування (події з полем 'report')
+        inline_max_bytes (int): Ресурси до цього розміру вбудовуються в документ; 0 - не вбудовувати
+        inline_budget_bytes (int): Загальний обсяг вбудованих у документ ресурсів
+        prune_css (bool): Чи видаляти CSS-правила, що не застосовуються до документа
+        css_allowlist (iterable): Шаблони класів та id, правила з якими не видаляються
+        optimize_images (bool): Чи зменшувати та перекодовувати зображення пакету
+        lazy_loading (bool): Чи додавати loading="lazy" медіа нижче першого екрана та
+            width/height зображенням без розмірів
+        allow_external_resources (bool): Дозволити ресурси поза директорією документа
+
+    Returns:
+        dict: Шляхи файлів відносно директорії ресурсів за категоріями
+            ('html', 'css', 'js', 'images', 'fonts', 'other')
+
+    Raises:
+        ConversionCancelled: Якщо конвертацію скасовано
     """
-    print(f"Почато обробку HTML-файлу: {html_path}")
-    print(f"Директорія контенту: {content_dir}")
-    print(f"Директорія ресурсів: {resources_dir}")
-    print(f"Включення ресурсів: {include_resources}")
+    progress = progress or ProgressReporter()
+    progress.emit('parse', f"Почато обробку HTML-файлу: {html_path} (включення ресурсів: "
+                           f"{'так' if include_resources else 'ні'})")
 
     resources = {
         'html': [],
@@ -147,81 +238,89 @@ def process_html_file(html_path, content_dir, resources_dir, include_resources=T
     # Копіювання HTML-файлу
     html_filename = os.path.basename(html_path)
     html_dest = os.path.join(resources_dir, html_filename)
-    print(f"Копіювання HTML-файлу з {html_path} в {html_dest}")
-
-    # Проблемні домени, які можуть потребувати AWS підписування
-    problematic_domains = [
-        'cloudflare', 'cloudflarestorage', 'r2.',
-        'amazonaws', 's3.', 'cloudfront',
-        'storage.googleapis'
-    ]
 
     try:
         # Читаємо HTML-вміст
         with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
             html_content = f.read()
-        print(f"Успішно прочитано HTML-файл довжиною {len(html_content)} символів")
+        progress.emit('parse', f"Прочитано HTML-файл довжиною {len(html_content)} символів")
 
         # Перевірка на наявність проблемних зовнішніх посилань перед обробкою
-        for domain in problematic_domains:
+        for domain in PROBLEMATIC_DOMAINS:
             if domain in html_content:
-                print(f"УВАГА! Знайдено потенційно проблемне посилання на {domain} у HTML")
+                progress.emit('parse', f"УВАГА! Знайдено потенційно проблемне посилання на {domain} у HTML")
 
         # Парсимо HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        print("HTML успішно розібрано за допомогою BeautifulSoup")
-
-
-        # Інтегруємо всі стилі в head
-        all_styles = []
-        for style in soup.find_all('style'):
-            all_styles.append(style.string or '')
-            style.decompose()
-
-        # Створюємо новий style тег
-        if all_styles:
-            head = soup.find('head')
-            if head:
-                style_tag = soup.new_tag('style')
-                style_tag.string = '\n'.join(all_styles)
-                head.append(style_tag)
-                print("Всі стилі об'єднано в один тег <style> у <head>")
-
-        # Інтегруємо всі скрипти в кінець body
-        all_scripts = []
-        for script in soup.find_all('script'):
-            if not script.has_attr('src'):  # збираємо лише інлайн скрипти
-                all_scripts.append(script.string or '')
-            script.decompose()
-
-        # Створюємо новий script тег
-        if all_scripts:
-            body = soup.find('body')
-            if body:
-                script_tag = soup.new_tag('script')
-                script_tag.string = '\n'.join(all_scripts)
-                body.append(script_tag)
-                print("Всі скрипти об'єднано в один тег <script> в кінці <body>")
-
-        # Видаляємо коментарі
-        from bs4.element import Comment
-        for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-            comment.extract()
-            print("Видалено HTML-коментар")
-
-        # Додаємо meta тег для запобігання зовнішніх запитів
-        head = soup.find('head')
-        if head:
-            meta_csp = soup.new_tag('meta')
-            meta_csp['http-equiv'] = 'Content-Security-Policy'
-            meta_csp[
-                'content'] = "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; img-src 'self' data:;"
-            head.insert(0, meta_csp)
-            print("Додано Content-Security-Policy для захисту від зовнішніх запитів")
-
-        # В функції process_html_file перед збереженням HTML
+        soup = parse_html(html_content, parser)
+        progress.emit('parse', f"HTML успішно розібрано за допомогою BeautifulSoup ({soup.builder.NAME})")
+
+        # Усі перетворення виконуються за один обхід дерева
+        stats = rewrite_html_document(soup, keep_local_scripts=include_resources)
+        if stats['styles']:
+            progress.emit('parse', "Всі стилі об'єднано в один тег <style> у <head>")
+        if stats['scripts']:
+            progress.emit('parse', "Всі скрипти об'єднано в один тег <script> в кінці <body>")
+        if stats['comments']:
+            progress.emit('parse', f"Видалено HTML-коментарів: {stats['comments']}")
+        if stats['csp']:
+            progress.emit('parse', "Додано Content-Security-Policy для захисту від зовнішніх запитів")
+
+        # Копіюємо локальні ресурси та переписуємо посилання на них
+        if include_resources:
+            crawler = ResourceCrawler(html_path, resources_dir, cancel_token=cancel_token, progress=progress,
+                                      allow_external=allow_external_resources)
+            for res_type, files in crawler.crawl(soup).items():
+                resources[res_type].extend(files)
+            progress.emit('resources', f"Скопійовано локальних ресурсів: "
+                                       f"{sum(len(files) for files in resources.values())}")
+
+        # Вбудовані data URI (експорти Google Docs і Word) виносимо в окремі файли без повторів
+        embedded, report = extract_data_uris(soup, resources_dir)
+        for res_type, files in embedded.items():
+            resources[res_type].extend(files)
+        if report['embedded_uris']:
+            progress.emit('resources', f"Винесено вбудованих data URI: {report['embedded_uris']} "
+                                       f"у файлів: {report['embedded_files']} (документ менший на "
+                                       f"{report['embedded_bytes_removed'] / 1024:.0f} КБ)",
+                          current=1, total=1, report=report)
+
+        # Правила CSS фреймворків, що не застосовуються до документа, видаляємо до вбудовування
+        if prune_css:
+            report = prune_unused_css(soup, resources_dir, resources, css_allowlist)
+            if report['css_rules_removed']:
+                progress.emit('resources', f"Видалено CSS-правил, що не застосовуються: "
+                                           f"{report['css_rules_removed']} ({report['css_bytes_removed'] / 1024:.1f} "
+                                           f"з {report['css_bytes_before'] / 1024:.1f} КБ)",
+                              current=1, total=1, report=report)
+
+        # Зображення зменшуємо до розміру відображення до вбудовування - дрібніші файли вбудовуються
+        if optimize_images:
+            report = recompress_images(soup, resources_dir, resources, cancel_token=cancel_token)
+            if report['images_optimized']:
+                progress.emit('resources', f"Оптимізовано зображень: {report['images_optimized']} "
+                                           f"(зменшено: {report['images_resized']}, змінено формат: "
+                                           f"{report['images_converted']}), заощаджено "
+                                           f"{report['image_bytes_saved'] / 1024:.0f} КБ",
+                              current=1, total=1, report=report)
+
+        # Розміри беруться з уже оптимізованих файлів, доки посилання ще ведуть на файли пакету
+        if lazy_loading:
+            report = apply_lazy_loading(soup, resources_dir)
+            if report['lazy_media'] or report['sized_images']:
+                progress.emit('resources', f"Відкладене завантаження медіа: {report['lazy_media']}, "
+                                           f"додано розміри зображень: {report['sized_images']}",
+                              current=1, total=1, report=report)
+
+        if include_resources:
+            # Дрібні таблиці стилів і зображення вбудовуємо, щоб зменшити кількість запитів до LMS
+            report = inline_assets(soup, resources_dir, resources, inline_max_bytes, inline_budget_bytes)
+            progress.emit('resources', f"Запитів до ресурсів: {report['requests_before']} -> "
+                                       f"{report['requests_after']} (вбудовано таблиць стилів: "
+                                       f"{report['inlined_stylesheets']}, зображень: {report['inlined_images']})",
+                          current=1, total=1, report=report)
+
         # Додаємо AWS Signature скрипт, якщо в HTML є посилання на cloudflare/s3
-        if any(domain in str(soup) for domain in problematic_domains):
+        if stats['problematic_urls']:
             access_key = "YOUR_ACCESS_KEY"
             secret_key = "YOUR_SECRET_KEY"
             region = "auto"  # Для Cloudflare R2 зазвичай використовується 'auto'
@@ -229,17 +328,20 @@ def process_html_file(html_path, content_dir, resources_dir, include_resources=T
 
             # Додаємо скрипт для підписування
             soup = add_aws_signature_script(soup, access_key, secret_key, region, service)
-            print("Додано скрипт для автоматичного підписування запитів до Cloudflare R2/S3")
+            progress.emit('resources', "Додано скрипт для автоматичного підписування запитів до Cloudflare R2/S3")
 
         # Зберігаємо оновлений HTML-вміст
-        print(f"Збереження оновленого HTML в {html_dest}")
+        html_content = str(soup)
         with open(html_dest, 'w', encoding='utf-8') as f:
-            f.write(str(soup))
+            f.write(html_content)
+        progress.emit('resources', f"Збережено оновлений HTML: {html_dest}",
+                      bytes_written=len(html_content.encode('utf-8')))
 
         # Додаємо HTML до списку ресурсів
         resources['html'].append(html_filename)
-        print(f"Додано HTML-файл {html_filename} до списку ресурсів")
 
+    except ConversionCancelled:
+        raise
     except Exception as e:
         print(f"Помилка при обробці HTML-файлу: {e}")
         import traceback
@@ -268,12 +370,129 @@ def process_html_file(html_path, content_dir, resources_dir, include_resources=T
             f.write(clean_html)
 
         resources['html'].append(html_filename)
-        print(f"Створено простий HTML-файл замість проблемного")
+        progress.emit('resources', "Створено простий HTML-файл замість проблемного")
 
-    print("Завершено обробку HTML-файлу")
     return resources
 
 
+def _extract_all(nodes):
+    """
+    Видаляє вузли з дерева, обходячи дітей кожного батьківського елемента один раз
+
+    PageElement.extract() шукає вузол серед сусідів лінійно, тож видалення тисяч стилів
+    і скриптів з одного <body> по одному займає квадратичний час. Якщо з батька видаляється
+    багато вузлів, його діти від'єднуються всі разом (clear() видаляє їх з початку списку -
+    без пошуку), а ті, що залишаються, додаються назад.
+    """
+    by_parent = {}
+    for node in nodes:
+        if node.parent is not None:
+            by_parent.setdefault(id(node.parent), (node.parent, []))[1].append(node)
+    for parent, children in by_parent.values():
+        if len(children) < BULK_EXTRACT_MIN:
+            for child in children:
+                child.extract()
+            continue
+        removed = {id(child) for child in children}
+        kept = [child for child in parent.contents if id(child) not in removed]
+        parent.clear()
+        parent.extend(kept)
+
+
+def rewrite_html_document(soup, keep_local_scripts=False):
+    """
+    Застосовує до розібраного HTML усі перетворення за один обхід дерева
+
+    Стилі об'єднуються в один тег <style> у <head>, інлайн-скрипти - в один тег <script>
+    в кінці <body> (скрипти з src видаляються, крім локальних при keep_local_scripts;
+    якщо локальні скрипти залишаються, інлайн-скрипти теж залишаються на своїх місцях,
+    щоб не змінився порядок виконання), коментарі видаляються, у <head>
+    додається Content-Security-Policy. Під час того ж обходу шукаються посилання на
+    PROBLEMATIC_DOMAINS у тексті та атрибутах, що залишаються в документі, - серіалізувати
+    дерево для пошуку не потрібно.
+
+    Args:
+        soup (BeautifulSoup): Розібраний документ (змінюється на місці)
+        keep_local_scripts (bool): Залишати <script src> з локальними файлами на місці (коли
+            ресурси копіюються до пакету)
+
+    Returns:
+        dict: {'styles', 'scripts', 'comments'} - кількість оброблених елементів,
+            'csp' - чи додано політику, 'problematic_urls' - чи є посилання на проблемні домени
+    """
+    head = body = None
+    styles, scripts, comments = [], [], []
+    problematic = False
+    search = PROBLEMATIC_DOMAINS_RE.search
+
+    # Обхід лише збирає вузли: змінювати дерево під час ітерації descendants не можна
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            name = node.name
+            if name == 'style':
+                styles.append(node)
+                continue
+            if name == 'script':
+                scripts.append(node)
+                continue
+            if name == 'head':
+                head = head or node
+            elif name == 'body':
+                body = body or node
+            if not problematic:
+                for value in node.attrs.values():
+                    if search(' '.join(value) if isinstance(value, list) else value):
+                        problematic = True
+                        break
+        elif isinstance(node, Comment):
+            comments.append(node)
+        elif isinstance(node, NavigableString) and not problematic:
+            # Вміст <style>/<script> перевіряється нижче, лише якщо він залишиться в документі
+            if node.parent is None or node.parent.name not in ('style', 'script'):
+                problematic = bool(search(node))
+
+    # Інтегруємо всі стилі в head
+    all_styles = [style.string or '' for style in styles]
+    # Інтегруємо всі скрипти в кінець body (зберігаємо лише інлайн-скрипти)
+    all_scripts = [script.string or '' for script in scripts if not script.has_attr('src')]
+    if keep_local_scripts and any(script.has_attr('src') and is_local_reference(script['src'])
+                                  for script in scripts):
+        # <script>var CFG=...</script><script src="player.js"> - player.js має виконатися після
+        # CFG, тому інлайн-скрипти не переносяться, а видаляються лише зовнішні скрипти
+        problematic = problematic or any(search(script.string or '') for script in scripts
+                                         if not script.has_attr('src'))
+        all_scripts = []
+        scripts = [script for script in scripts
+                   if script.has_attr('src') and not is_local_reference(script['src'])]
+    _extract_all(comments + styles + scripts)
+
+    if all_styles and head:
+        style_tag = soup.new_tag('style')
+        style_tag.string = '\n'.join(all_styles)
+        head.append(style_tag)
+        problematic = problematic or bool(search(style_tag.string))
+    if all_scripts and body:
+        script_tag = soup.new_tag('script')
+        script_tag.string = '\n'.join(all_scripts)
+        body.append(script_tag)
+        problematic = problematic or bool(search(script_tag.string))
+
+    # Додаємо meta тег для запобігання зовнішніх запитів
+    if head:
+        meta_csp = soup.new_tag('meta')
+        meta_csp['http-equiv'] = 'Content-Security-Policy'
+        meta_csp['content'] = CONTENT_SECURITY_POLICY
+        head.insert(0, meta_csp)
+
+    return {
+        'styles': len(styles) if all_styles and head else 0,
+        'scripts': len(all_scripts) if all_scripts and body else 0,
+        'comments': len(comments),
+        'csp': head is not None,
+        'problematic_urls': problematic
+    }
+
+
 def create_scorm_wrapper(content_dir, title, html_filename, html_files):
     """
     Створює безпечну HTML-обгортку для SCORM, яка блокує всі зовнішні запити
@@ -2165,7 +2384,7 @@ function addUserComment(comment, location) {
     return 'scorm_api.js'
 
 
-def create_scorm_manifest(content_dir, title, resources, index_file, course_id, scorm_version):
+def create_scorm_manifest(content_dir, title, resources, index_file, course_id, scorm_version, progress=None):
     """
     Створює маніфест SCORM
 
@@ -2176,14 +2395,14 @@ def create_scorm_manifest(content_dir, title, resources, index_file, course_id,
         index_file (str): Назва індексного HTML-файлу
         course_id (str): Ідентифікатор курсу
         scorm_version (str): Версія SCORM ('1.2' або '2004')
+        progress (ProgressReporter): Отримувач подій прогресу
     """
+    progress = progress or ProgressReporter()
     manifest_path = os.path.join(content_dir, 'imsmanifest.xml')
-    print(f"Створення маніфесту SCORM у {manifest_path}")
-    print(f"Отримані ресурси: {resources}")
 
     # Перевірка типу resources
     if not isinstance(resources, dict):
-        print(f"УВАГА: resources не є словником: {type(resources)}")
+        progress.emit('package', f"УВАГА: resources не є словником: {type(resources)}")
         # Створення порожнього словника ресурсів для запобігання помилкам
         resources = {
             'html': [],
@@ -2278,32 +2497,27 @@ def create_scorm_manifest(content_dir, title, resources, index_file, course_id,
     file_list = [index_file, 'scorm_api.js']
 
     # Додаємо шляхи до ресурсів
-    print("Обробка ресурсів для включення в маніфест:")
     for res_type in ['html', 'css', 'js', 'images', 'fonts', 'other']:
         if res_type in resources and isinstance(resources[res_type], list):
-            print(f"  Тип {res_type}: {resources[res_type]}")
             for res_file in resources[res_type]:
                 file_path = f"resources/{res_file}"
-                print(f"    Додавання ресурсу: {file_path}")
                 if file_path not in file_list:
                     file_list.append(file_path)
-        else:
-            print(f"  Пропуск типу {res_type}: відсутній у словнику або не є списком")
 
     # Додаємо всі файли в ресурс
-    print(f"Всього файлів для включення в ресурс: {len(file_list)}")
     for file_path in file_list:
         file_elem = ET.SubElement(resource, 'file')
         file_elem.set('href', file_path)
-        print(f"  Додано файл: {file_path}")
 
     # Форматування XML для кращої читабельності
     rough_string = ET.tostring(manifest, 'utf-8')
     reparsed = minidom.parseString(rough_string)
+    manifest_content = reparsed.toprettyxml(indent="  ")
     with open(manifest_path, 'w', encoding='utf-8') as f:
-        f.write(reparsed.toprettyxml(indent="  "))
+        f.write(manifest_content)
 
-    print("Маніфест SCORM успішно створено")
+    progress.emit('package', f"Маніфест SCORM створено: {len(file_list)} файлів у ресурсі",
+                  bytes_written=len(manifest_content.encode('utf-8')))
 
 
 def add_aws_signature_script(soup, access_key, secret_key, region='auto', service='s3'):
@@ -2500,7 +2714,6 @@ window.addEventListener('DOMContentLoaded', replaceExternalResourceUrls);
         aws_script = soup.new_tag('script')
         aws_script.string = script_content
         head.append(aws_script)
-        print("Додано скрипт для підписування запитів до AWS/Cloudflare")
 
     return soup
 
@@ -2590,16 +2803,11 @@ def main():
         # Запитуємо назву курсу, якщо не вказано
         if not args.title:
             try:
-                with open(args.input_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    html_content = f.read()
-                soup = BeautifulSoup(html_content, 'html.parser')
-                title_tag = soup.find('title')
-                default_title = title_tag.string.strip() if title_tag and title_tag.string else \
-                os.path.splitext(os.path.basename(args.input_file))[0]
-            except:
-                default_title = os.path.splitext(os.path.basename(args.input_file))[0]
-
-            args.title = input(f"Назва курсу [{default_title}]: ").strip() or default_title
+                suggested_title = default_title(args.input_file, probe_html(args.input_file))
+            except OSError:
+                suggested_title = default_title(args.input_file)
+
+            args.title = input(f"Назва курсу [{suggested_title}]: ").strip() or suggested_title
 
         print(f"\nКонвертація HTML-файлу {args.input_file} в SCORM-пакет...")
         result = convert_html_to_scorm(
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Вибір парсера HTML
+
+Усі шляхи обробки HTML розбирають документи через parse_html(). Підтримуються парсери
+BeautifulSoup 'lxml', 'html.parser' та 'html5lib'. Парсер за замовчуванням вибрано за
+результатами bench_parsers.py: 'lxml' в 1,5-2 рази швидший за 'html.parser' на великих
+документах і дає той самий текст, теги та атрибути для наших матеріалів. Його можна замінити
+змінною оточення SCORM_HTML_PARSER або параметром parser. Якщо потрібний парсер не
+встановлено, використовується наступний доступний - 'html.parser' є завжди.
+"""
+
+import os
+
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+
+# Парсери в порядку переваги при відкаті
+PARSER_BACKENDS = ('lxml', 'html.parser', 'html5lib')
+
+# Парсер, що входить до стандартної бібліотеки і доступний завжди
+FALLBACK_PARSER = 'html.parser'
+
+_warned = set()
+
+
+def available_parsers():
+    """
+    Повертає встановлені парсери
+
+    Returns:
+        list: Назви доступних парсерів у порядку PARSER_BACKENDS
+    """
+    return [name for name in PARSER_BACKENDS if builder_registry.lookup(name) is not None]
+
+
+def resolve_parser(parser=None):
+    """
+    Визначає парсер, який буде використано
+
+    Args:
+        parser (str): Бажаний парсер; None - SCORM_HTML_PARSER або перший доступний
+            з PARSER_BACKENDS
+
+    Returns:
+        str: Назва доступного парсера
+    """
+    requested = parser or os.environ.get('SCORM_HTML_PARSER')
+    if requested:
+        if requested in PARSER_BACKENDS and builder_registry.lookup(requested) is not None:
+            return requested
+        if requested not in _warned:
+            # Попереджаємо один раз на процес, а не при кожному розборі
+            _warned.add(requested)
+            print(f"Парсер HTML '{requested}' недоступний, використовується інший")
+    available = available_parsers()
+    return available[0] if available else FALLBACK_PARSER
+
+
+def parse_html(markup, parser=None):
+    """
+    Розбирає HTML вибраним парсером
+
+    Args:
+        markup (str | bytes): HTML-вміст
+        parser (str): Парсер (див. resolve_parser)
+
+    Returns:
+        BeautifulSoup: Розібраний документ
+    """
+    return BeautifulSoup(markup, resolve_parser(parser))
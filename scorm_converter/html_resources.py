@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Збирання локальних ресурсів HTML-документа
+
+Краулер знаходить у документі посилання на локальні файли: <img>, <link>, <script src>,
+<source>, <video>/<audio>, srcset, вбудовані атрибути style та блоки <style> (url() та
+@import). Таблиці стилів обробляються рекурсивно - їхні url() та @import теж
+збираються. Файли копіюються до директорії ресурсів пакету в пулі потоків, посилання в
+документі та CSS переписуються на нові шляхи. Файли з директорії документа зберігають
+свою структуру. Посилання за межі директорії документа (../, символічні посилання)
+вважаються відсутніми файлами: інакше завантажений документ міг би забрати в пакет
+довільний файл сервера. Лише для довірених вхідних файлів (CLI) їх можна дозволити -
+тоді такі файли кладуться до EXTERNAL_DIR.
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote, unquote, urlsplit
+
+from cancellation import check_cancelled
+
+# Кількість потоків копіювання
+COPY_WORKERS = 8
+
+# Куди кладуться ресурси, розташовані поза директорією документа
+EXTERNAL_DIR = '_external'
+
+# Категорії ресурсів маніфесту за розширенням файлу (решта - 'other')
+RESOURCE_BUCKETS = {
+    '.css': 'css',
+    '.js': 'js', '.mjs': 'js',
+    '.png': 'images', '.jpg': 'images', '.jpeg': 'images', '.gif': 'images', '.svg': 'images',
+    '.webp': 'images', '.bmp': 'images', '.ico': 'images', '.avif': 'images',
+    '.woff': 'fonts', '.woff2': 'fonts', '.ttf': 'fonts', '.otf': 'fonts', '.eot': 'fonts'
+}
+
+# Атрибути з посиланням на ресурс за тегами
+URL_ATTRIBUTES = {
+    'img': ('src',),
+    'script': ('src',),
+    'link': ('href',),
+    'source': ('src',),
+    'video': ('src', 'poster'),
+    'audio': ('src',),
+    'track': ('src',),
+    'embed': ('src',),
+    'object': ('data',),
+    'input': ('src',)
+}
+
+# Значення rel, за яких <link href> є ресурсом сторінки, а не навігацією
+LINK_RESOURCE_RELS = ('stylesheet', 'icon', 'apple-touch-icon', 'preload', 'modulepreload', 'prefetch',
+                      'manifest')
+
+CSS_URL_RE = re.compile(r'url\(\s*(?P<quote>[\'"]?)(?P<url>[^\'")]*?)(?P=quote)\s*\)', re.IGNORECASE)
+CSS_IMPORT_RE = re.compile(r'@import\s+(?P<quote>[\'"])(?P<url>[^\'"]+)(?P=quote)', re.IGNORECASE)
+
+
+def is_local_reference(url):
+    """Перевіряє, чи посилання веде на локальний файл (без схеми, не //host і не #якір)"""
+    url = (url or '').strip()
+    if not url or url.startswith(('#', '//')):
+        return False
+    return not urlsplit(url).scheme
+
+
+def split_reference(url):
+    """
+    Розділяє посилання на шлях до файлу та суфікс
+
+    Returns:
+        tuple: (декодований шлях, '?query#fragment' або '')
+    """
+    parts = urlsplit(url.strip())
+    suffix = (f"?{parts.query}" if parts.query else '') + (f"#{parts.fragment}" if parts.fragment else '')
+    return unquote(parts.path), suffix
+
+
+def resource_bucket(path):
+    """Повертає категорію ресурсу маніфесту ('css', 'js', 'images', 'fonts' або 'other')"""
+    return RESOURCE_BUCKETS.get(os.path.splitext(path)[1].lower(), 'other')
+
+
+def rewrite_css_urls(css_text, rewrite):
+    """
+    Замінює посилання url() та @import у тексті CSS
+
+    Args:
+        css_text (str): Текст CSS
+        rewrite (callable): Отримує посилання і повертає нове (або те саме)
+
+    Returns:
+        str: Текст CSS з новими посиланнями
+    """
+
+    def replace(match):
+        url = match.group('url')
+        new_url = rewrite(url)
+        if new_url == url:
+            return match.group(0)
+        start, end = match.span('url')
+        offset = match.start()
+        return match.group(0)[:start - offset] + new_url + match.group(0)[end - offset:]
+
+    return CSS_IMPORT_RE.sub(replace, CSS_URL_RE.sub(replace, css_text))
+
+
+def split_srcset(srcset):
+    """
+    Розбирає атрибут srcset на кандидатів за правилами HTML
+
+    Посилання - послідовність символів без пробілів, тому коми всередині data URI
+    не розділяють кандидатів.
+
+    Returns:
+        list: Пари (посилання, дескриптори), наприклад ('a.png', '2x')
+    """
+    candidates = []
+    position, length = 0, len(srcset)
+    while position < length:
+        while position < length and (srcset[position].isspace() or srcset[position] == ','):
+            position += 1
+        start = position
+        while position < length and not srcset[position].isspace():
+            position += 1
+        url = srcset[start:position]
+        if not url:
+            break
+        if url.endswith(','):
+            candidates.append((url.rstrip(','), ''))
+            continue
+        # Дескриптори тривають до коми поза дужками
+        start, depth = position, 0
+        while position < length and (srcset[position] != ',' or depth):
+            depth += {'(': 1, ')': -1}.get(srcset[position], 0)
+            position += 1
+        candidates.append((url, srcset[start:position].strip()))
+        position += 1
+    return candidates
+
+
+def rewrite_srcset_urls(srcset, rewrite):
+    """Замінює посилання в атрибуті srcset ('a.png 1x, b.png 2x'), див. rewrite_css_urls"""
+    return ', '.join(' '.join(filter(None, (rewrite(url), descriptors)))
+                     for url, descriptors in split_srcset(srcset))
+
+
+def rewrite_tag_urls(tag, rewrite, rewrite_srcset=None):
+    """
+    Замінює посилання на ресурси в тезі: атрибути URL_ATTRIBUTES, srcset, атрибут style
+    та вміст <style>
+
+    Args:
+        tag (Tag): Тег документа
+        rewrite (callable): Отримує посилання і повертає нове (або те саме)
+        rewrite_srcset (callable): Те саме для кандидатів srcset; за замовчуванням - rewrite
+    """
+    name = tag.name
+    attributes = URL_ATTRIBUTES.get(name, ())
+    if name == 'link':
+        rel = tag.get('rel') or []
+        rel = rel if isinstance(rel, list) else rel.split()
+        if not any(value.lower() in LINK_RESOURCE_RELS for value in rel):
+            attributes = ()
+    for attribute in attributes:
+        value = tag.get(attribute)
+        if isinstance(value, str):
+            tag[attribute] = rewrite(value)
+    if isinstance(tag.get('srcset'), str):
+        tag['srcset'] = rewrite_srcset_urls(tag['srcset'], rewrite_srcset or rewrite)
+    if isinstance(tag.get('style'), str) and 'url(' in tag['style'].lower():
+        tag['style'] = rewrite_css_urls(tag['style'], rewrite)
+    if name == 'style' and tag.string:
+        lowered = tag.string.lower()
+        if 'url(' in lowered or '@import' in lowered:
+            css_text = rewrite_css_urls(tag.string, rewrite)
+            if css_text != tag.string:
+                tag.string = css_text
+
+
+def _copy_file(source, dest):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    shutil.copyfile(source, dest)
+    return os.path.getsize(dest)
+
+
+class ResourceCrawler:
+    """
+    Збирає локальні ресурси HTML-документа до директорії ресурсів пакету
+
+    Args:
+        html_path (str): Шлях до вихідного HTML-файлу
+        resources_dir (str): Директорія ресурсів пакету (там же лежить оброблений HTML)
+        workers (int): Кількість потоків копіювання
+        cancel_token (CancellationToken): Токен скасування; перевіряється між копіюваннями
+        progress (ProgressReporter): Отримувач подій прогресу етапу 'resources'
+        allow_external (bool): Дозволити файли поза директорією документа (лише для довірених
+            вхідних файлів)
+    """
+
+    def __init__(self, html_path, resources_dir, workers=COPY_WORKERS, cancel_token=None, progress=None,
+                 allow_external=False):
+        self.html_path = os.path.normpath(os.path.abspath(html_path))
+        self.root = os.path.dirname(self.html_path)
+        self.real_root = os.path.realpath(self.root)
+        self.allow_external = allow_external
+        self.resources_dir = resources_dir
+        self.workers = workers
+        self.cancel_token = cancel_token
+        self.progress = progress
+        # Вихідний файл -> шлях у директорії ресурсів (posix)
+        self.mapping = {}
+        self.missing = set()
+        self._pending_css = deque()
+        # Задачі копіювання -> шлях у директорії ресурсів
+        self._copies = {}
+
+    def resolve(self, url, base_dir):
+        """
+        Знаходить файл, на який веде локальне посилання
+
+        Args:
+            url (str): Посилання
+            base_dir (str): Директорія, відносно якої розв'язується посилання
+
+        Returns:
+            tuple: (шлях до файлу, суфікс посилання) або None
+        """
+        if not is_local_reference(url):
+            return None
+        path, suffix = split_reference(url)
+        if not path:
+            return None
+        if path.startswith('/'):
+            # Посилання від кореня сайту - у локальному експорті це директорія документа
+            candidate = os.path.join(self.root, path.lstrip('/'))
+        else:
+            candidate = os.path.join(base_dir, path)
+        candidate = os.path.normpath(candidate)
+        if candidate == self.html_path or not os.path.isfile(candidate) or not self._allowed(candidate):
+            self.missing.add(url.strip())
+            return None
+        return candidate, suffix
+
+    def _allowed(self, candidate):
+        """Перевіряє, чи файл (після розкриття символічних посилань) лежить у директорії документа"""
+        if self.allow_external:
+            return True
+        real = os.path.realpath(candidate)
+        return real.startswith(os.path.join(self.real_root, ''))
+
+    def destination(self, source):
+        """Повертає шлях файлу в директорії ресурсів, ставлячи його на копіювання при першому запиті"""
+        if source in self.mapping:
+            return self.mapping[source]
+
+        relative = os.path.relpath(source, self.root)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep) or os.path.isabs(relative):
+            digest = hashlib.sha1(source.encode('utf-8', 'surrogateescape')).hexdigest()[:8]
+            relative = os.path.join(EXTERNAL_DIR, digest, os.path.basename(source))
+        relative = relative.replace(os.sep, '/')
+        self.mapping[source] = relative
+
+        if resource_bucket(relative) == 'css':
+            self._pending_css.append(source)
+        else:
+            future = self._executor.submit(_copy_file, source, os.path.join(self.resources_dir, relative))
+            self._copies[future] = relative
+        return relative
+
+    def rewrite_url(self, url, base_dir, from_dir=''):
+        """
+        Переписує локальне посилання на шлях у пакеті
+
+        Args:
+            url (str): Посилання
+            base_dir (str): Директорія вихідного файлу, з якого зроблено посилання
+            from_dir (str): Директорія того ж файлу в пакеті (відносно директорії ресурсів)
+
+        Returns:
+            str: Нове посилання (або незмінене, якщо файл не локальний чи не знайдений)
+        """
+        resolved = self.resolve(url, base_dir)
+        if resolved is None:
+            return url
+        source, suffix = resolved
+        new_path = posixpath.relpath(self.destination(source), from_dir or '.')
+        if new_path == split_reference(url)[0]:
+            return url
+        return quote(new_path, safe="/") + suffix
+
+    def rewrite_css(self, css_text, base_dir, from_dir=''):
+        """Переписує url() та @import у тексті CSS"""
+        return rewrite_css_urls(css_text, lambda url: self.rewrite_url(url, base_dir, from_dir))
+
+    def rewrite_srcset(self, srcset, base_dir, from_dir=''):
+        """Переписує посилання в атрибуті srcset ('a.png 1x, b.png 2x')"""
+        return rewrite_srcset_urls(srcset, lambda url: self.rewrite_url(url, base_dir, from_dir))
+
+    def _process_css(self, source):
+        """Переписує посилання таблиці стилів і записує її до директорії ресурсів"""
+        relative = self.mapping[source]
+        with open(source, 'r', encoding='utf-8', errors='surrogateescape') as f:
+            css_text = f.read()
+        css_text = self.rewrite_css(css_text, os.path.dirname(source), posixpath.dirname(relative))
+        dest = os.path.join(self.resources_dir, relative)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, 'w', encoding='utf-8', errors='surrogateescape') as f:
+            f.write(css_text)
+        return os.path.getsize(dest)
+
+    def crawl(self, soup):
+        """
+        Збирає ресурси документа, переписуючи посилання в soup на місці
+
+        Args:
+            soup (BeautifulSoup): Розібраний документ
+
+        Returns:
+            dict: Шляхи скопійованих файлів відносно директорії ресурсів за категоріями
+                ('css', 'js', 'images', 'fonts', 'other')
+
+        Raises:
+            ConversionCancelled: Якщо конвертацію скасовано
+        """
+        buckets = {'css': [], 'js': [], 'images': [], 'fonts': [], 'other': []}
+        copied = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scorm-resources') as executor:
+            self._executor = executor
+            try:
+                for tag in soup.find_all(True):
+                    rewrite_tag_urls(tag, lambda url: self.rewrite_url(url, self.root))
+                check_cancelled(self.cancel_token)
+
+                # Таблиці стилів обробляються в порядку виявлення; їхні ресурси копіюються паралельно
+                while self._pending_css:
+                    check_cancelled(self.cancel_token)
+                    source = self._pending_css.popleft()
+                    try:
+                        self._report(self.mapping[source], self._process_css(source), len(copied) + 1)
+                        copied.append(self.mapping[source])
+                    except OSError as e:
+                        print(f"Не вдалося обробити таблицю стилів {source}: {e}")
+
+                for future in as_completed(self._copies):
+                    check_cancelled(self.cancel_token)
+                    relative = self._copies[future]
+                    try:
+                        size = future.result()
+                    except OSError as e:
+                        print(f"Не вдалося скопіювати ресурс {relative}: {e}")
+                        continue
+                    copied.append(relative)
+                    self._report(relative, size, len(copied))
+            except BaseException:
+                # Скасування або помилка: копіювання, що ще не почалося, не запускаємо
+                for future in self._copies:
+                    future.cancel()
+                raise
+            finally:
+                self._executor = None
+
+        for relative in sorted(copied):
+            buckets[resource_bucket(relative)].append(relative)
+        if self.missing:
+            message = (f"Не знайдено локальних ресурсів: {len(self.missing)} ({', '.join(sorted(self.missing)[:5])}"
+                       f"{', ...' if len(self.missing) > 5 else ''})")
+            if self.progress is not None:
+                self.progress.emit('resources', message)
+            else:
+                print(message)
+        return buckets
+
+    def _report(self, relative, size, current):
+        if self.progress is not None:
+            self.progress.emit('resources', f"Скопійовано ресурс {relative}", current=current,
+                               total=len(self.mapping), bytes_written=size)
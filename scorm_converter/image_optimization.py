@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Зменшення та перекодування зображень пакету HTML-курсу
+
+Маркетингові HTML-курси часто посилаються на фотографії шириною 6000 пікселів, що
+показуються шириною 600. Для кожного зображення пакету визначається ширина, з якою воно
+відображається: з атрибутів width/height, атрибута style та правил CSS (блоків <style>
+і таблиць стилів пакету), що застосовуються до <img>. Зображення зменшується до
+IMAGE_MAX_SCALE від цієї ширини (запас для екранів високої щільності) і кодується
+заново у вихідному форматі, WebP або JPEG - обирається найменший результат. Якщо
+виграш менший за IMAGE_MIN_GAIN, оригінал залишається.
+
+Розмір визначається консервативно: якщо хоч одне посилання на файл має невідомий розмір
+(фон у CSS, srcset, ширина у відсотках тощо), зображення лише перекодовується без
+зменшення. Файли, імена яких згадуються в скриптах чи інших сторінках пакету, не
+змінюються. Кодування виконується в пулі процесів. Процес пулу конвертацій (демон) не
+може мати дочірніх процесів, тому в ньому кодування виконується в пулі потоків - Pillow
+відпускає GIL під час розкодування, масштабування та кодування. Процеси пулу
+конвертацій працюють одночасно, тож кожен отримує свою частку ядер (set_image_workers).
+"""
+
+import math
+import multiprocessing
+import os
+import posixpath
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from urllib.parse import quote
+
+import soupsieve
+
+from cancellation import check_cancelled
+from css_pruning import DYNAMIC_PSEUDO_RE, NESTED_AT_RULES, css_statements, split_selectors, strip_css_comments
+from html_resources import is_local_reference, rewrite_css_urls, rewrite_tag_urls, split_reference
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    # Без Pillow зображення залишаються без змін
+    Image = None
+
+# Запас роздільної здатності відносно ширини відображення (екрани високої щільності)
+IMAGE_MAX_SCALE = 2
+
+# Мінімальна частка економії, за якої оригінал замінюється
+IMAGE_MIN_GAIN = 0.1
+
+# Якість JPEG та WebP
+IMAGE_QUALITY = 82
+
+# Кількість паралельних кодувань (кожне тримає в пам'яті розкодоване зображення)
+IMAGE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Формати Pillow за розширенням файлу; GIF (анімація), SVG та ICO не обробляються
+OPTIMIZABLE_FORMATS = {
+    '.png': 'PNG',
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.webp': 'WEBP',
+    '.bmp': 'BMP'
+}
+
+# Формати, у яких пробується кодувати зображення, за вихідним форматом
+ENCODE_FORMATS = {
+    'PNG': ('PNG', 'WEBP', 'JPEG'),
+    'BMP': ('PNG', 'WEBP', 'JPEG'),
+    'JPEG': ('JPEG', 'WEBP'),
+    'WEBP': ('WEBP', 'JPEG')
+}
+
+# Розширення файлу для формату результату
+FORMAT_EXTENSIONS = {'PNG': '.png', 'JPEG': '.jpg', 'WEBP': '.webp', 'BMP': '.bmp'}
+
+# Властивості CSS, що визначають ширину відображення
+SIZE_PROPERTIES = ('width', 'height', 'min-width', 'max-width')
+
+CSS_PIXELS_RE = re.compile(r'^(\d+(?:\.\d+)?|\.\d+)(px)?$')
+HTML_DIMENSION_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(?:px)?\s*$', re.IGNORECASE)
+
+# Значення ширини, за яких зображення показується у власному розмірі
+AUTO_VALUES = ('auto', 'initial', 'unset', 'revert', 'none', 'max-content', 'fit-content')
+
+
+def _pixels(value):
+    """
+    Розбирає значення розміру CSS
+
+    Returns:
+        float, str або None: пікселі, 'auto' - власний розмір зображення, None - невідомо
+            (відсотки, em, vw, calc() тощо)
+    """
+    value = re.sub(r'\s*!\s*important\s*$', '', value.strip().lower())
+    if value in AUTO_VALUES:
+        return 'auto'
+    match = CSS_PIXELS_RE.match(value)
+    if match and (match.group(2) or float(match.group(1)) == 0):
+        return float(match.group(1))
+    return None
+
+
+def _size_declarations(block):
+    """Повертає пари (властивість, значення) SIZE_PROPERTIES з блоку оголошень CSS"""
+    declarations = []
+    for declaration in strip_css_comments(block).split(';'):
+        prop, _, value = declaration.partition(':')
+        prop = prop.strip().lower()
+        if prop in SIZE_PROPERTIES and value.strip():
+            declarations.append((prop, _pixels(value)))
+    return declarations
+
+
+def _size_rules(css_text, rules):
+    """Додає до rules правила CSS з SIZE_PROPERTIES: (скомпільований селектор або None - будь-який, оголошення)"""
+    for prelude, body, _ in css_statements(css_text):
+        head = strip_css_comments(prelude).strip()
+        if body is None or not head:
+            continue
+        if head.startswith('@'):
+            if re.match(r'@([\w-]*)', head).group(1).lower() in NESTED_AT_RULES:
+                _size_rules(body, rules)
+            continue
+        declarations = _size_declarations(body)
+        if not declarations:
+            continue
+        for selector in split_selectors(head):
+            # Стани :hover тощо можуть настати - перевіряється решта селектора
+            static = DYNAMIC_PSEUDO_RE.sub('', selector).strip()
+            compiled = None
+            if static and static[-1] not in '>+~':
+                try:
+                    compiled = soupsieve.compile(static)
+                except Exception:
+                    compiled = None
+            rules.append((compiled, declarations))
+
+
+def _display_width(img, natural, rules):
+    """
+    Оцінює найбільшу ширину, з якою відображається зображення <img>
+
+    Args:
+        img (Tag): Елемент <img>
+        natural (tuple): Власний розмір зображення (ширина, висота)
+        rules (list): Правила CSS з розмірами (див. _size_rules)
+
+    Returns:
+        float: Ширина в CSS-пікселях або None, якщо її не вдалося визначити
+    """
+    values = {prop: [] for prop in SIZE_PROPERTIES}
+    for attribute in ('width', 'height'):
+        if img.get(attribute) is not None:
+            match = HTML_DIMENSION_RE.match(str(img[attribute]))
+            values[attribute].append(float(match.group(1)) if match else None)
+    for compiled, declarations in rules:
+        try:
+            matches = compiled is None or compiled.match(img)
+        except Exception:
+            matches = True
+        if matches:
+            for prop, value in declarations:
+                values[prop].append(value)
+    if isinstance(img.get('style'), str):
+        for prop, value in _size_declarations(img['style']):
+            values[prop].append(value)
+
+    natural_width, natural_height = natural
+    # Правила без урахування каскаду: береться найбільша з можливих ширин
+    if values['width']:
+        width = None if None in values['width'] else max(
+            natural_width if value == 'auto' else value for value in values['width'])
+    elif values['height']:
+        width = None if None in values['height'] else max(
+            natural_width if value == 'auto' else value * natural_width / natural_height
+            for value in values['height'])
+    else:
+        width = natural_width
+
+    # max-width: none чи у відсотках може скасувати обмеження в пікселях
+    caps = values['max-width']
+    if caps and all(isinstance(value, float) for value in caps):
+        width = max(caps) if width is None else min(width, max(caps))
+
+    minimums = [value for value in values['min-width'] if value != 'auto']
+    if width is not None and minimums:
+        width = None if None in minimums else max(width, max(minimums))
+    return width
+
+
+def _natural_size(path):
+    """Повертає розмір зображення з урахуванням орієнтації EXIF (читається лише заголовок)"""
+    with Image.open(path) as image:
+        width, height = image.size
+        if getattr(image, 'is_animated', False):
+            return None
+        try:
+            orientation = image.getexif().get(0x0112)
+        except Exception:
+            orientation = None
+    return (height, width) if orientation in (5, 6, 7, 8) else (width, height)
+
+
+def _encode_image(path, size, formats, quality, min_gain):
+    """
+    Зменшує та кодує зображення у кожному з форматів, повертає найменший результат
+
+    Виконується в процесі пулу, тому отримує та повертає лише прості значення.
+
+    Args:
+        path (str): Шлях до зображення
+        size (tuple): Новий розмір (ширина, висота) або None - без зменшення
+        formats (tuple): Формати Pillow, у яких пробувати кодувати
+        quality (int): Якість JPEG та WebP
+        min_gain (float): Мінімальна частка економії
+
+    Returns:
+        tuple: (формат, байти, розмір) або None, якщо виграш менший за поріг
+    """
+    original_bytes = os.path.getsize(path)
+    try:
+        with Image.open(path) as source:
+            icc_profile = source.info.get('icc_profile')
+            image = ImageOps.exif_transpose(source)
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            if has_alpha and image.mode not in ('RGBA', 'LA'):
+                image = image.convert('RGBA')
+            elif image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P') or (size and image.mode == 'P'):
+                image = image.convert('RGB')
+            if size and size != image.size:
+                image = image.resize(size, Image.LANCZOS)
+
+            best = None
+            for image_format in formats:
+                if image_format == 'JPEG' and has_alpha:
+                    continue
+                options = {'icc_profile': icc_profile} if icc_profile else {}
+                if image_format == 'JPEG':
+                    encoded = image if image.mode in ('RGB', 'L') else image.convert('RGB')
+                    options.update(quality=quality, optimize=True, progressive=True)
+                elif image_format == 'WEBP':
+                    encoded = image if image.mode in ('RGB', 'RGBA') else image.convert('RGBA' if has_alpha else 'RGB')
+                    options.update(quality=quality, method=4)
+                elif image_format == 'PNG':
+                    encoded = image
+                    options.update(optimize=True)
+                else:
+                    encoded = image
+                buffer = BytesIO()
+                encoded.save(buffer, image_format, **options)
+                if best is None or buffer.tell() < len(best[1]):
+                    best = (image_format, buffer.getvalue(), image.size)
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+        return None
+
+    if best is None or len(best[1]) > original_bytes * (1 - min_gain):
+        return None
+    return best
+
+
+def set_image_workers(count):
+    """
+    Задає кількість паралельних кодувань зображень у поточному процесі
+
+    Args:
+        count (int): Кількість процесів або потоків кодування
+    """
+    global IMAGE_WORKERS
+    IMAGE_WORKERS = max(1, count)
+
+
+def _run_tasks(tasks, workers, cancel_token):
+    """
+    Виконує _encode_image для завдань у пулі процесів, у пулі потоків (у процесі-демоні)
+    або послідовно
+
+    Yields:
+        tuple: (ключ завдання, результат _encode_image)
+    """
+    pending = dict(tasks)
+    if workers > 1 and len(pending) > 1:
+        try:
+            if multiprocessing.current_process().daemon:
+                executor = ThreadPoolExecutor(max_workers=min(workers, len(pending)),
+                                              thread_name_prefix='scorm-image')
+            else:
+                executor = ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                               mp_context=multiprocessing.get_context('spawn'))
+        except (OSError, ValueError):
+            executor = None
+        if executor is not None:
+            try:
+                futures = {executor.submit(_encode_image, *arguments): key for key, arguments in pending.items()}
+                for future in as_completed(futures):
+                    check_cancelled(cancel_token)
+                    key = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        # Процеси не запустились (наприклад, головний модуль не імпортується) -
+                        # решта завдань виконується в поточному процесі
+                        break
+                    except Exception:
+                        result = None
+                    del pending[key]
+                    yield key, result
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    for key, arguments in list(pending.items()):
+        check_cancelled(cancel_token)
+        yield key, _encode_image(*arguments)
+
+
+def _free_name(relative, extension, taken):
+    """Повертає шлях з новим розширенням, що не збігається з іншими файлами пакету"""
+    stem = os.path.splitext(relative)[0]
+    candidate = stem + extension
+    number = 1
+    while candidate in taken:
+        candidate = f"{stem}-{number}{extension}"
+        number += 1
+    return candidate
+
+
+def recompress_images(soup, resources_dir, resources, max_scale=IMAGE_MAX_SCALE, quality=IMAGE_QUALITY,
+                      min_gain=IMAGE_MIN_GAIN, workers=None, cancel_token=None):
+    """
+    Зменшує зображення пакету до розміру відображення та перекодовує їх
+
+    Документ має лежати в корені директорії ресурсів, а посилання в ньому - вже вказувати
+    на файли пакету (після ResourceCrawler.crawl). Якщо формат змінюється, файл отримує
+    нове розширення, а посилання документа та таблиць стилів переписуються.
+
+    Args:
+        soup (BeautifulSoup): Документ; змінюється на місці
+        resources_dir (str): Директорія ресурсів пакету
+        resources (dict): Файли пакету за категоріями (див. process_html_file); перейменовані
+            файли замінюються у списках
+        max_scale (float): Максимальна роздільна здатність відносно ширини відображення
+        quality (int): Якість JPEG та WebP
+        min_gain (float): Мінімальна частка економії, за якої оригінал замінюється
+        workers (int): Кількість паралельних кодувань (за замовчуванням - IMAGE_WORKERS)
+        cancel_token (CancellationToken): Токен скасування; перевіряється між зображеннями
+
+    Returns:
+        dict: Звіт: 'images_optimized', 'images_resized', 'images_converted' (змінено формат),
+            'image_bytes_before' - обсяг оброблених зображень до оптимізації, 'image_bytes_saved'
+
+    Raises:
+        ConversionCancelled: Якщо конвертацію скасовано
+    """
+    report = {'images_optimized': 0, 'images_resized': 0, 'images_converted': 0,
+              'image_bytes_before': 0, 'image_bytes_saved': 0}
+    if Image is None:
+        print("Pillow не встановлено - зображення не оптимізуються")
+        return report
+
+    packaged = {relative for files in resources.values() for relative in files}
+    candidates = {relative for relative in resources.get('images', [])
+                  if os.path.splitext(relative)[1].lower() in OPTIMIZABLE_FORMATS}
+    if not candidates:
+        return report
+
+    stylesheets = {}
+    for relative in resources.get('css', []):
+        with open(os.path.join(resources_dir, relative), 'r', encoding='utf-8', errors='surrogateescape') as f:
+            stylesheets[relative] = f.read()
+
+    def resolve(url, from_dir):
+        if not is_local_reference(url):
+            return None
+        path, _ = split_reference(url)
+        if not path or path.startswith('/'):
+            return None
+        target = posixpath.normpath(posixpath.join(from_dir, path))
+        return target if target in candidates else None
+
+    # Використання файлів: елементи <img> з відомим розміром, посилання без розміру,
+    # посилання з типом формату (<source type>), де змінювати формат не можна
+    elements, unsized, fixed_format = {}, set(), set()
+
+    def record(url, tag=None, attribute_url=False, srcset=False):
+        target = resolve(url, '')
+        if target is None:
+            return url
+        if tag is not None and tag.name == 'img' and attribute_url and not srcset:
+            elements.setdefault(target, []).append(tag)
+        else:
+            unsized.add(target)
+        if tag is not None and tag.name == 'source' and tag.get('type'):
+            fixed_format.add(target)
+        return url
+
+    for tag in soup.find_all(True):
+        rewrite_tag_urls(tag, lambda url, tag=tag: record(url, tag, url == tag.get('src')),
+                         lambda url, tag=tag: record(url, tag, srcset=True))
+    for relative, css_text in stylesheets.items():
+        rewrite_css_urls(css_text, lambda url, relative=relative: unsized.add(
+            resolve(url, posixpath.dirname(relative))) or url)
+    unsized.discard(None)
+
+    # Файли, до яких скрипти чи інші сторінки звертаються за іменем, не змінюються
+    texts = [script.string for script in soup.find_all('script') if script.string]
+    for relative in resources.get('js', []) + resources.get('html', []):
+        with open(os.path.join(resources_dir, relative), 'r', encoding='utf-8', errors='ignore') as f:
+            texts.append(f.read())
+
+    rules = []
+    for style in soup.find_all('style'):
+        if style.string:
+            _size_rules(style.string, rules)
+    for css_text in stylesheets.values():
+        _size_rules(css_text, rules)
+
+    webp = features.check('webp')
+    tasks = {}
+    for relative in sorted(candidates):
+        if relative not in elements and relative not in unsized:
+            continue
+        if any(posixpath.basename(relative) in text for text in texts):
+            continue
+        path = os.path.join(resources_dir, relative)
+        try:
+            natural = _natural_size(path)
+        except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+            continue
+        if natural is None:
+            continue
+
+        size = None
+        if relative not in unsized:
+            widths = [_display_width(img, natural, rules) for img in elements[relative]]
+            if None not in widths:
+                width = math.ceil(max(widths) * max_scale)
+                if 0 < width < natural[0]:
+                    size = (width, max(1, round(natural[1] * width / natural[0])))
+
+        source_format = OPTIMIZABLE_FORMATS[os.path.splitext(relative)[1].lower()]
+        if relative in fixed_format:
+            formats = (source_format,)
+        else:
+            formats = tuple(image_format for image_format in ENCODE_FORMATS[source_format]
+                            if webp or image_format != 'WEBP')
+        tasks[relative] = (path, size, formats, quality, min_gain)
+
+    renamed = {}
+    for relative, result in _run_tasks(tasks, workers or IMAGE_WORKERS, cancel_token):
+        if result is None:
+            continue
+        image_format, data, size = result
+        path = os.path.join(resources_dir, relative)
+        original_bytes = os.path.getsize(path)
+        new_relative = relative
+        if image_format != OPTIMIZABLE_FORMATS[os.path.splitext(relative)[1].lower()]:
+            new_relative = _free_name(relative, FORMAT_EXTENSIONS[image_format], packaged)
+            packaged.add(new_relative)
+            renamed[relative] = new_relative
+            report['images_converted'] += 1
+        with open(os.path.join(resources_dir, *new_relative.split('/')), 'wb') as f:
+            f.write(data)
+        if new_relative != relative:
+            os.remove(path)
+            files = resources['images']
+            files[files.index(relative)] = new_relative
+        report['images_optimized'] += 1
+        if tasks[relative][1] is not None:
+            report['images_resized'] += 1
+        report['image_bytes_before'] += original_bytes
+        report['image_bytes_saved'] += original_bytes - len(data)
+
+    if renamed:
+        def rename(url, from_dir):
+            target = resolve(url, from_dir)
+            if target not in renamed:
+                return url
+            path, suffix = split_reference(url)
+            return quote(posixpath.join(posixpath.dirname(path), posixpath.basename(renamed[target])),
+                         safe='/') + suffix
+
+        for tag in soup.find_all(True):
+            rewrite_tag_urls(tag, lambda url: rename(url, ''))
+        for relative, css_text in stylesheets.items():
+            new_text = rewrite_css_urls(css_text, lambda url: rename(url, posixpath.dirname(relative)))
+            if new_text != css_text:
+                with open(os.path.join(resources_dir, relative), 'w', encoding='utf-8',
+                          errors='surrogateescape') as f:
+                    f.write(new_text)
+    return report
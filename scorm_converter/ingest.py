@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Приймання завантажених файлів
+
+Завантаження записується на диск частинами з контролем розміру, тип файлу визначається
+за сигнатурою (а не за розширенням), після чого дешева проба (probe.py) відхиляє файли,
+конвертація яких перевищила б ліміти - ще до початку рендерингу.
+"""
+
+import os
+import zipfile
+
+from probe import probe_file
+
+CHUNK_SIZE = 1024 * 1024
+
+# Ім'я, під яким завантаження записується до визначення типу файлу
+PARTIAL_NAME = 'upload.part'
+
+# Максимальна довжина імені завантаженого файлу без розширення
+MAX_STEM_LENGTH = 100
+
+# Ліміти за замовчуванням
+DEFAULT_LIMITS = {
+    'max_bytes': 25 * 1024 * 1024,        # розмір завантаженого файлу
+    'max_pages': 1500,                    # сторінок PDF
+    'max_pixel_area': 4 * 10 ** 9,        # пікселів усіх сторінок PDF після рендерингу
+    'max_html_bytes': 25 * 1024 * 1024    # розмір HTML-документа
+}
+
+
+class IngestionError(ValueError):
+    """Завантажений файл відхилено - повідомлення придатне для показу користувачу"""
+
+
+def sniff_file_type(head):
+    """
+    Визначає тип файлу за першими байтами
+
+    Args:
+        head (bytes): Початок файлу (достатньо 1-2 КБ)
+
+    Returns:
+        str: 'pdf', 'zip' (DOCX та інші OOXML/ZIP), 'html' або None
+    """
+    # Специфікація PDF дозволяє довільні байти перед заголовком у межах першого кілобайта
+    if b'%PDF-' in head[:1024]:
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        return 'zip'
+
+    text = head.lstrip(b'\xef\xbb\xbf').decode('utf-8', errors='ignore').lstrip().lower()
+    if text.startswith(('<!doctype html', '<html', '<!--', '<head', '<meta', '<body')):
+        return 'html'
+    if any(tag in text for tag in ('<html', '<head', '<body')):
+        return 'html'
+    return None
+
+
+def detect_file_kind(path):
+    """
+    Визначає тип вхідного файлу за вмістом
+
+    Args:
+        path (str): Шлях до файлу
+
+    Returns:
+        str: 'pdf', 'html', 'docx' або None, якщо формат не підтримується
+
+    Raises:
+        IngestionError: Якщо ZIP-архів пошкоджено або він не є документом DOCX
+    """
+    with open(path, 'rb') as f:
+        sniffed = sniff_file_type(f.read(2048))
+
+    if sniffed != 'zip':
+        return sniffed
+    try:
+        with zipfile.ZipFile(path) as archive:
+            if 'word/document.xml' not in archive.namelist():
+                raise IngestionError("ZIP-архів не є документом DOCX")
+    except zipfile.BadZipFile:
+        raise IngestionError("Пошкоджений ZIP/DOCX-файл")
+    return 'docx'
+
+
+def upload_stem(filename):
+    """
+    Перевіряє ім'я файлу від клієнта і повертає його основу без розширення
+
+    Ім'я використовується лише як основа імені файлу на сервері (і назви курсу за
+    замовчуванням) - розширення визначається за вмістом файлу.
+
+    Args:
+        filename (str): Ім'я файлу від клієнта (може бути None)
+
+    Returns:
+        str: Основа імені файлу; 'upload', якщо ім'я не задано
+
+    Raises:
+        IngestionError: Якщо ім'я містить шлях або керуючі символи
+    """
+    if not filename:
+        return 'upload'
+    if filename in ('.', '..') or '/' in filename or '\\' in filename \
+            or any(ord(c) < 32 or ord(c) == 127 for c in filename):
+        raise IngestionError("Некоректне ім'я файлу")
+    return os.path.splitext(filename)[0][:MAX_STEM_LENGTH].strip() or 'upload'
+
+
+def save_upload(stream, dest_path, max_bytes):
+    """
+    Записує потік на диск частинами, перериваючи запис при перевищенні розміру
+
+    Args:
+        stream: Файлоподібний об'єкт з методом read()
+        dest_path (str): Шлях для збереження
+        max_bytes (int): Максимальний розмір файлу
+
+    Returns:
+        int: Кількість записаних байтів
+
+    Raises:
+        IngestionError: Якщо файл більший за max_bytes (частково записаний файл видаляється)
+    """
+    written = 0
+    try:
+        with open(dest_path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise IngestionError(
+                        f"Файл перевищує максимальний розмір {max_bytes // (1024 * 1024)} МБ")
+                f.write(chunk)
+    except BaseException:
+        if os.path.isfile(dest_path):
+            os.remove(dest_path)
+        raise
+    return written
+
+
+def check_limits(probe, limits):
+    """
+    Перевіряє результат проби на відповідність лімітам
+
+    Raises:
+        IngestionError: Якщо файл перевищує ліміти
+    """
+    if probe['type'] == 'pdf':
+        if probe['encrypted']:
+            raise IngestionError("PDF захищено паролем - зніміть захист і спробуйте знову")
+        if probe['pages'] == 0:
+            raise IngestionError("PDF не містить жодної сторінки")
+        if probe['pages'] > limits['max_pages']:
+            raise IngestionError(
+                f"PDF містить {probe['pages']} сторінок, максимум - {limits['max_pages']}")
+        if probe['pixel_area'] > limits['max_pixel_area']:
+            raise IngestionError("Сторінки PDF завеликі для конвертації (сумарна площа зображень перевищує ліміт)")
+    elif probe['type'] == 'html':
+        if probe['size'] > limits['max_html_bytes']:
+            raise IngestionError(
+                f"HTML-документ перевищує {limits['max_html_bytes'] // (1024 * 1024)} МБ")
+
+
+def ingest_upload(stream, dest_dir, filename, expected_kinds=None, limits=None):
+    """
+    Приймає завантажений файл: записує на диск, перевіряє тип і виконує пробу
+
+    Args:
+        stream: Файлоподібний об'єкт з вмістом (наприклад, UploadedFile Streamlit)
+        dest_dir (str): Директорія для збереження
+        filename (str): Ім'я файлу від клієнта (див. upload_stem)
+        expected_kinds (iterable): Допустимі типи ('pdf', 'html', 'docx'); None - будь-який
+        limits (dict): Ліміти (див. DEFAULT_LIMITS)
+
+    Returns:
+        dict: {'path', 'kind', 'probe'}
+
+    Raises:
+        IngestionError: Якщо файл відхилено
+    """
+    limits = dict(DEFAULT_LIMITS, **(limits or {}))
+
+    # Ім'я файлу на сервері складається з перевіреної основи та розширення за визначеним типом
+    stem = upload_stem(filename)
+    dest_path = os.path.join(dest_dir, PARTIAL_NAME)
+    size = save_upload(stream, dest_path, limits['max_bytes'])
+
+    try:
+        if size == 0:
+            raise IngestionError("Завантажений файл порожній")
+
+        kind = detect_file_kind(dest_path)
+        if kind is None:
+            raise IngestionError("Не вдалося визначити тип файлу - файл пошкоджено або формат не підтримується")
+        if expected_kinds and kind not in expected_kinds:
+            raise IngestionError(
+                f"Вміст файлу не відповідає очікуваному типу ({', '.join(expected_kinds).upper()}), "
+                f"визначено: {kind.upper()}")
+
+        path = os.path.join(dest_dir, f"{stem}.{kind}")
+        os.replace(dest_path, path)
+        dest_path = path
+
+        try:
+            probe = probe_file(dest_path, kind)
+        except ValueError as e:
+            raise IngestionError(str(e))
+        check_limits(probe, limits)
+    except IngestionError:
+        os.remove(dest_path)
+        raise
+
+    return {'path': dest_path, 'kind': kind, 'probe': probe}
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Фонове виконання конвертацій
+
+Конвертації запускаються в обмеженому пулі потоків і відстежуються за ідентифікатором
+завдання. Стан завдання (етап, прогрес, останнє повідомлення, результат) оновлюється
+подіями прогресу конвертера, тож інтерфейс може опитувати його, не блокуючись
+на час конвертації.
+
+Кожне завдання отримує токен скасування: завдання можна скасувати явно, воно
+зупиняється після вичерпання ліміту часу, а завдання, стан яких ніхто не опитує
+(користувач закрив сторінку), скасовуються автоматично.
+"""
+
+import functools
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from cache import cached_convert
+from cancellation import CancellationToken, ConversionCancelled, discard_partial
+from probe import DEFAULT_ZOOM, probe_file
+from progress import estimate_fraction
+from scheduler import JOB_BASE_BYTES, estimate_job_bytes
+from worker_pool import WorkerError
+
+# Причини збою, після яких завдання повторюється один раз
+RETRY_REASONS = ('crash', 'timeout', 'cpu_limit', 'memory_limit')
+
+# Масштаб рендерингу сторінок PDF для повторної спроби
+RETRY_ZOOM = 1.5
+
+# Інтервал перевірки скасування під час очікування пам'яті
+ADMISSION_POLL_INTERVAL = 1.0
+
+# Стани завершених завдань
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+
+
+class JobQueueFull(Exception):
+    """Черга завдань заповнена - нове завдання не прийнято"""
+
+
+def get_converter(kind):
+    """
+    Повертає функцію конвертації для типу вхідного файлу
+
+    Конвертери імпортуються під час першого виклику, щоб модуль можна було
+    імпортувати без PyMuPDF/BeautifulSoup.
+
+    Args:
+        kind (str): Тип вхідного файлу ('pdf', 'html' або 'docx')
+
+    Returns:
+        callable: Функція convert_*_to_scorm
+    """
+    if kind == 'pdf':
+        from pdf_converter import convert_pdf_to_scorm
+        return convert_pdf_to_scorm
+    if kind == 'html':
+        from html_converter import convert_html_to_scorm
+        return convert_html_to_scorm
+    if kind == 'docx':
+        from docx_converter import convert_docx_to_scorm
+        return convert_docx_to_scorm
+    raise ValueError(f"Непідтримуваний тип файлу: {kind}")
+
+
+class ConversionJobs:
+    """
+    Обмежений пул фонових конвертацій
+
+    Args:
+        max_workers (int): Кількість одночасних конвертацій
+        max_pending (int): Максимальна кількість завдань, що очікують у черзі
+        cache (ResultCache): Кеш результатів конвертації; None - без кешу
+        pool (WorkerPool): Пул процесів, у яких виконуються конвертації; None - у поточному процесі
+        budget (MemoryBudget): Бюджет пам'яті для допуску завдань - завдання починається, лише
+            коли в бюджеті є місце для його оціненої пікової пам'яті; None - без обмеження
+        time_budget (float): Ліміт часу завдання в секундах (від постановки в чергу); None - без ліміту
+        abandon_after (float): Завдання, стан якого не опитувався стільки секунд, скасовується;
+            None - не скасовувати
+        finished_ttl (float): Завершене завдання забувається через стільки секунд після
+            завершення; None - зберігається до виклику forget()
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, cache=None, pool=None, budget=None,
+                 time_budget=None, abandon_after=None, finished_ttl=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.cache = cache
+        self.pool = pool
+        self.budget = budget
+        self.time_budget = time_budget
+        self.abandon_after = abandon_after
+        self.finished_ttl = finished_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scorm-job')
+        self._jobs = {}
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+        if abandon_after or finished_ttl:
+            threading.Thread(target=self._watchdog, name='scorm-job-watchdog', daemon=True).start()
+
+    def submit(self, kind, input_path, output_path, **options):
+        """
+        Ставить конвертацію в чергу
+
+        Args:
+            kind (str): Тип вхідного файлу ('pdf', 'html' або 'docx')
+            input_path (str): Шлях до вхідного файлу
+            output_path (str): Шлях до вихідного SCORM-пакету
+            **options: Додаткові аргументи функції конвертації (title, scorm_version тощо)
+
+        Returns:
+            str: Ідентифікатор завдання
+
+        Raises:
+            JobQueueFull: Якщо в черзі вже max_pending завдань
+        """
+        if self.pool is None:
+            get_converter(kind)
+        elif kind not in ('pdf', 'html', 'docx'):
+            raise ValueError(f"Непідтримуваний тип файлу: {kind}")
+
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job['state'] == 'queued')
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"У черзі вже {pending} завдань, спробуйте пізніше")
+
+            job_id = uuid4().hex
+            self._jobs[job_id] = {
+                'id': job_id,
+                'kind': kind,
+                'input_path': input_path,
+                'output_path': output_path,
+                'options': options,
+                'state': 'queued',
+                'stage': None,
+                'message': 'Очікування в черзі...',
+                'progress': 0.0,
+                'bytes_written': 0,
+                'package_bytes': None,
+                'elapsed': 0.0,
+                'cached': False,
+                'report': {},
+                'attempts': 0,
+                'error': None,
+                'failure_reason': None,
+                'polled_at': time.monotonic(),
+                'finished_at': None
+            }
+            self._tokens[job_id] = CancellationToken(self.time_budget)
+
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def status(self, job_id):
+        """
+        Повертає копію стану завдання або None, якщо завдання невідоме
+
+        Поле 'state' набуває значень 'queued', 'running', 'done', 'failed' або 'cancelled'.
+        Для невдалих і скасованих завдань 'failure_reason' містить причину: 'error', 'crash',
+        'timeout', 'cpu_limit', 'memory_limit', 'cancelled', 'abandoned' або 'time_budget'. Поле
+        'report' містить показники звіту конвертації, надіслані конвертером (див. progress.py).
+
+        Кожен виклик позначає, що результат завдання ще очікують (див. abandon_after).
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            job['polled_at'] = time.monotonic()
+            return dict(job)
+
+    def cancel(self, job_id, reason='cancelled'):
+        """
+        Скасовує завдання: завдання з черги не запускається, активна конвертація
+        зупиняється в найближчій точці перевірки
+
+        Args:
+            job_id (str): Ідентифікатор завдання
+            reason (str): Причина скасування
+
+        Returns:
+            bool: True, якщо завдання ще не було завершене
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['state'] not in ('queued', 'running'):
+                return False
+            self._tokens[job_id].cancel(reason)
+            queued = job['state'] == 'queued'
+        if queued:
+            self._cancelled(job_id, reason)
+        return True
+
+    def snapshot(self):
+        """
+        Повертає поточне навантаження
+
+        Returns:
+            dict: {'queued', 'running', 'memory'} - кількість завдань у черзі та у роботі
+                і використання бюджету пам'яті (див. MemoryBudget.snapshot)
+        """
+        with self._lock:
+            states = [job['state'] for job in self._jobs.values()]
+        return {
+            'queued': states.count('queued'),
+            'running': states.count('running'),
+            'memory': self.budget.snapshot() if self.budget else None
+        }
+
+    def active_paths(self):
+        """
+        Повертає шляхи файлів завдань, що чекають у черзі або виконуються
+
+        Returns:
+            list: Шляхи вхідних файлів і вихідних пакетів
+        """
+        with self._lock:
+            return [path for job in self._jobs.values() if job['state'] in ('queued', 'running')
+                    for path in (job['input_path'], job['output_path'])]
+
+    def forget(self, job_id):
+        """Видаляє завершене завдання зі списку відстежуваних"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job['state'] in FINISHED_STATES:
+                del self._jobs[job_id]
+                del self._tokens[job_id]
+
+    def _update(self, job_id, **fields):
+        if fields.get('state') in FINISHED_STATES:
+            fields['finished_at'] = time.monotonic()
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _merge_report(self, job_id, report):
+        with self._lock:
+            if job_id in self._jobs:
+                # Новий словник замість зміни на місці: копії стану з status() лишаються незмінними
+                self._jobs[job_id]['report'] = dict(self._jobs[job_id]['report'], **report)
+
+    def _watchdog(self):
+        interval = min(limit for limit in (self.abandon_after, self.finished_ttl) if limit) / 4
+        while True:
+            time.sleep(max(1.0, interval))
+            now = time.monotonic()
+            with self._lock:
+                abandoned = [job_id for job_id, job in self._jobs.items()
+                             if self.abandon_after and job['state'] in ('queued', 'running')
+                             and now - job['polled_at'] > self.abandon_after]
+                # Завершені завдання не накопичуються в пам'яті довготривалого сервісу
+                expired = [job_id for job_id, job in self._jobs.items()
+                           if self.finished_ttl and job['state'] in FINISHED_STATES
+                           and now - job['finished_at'] > self.finished_ttl]
+                for job_id in expired:
+                    del self._jobs[job_id]
+                    del self._tokens[job_id]
+            for job_id in abandoned:
+                print(f"Завдання {job_id} ніхто не опитує понад {self.abandon_after} с, скасовуємо")
+                self.cancel(job_id, 'abandoned')
+
+    def _run(self, job_id):
+        with self._lock:
+            job = dict(self._jobs[job_id])
+            token = self._tokens[job_id]
+        if job['state'] != 'queued':
+            # Скасовано, поки завдання було в черзі
+            return
+        if token.cancelled:
+            self._cancelled(job_id, token.reason)
+            return
+
+        # Одна проба на файл: її використовують і оцінка пам'яті, і конвертер (назва курсу)
+        if job['options'].get('probe') is None:
+            try:
+                job['options'] = dict(job['options'], probe=probe_file(job['input_path'], job['kind']))
+            except (ValueError, OSError):
+                pass
+
+        if self.budget is None:
+            self._convert(job, token)
+            return
+
+        try:
+            reserved = estimate_job_bytes(job['kind'], job['input_path'],
+                                          zoom=job['options'].get('zoom') or DEFAULT_ZOOM,
+                                          probe=job['options'].get('probe'))
+        except (ValueError, OSError, KeyError):
+            reserved = JOB_BASE_BYTES
+        self._update(job_id, message="Очікування вільної пам'яті...")
+        while not self.budget.acquire(reserved, timeout=ADMISSION_POLL_INTERVAL):
+            if token.cancelled:
+                self._cancelled(job_id, token.reason)
+                return
+        try:
+            self._convert(job, token)
+        finally:
+            self.budget.release(reserved)
+
+    def _convert(self, job, token):
+        job_id = job['id']
+        self._update(job_id, state='running', message='Початок конвертації...')
+
+        def on_progress(event):
+            self._update(job_id,
+                         stage=event['stage'],
+                         message=event.get('message') or '',
+                         progress=estimate_fraction(event),
+                         bytes_written=event['bytes_written'],
+                         elapsed=event['elapsed'],
+                         cached=event.get('cached', False))
+            if event.get('package_bytes') is not None:
+                self._update(job_id, package_bytes=event['package_bytes'])
+            if event.get('report'):
+                self._merge_report(job_id, event['report'])
+
+        options = dict(job['options'])
+        attempt = 0
+        while True:
+            attempt += 1
+            self._update(job_id, attempts=attempt)
+            try:
+                if self.pool is not None:
+                    convert = functools.partial(self.pool.run, job['kind'])
+                else:
+                    convert = get_converter(job['kind'])
+                result = cached_convert(convert, job['kind'], job['input_path'], job['output_path'],
+                                        cache=self.cache, progress_callback=on_progress,
+                                        cancel_token=token, **options)
+                break
+            except ConversionCancelled as e:
+                self._cancelled(job_id, e.reason, job['output_path'])
+                return
+            except (WorkerError, MemoryError) as e:
+                reason = getattr(e, 'reason', 'memory_limit')
+                print(f"Завдання {job_id}, спроба {attempt}: {e}")
+                if attempt == 1 and reason in RETRY_REASONS:
+                    # Аварійне завершення або перевищення лімітів - найчастіше через завеликі
+                    # зображення сторінок, тому повторюємо зі зниженою роздільністю
+                    if job['kind'] == 'pdf':
+                        options['zoom'] = min(options.get('zoom', DEFAULT_ZOOM), RETRY_ZOOM)
+                    self._update(job_id, progress=0.0, failure_reason=reason,
+                                 message='Повторна спроба конвертації зі зниженою роздільністю...')
+                    continue
+                self._fail(job_id, job['output_path'], str(e) or "Конвертації не вистачило пам'яті", reason)
+                return
+            except Exception as e:
+                traceback.print_exc()
+                self._fail(job_id, job['output_path'], str(e), 'error')
+                return
+
+        if result and os.path.exists(job['output_path']):
+            self._update(job_id, state='done', progress=1.0, message='Конвертація завершена!')
+        else:
+            self._fail(job_id, job['output_path'], 'Конвертер повернув помилку', 'error')
+
+    def _fail(self, job_id, output_path, error, reason):
+        # Частково записаний пакет не повинен потрапити до користувача
+        discard_partial(output_path)
+        self._update(job_id, state='failed', error=error, failure_reason=reason,
+                     message='Помилка під час конвертації')
+
+    def _cancelled(self, job_id, reason, output_path=None):
+        discard_partial(output_path)
+        error = str(ConversionCancelled(reason))
+        self._update(job_id, state='cancelled', error=error, failure_reason=reason, message=error)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Відкладене завантаження та розміри медіа в HTML-документі пакету
+
+Сторінка курсу в iframe LMS завантажує всі зображення та вкладені iframe одразу, а
+зображення без width/height зсувають макет, коли завантажуються. Медіа нижче першого
+екрана отримують loading="lazy" (зображення - також decoding="async"). Положення
+елемента оцінюється за висотою попередніх медіа та обсягом тексту перед ним - це
+наближення, тому межа першого екрана (FOLD_HEIGHT) взята з запасом.
+
+Зображенням без width чи height відсутні атрибути заповнюються за розміром із
+заголовка файлу (див. probe.read_image_size). Щоб атрибут height не спотворював
+зображення, ширину якого змінює CSS, такі зображення позначаються атрибутом
+SIZED_IMAGE_ATTRIBUTE, а для них додається правило з нульовою специфічністю
+(INTRINSIC_SIZE_CSS) - будь-яке правило автора його перекриває. Зображення, розміри
+яких задав автор, правило не зачіпає.
+"""
+
+import math
+import os
+import posixpath
+import re
+from io import BytesIO
+
+from bs4 import NavigableString
+
+from data_uris import decode_data_uri
+from html_resources import is_local_reference, split_reference
+from probe import probe_image_size, read_image_size
+
+# Оцінка висоти першого екрана в CSS-пікселях
+FOLD_HEIGHT = 1200
+
+# Оцінка ширини вікна: ширші медіа зменшуються до неї зі збереженням пропорцій
+VIEWPORT_WIDTH = 1000
+
+# Висота медіа без відомого розміру (типова висота iframe за замовчуванням)
+DEFAULT_MEDIA_HEIGHT = 150
+
+# Оцінка рядка тексту: символів у рядку та висота рядка
+TEXT_LINE_CHARS = 80
+TEXT_LINE_HEIGHT = 24
+
+# Позначка зображень, яким розміри заповнено автоматично
+SIZED_IMAGE_ATTRIBUTE = 'data-scorm-sized'
+
+# Правило, завдяки якому позначені зображення зберігають пропорції
+INTRINSIC_SIZE_CSS = f':where(img[{SIZED_IMAGE_ATTRIBUTE}]){{height:auto}}'
+
+HTML_DIMENSION_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(?:px)?\s*$', re.IGNORECASE)
+
+# Теги, вміст яких не відображається як текст сторінки
+HIDDEN_TEXT_PARENTS = ('script', 'style', 'noscript', 'template', 'title', 'head')
+
+
+def _dimension(value):
+    """Повертає значення атрибута width/height у пікселях або None"""
+    match = HTML_DIMENSION_RE.match(str(value)) if value is not None else None
+    return float(match.group(1)) if match else None
+
+
+def _image_size(img, resources_dir):
+    """Розмір файлу зображення <img> із заголовка або None"""
+    src = img.get('src')
+    if not isinstance(src, str):
+        return None
+    if src.strip()[:5].lower() == 'data:':
+        decoded = decode_data_uri(src)
+        return read_image_size(BytesIO(decoded[1])) if decoded else None
+    if not is_local_reference(src):
+        return None
+    path, _ = split_reference(src)
+    if not path or path.startswith('/'):
+        return None
+    relative = posixpath.normpath(path)
+    if relative.startswith('../'):
+        return None
+    return probe_image_size(os.path.join(resources_dir, *relative.split('/')))
+
+
+def _fill_size(img, resources_dir):
+    """
+    Заповнює відсутні width/height зображення
+
+    Returns:
+        bool: Чи змінено атрибути
+    """
+    width, height = _dimension(img.get('width')), _dimension(img.get('height'))
+    if width is not None and height is not None:
+        return False
+    # Розмір зображень з srcset чи в <picture> залежить від обраного кандидата
+    if img.get('srcset') or img.get('sizes') or img.find_parent('picture') is not None:
+        return False
+    if (img.get('width') is not None and width is None) or (img.get('height') is not None and height is None):
+        return False
+    natural = _image_size(img, resources_dir)
+    if not natural or not natural[0] or not natural[1]:
+        return False
+    natural_width, natural_height = natural
+    if width is None and height is None:
+        width, height = natural_width, natural_height
+    elif height is None:
+        height = round(width * natural_height / natural_width)
+    else:
+        width = round(height * natural_width / natural_height)
+    img['width'], img['height'] = str(round(width)), str(round(height))
+    img[SIZED_IMAGE_ATTRIBUTE] = ''
+    return True
+
+
+def apply_lazy_loading(soup, resources_dir):
+    """
+    Додає відкладене завантаження медіа нижче першого екрана та розміри зображень
+
+    Документ має лежати в корені директорії ресурсів. Наявні атрибути loading і
+    decoding не змінюються.
+
+    Args:
+        soup (BeautifulSoup): Документ; змінюється на місці
+        resources_dir (str): Директорія ресурсів пакету
+
+    Returns:
+        dict: Звіт: 'lazy_media' - кількість медіа з відкладеним завантаженням,
+            'sized_images' - кількість зображень із заповненими розмірами
+    """
+    report = {'lazy_media': 0, 'sized_images': 0}
+    root = soup.body or soup
+    offset = 0
+    for node in root.descendants:
+        if isinstance(node, NavigableString):
+            text = node.strip()
+            if text and type(node) is NavigableString and not node.find_parent(HIDDEN_TEXT_PARENTS):
+                offset += math.ceil(len(text) / TEXT_LINE_CHARS) * TEXT_LINE_HEIGHT
+            continue
+        if node.name not in ('img', 'iframe'):
+            continue
+
+        if node.name == 'img' and _fill_size(node, resources_dir):
+            report['sized_images'] += 1
+        width, height = _dimension(node.get('width')), _dimension(node.get('height'))
+        if height is not None and width and width > VIEWPORT_WIDTH:
+            height *= VIEWPORT_WIDTH / width
+
+        if offset >= FOLD_HEIGHT:
+            if node.get('loading') is None:
+                node['loading'] = 'lazy'
+                report['lazy_media'] += 1
+            if node.name == 'img' and node.get('decoding') is None:
+                node['decoding'] = 'async'
+        offset += DEFAULT_MEDIA_HEIGHT if height is None else height
+
+    if report['sized_images']:
+        style = soup.new_tag('style')
+        style.string = INTRINSIC_SIZE_CSS
+        head = soup.head
+        first_style = head.find(['style', 'link']) if head is not None else None
+        if first_style is not None:
+            # Перед стилями автора - вони мають перевагу в каскаді
+            first_style.insert_before(style)
+        elif head is not None:
+            head.append(style)
+        else:
+            root.insert(0, style)
+    return report
@@ -4,9 +4,30 @@
 import os
 import sys
 import argparse
+from asset_inlining import INLINE_BUDGET_BYTES, INLINE_MAX_BYTES
+from css_pruning import DEFAULT_CSS_ALLOWLIST
 from docx_converter import convert_docx_to_scorm
 from pdf_converter import convert_pdf_to_scorm
 from html_converter import convert_html_to_scorm
+from html_parsing import PARSER_BACKENDS
+from minify import DEFAULT_MINIFY_MODE, MINIFY_MODES
+from probe import DEFAULT_ZOOM, default_title, probe_file
+
+# Тип вхідного файлу за розширенням
+EXTENSION_KINDS = {'.pdf': 'pdf', '.docx': 'docx', '.doc': 'docx', '.html': 'html', '.htm': 'html'}
+
+
+def html_options(args):
+    """Аргументи convert_html_to_scorm з параметрів командного рядка (крім include_resources)"""
+    return {
+        'inline_max_bytes': int(args.inline_max_kb * 1024),
+        'inline_budget_bytes': int(args.inline_budget_kb * 1024),
+        'prune_css': not args.no_css_pruning,
+        'css_allowlist': DEFAULT_CSS_ALLOWLIST + tuple(args.css_allow or ()),
+        'optimize_images': not args.no_image_optimization,
+        'lazy_loading': not args.no_lazy_loading,
+        'allow_external_resources': args.allow_external_resources
+    }
 
 
 def main():
@@ -14,16 +35,80 @@ def main():
     Головна функція для запу ску конвертера різних типів файлів у SCORM-формат
     """
     parser = argparse.ArgumentParser(description='Конвертер навчальних матеріалів у SCORM-формат')
-    parser.add_argument('input_file', nargs='?', help='Шлях до вхідного файлу (PDF, DOCX, HTML)')
+    parser.add_argument('input_file', nargs='*',
+                        help='Шлях до вхідного файлу (PDF, DOCX, HTML); у пакетному режимі - '
+                             'файли, директорії або glob-шаблони')
     parser.add_argument('--output', '-o', help='Шлях до вихідного SCORM-пакету (.zip)')
     parser.add_argument('--title', '-t', help='Назва курсу (за замовчуванням - назва вхідного файлу)')
     parser.add_argument('--scorm-version', '-v', choices=['1.2', '2004'], default='2004',
                         help='Версія SCORM (1.2 або 2004)')
     parser.add_argument('--no-resources', '-n', action='store_true',
                         help='Не включати пов\'язані ресурси для HTML (CSS, зображення тощо)')
+    parser.add_argument('--allow-external-resources', action='store_true',
+                        help='Дозволити HTML ресурси поза директорією документа (лише для довірених файлів)')
+    parser.add_argument('--inline-max-kb', type=float, default=INLINE_MAX_BYTES / 1024,
+                        help='Вбудовувати в HTML ресурси до цього розміру, КБ (0 - не вбудовувати)')
+    parser.add_argument('--inline-budget-kb', type=float, default=INLINE_BUDGET_BYTES / 1024,
+                        help='Загальний обсяг вбудованих у HTML ресурсів, КБ')
+    parser.add_argument('--no-css-pruning', action='store_true',
+                        help='Не видаляти з HTML CSS-правила, що не застосовуються до документа')
+    parser.add_argument('--css-allow', action='append', metavar='PATTERN',
+                        help='Шаблон класу чи id, що додається скриптами, - правила з ним не видаляються '
+                             '(можна вказати кілька)')
+    parser.add_argument('--no-image-optimization', action='store_true',
+                        help='Не зменшувати зображення HTML до розміру відображення і не перекодовувати їх')
+    parser.add_argument('--no-lazy-loading', action='store_true',
+                        help='Не додавати HTML відкладене завантаження медіа та розміри зображень')
+    parser.add_argument('--zoom', type=float,
+                        help=f'Масштаб рендерингу сторінок PDF (за замовчуванням - {DEFAULT_ZOOM})')
+    parser.add_argument('--minify', choices=MINIFY_MODES, default=DEFAULT_MINIFY_MODE,
+                        help='Мініфікація CSS, JavaScript та HTML пакету: off - вимкнено, safe - коментарі '
+                             'та зайві пробіли, full - агресивніше, з видаленням console.log/debug/info')
+    parser.add_argument('--batch', '-b', action='store_true',
+                        help='Пакетний режим без запитів: конвертувати всі вказані файли паралельно')
+    parser.add_argument('--jobs', '-j', type=int,
+                        help='Кількість паралельних конвертацій у пакетному режимі (за замовчуванням - за кількістю ядер)')
+    parser.add_argument('--output-dir', help='Директорія для пакетів у пакетному режимі')
+    parser.add_argument('--log', help='Журнал результатів пакетного режиму (JSON Lines)')
+    parser.add_argument('--force', '-f', action='store_true',
+                        help='Конвертувати повторно навіть файли з актуальними пакетами')
+    parser.add_argument('--timeout', type=float, help='Ліміт часу на один файл у пакетному режимі, секунд')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS,
+                        help='Парсер HTML (за замовчуванням - найшвидший встановлений)')
+    parser.add_argument('--watch', '-w', metavar='DIR',
+                        help='Відстежувати папку та конвертувати нові і змінені документи')
+    parser.add_argument('--state', help='Файл стану режиму відстеження')
+    parser.add_argument('--interval', type=float, default=2.0,
+                        help='Інтервал сканування папки в режимі відстеження, секунд')
 
     args = parser.parse_args()
 
+    if args.parser:
+        # Через оточення вибір парсера успадковують і процеси пакетного режиму та відстеження
+        os.environ['SCORM_HTML_PARSER'] = args.parser
+
+    if args.watch:
+        from watch import FolderWatcher
+        FolderWatcher(args.watch, output_dir=args.output_dir, state_path=args.state, jobs=args.jobs or 1,
+                      interval=args.interval, scorm_version=args.scorm_version,
+                      include_resources=not args.no_resources, zoom=args.zoom, minify=args.minify,
+                      html_options=html_options(args)).run()
+        return
+
+    if args.batch:
+        if not args.input_file:
+            parser.error("у пакетному режимі потрібно вказати хоча б один файл, директорію або шаблон")
+        from batch import run_batch
+        counts = run_batch(args.input_file, output_dir=args.output_dir, jobs=args.jobs,
+                           scorm_version=args.scorm_version, include_resources=not args.no_resources,
+                           zoom=args.zoom, force=args.force, log_path=args.log, job_timeout=args.timeout,
+                           minify=args.minify, html_options=html_options(args))
+        sys.exit(1 if counts.get('failed') or counts.get('cancelled') else 0)
+
+    if len(args.input_file) > 1:
+        parser.error("для кількох файлів використовуйте --batch")
+    args.input_file = args.input_file[0] if args.input_file else None
+
     # Якщо шлях до файлу не вказано через аргументи, запитуємо його
     if not args.input_file:
         print("=== SCORM CONVERTER ===")
@@ -68,27 +153,23 @@ def main():
         print("Підтримувані формати: PDF, DOCX, DOC, HTML, HTM")
         sys.exit(1)
 
+    # Одна проба файлу: назва за замовчуванням, оцінка обсягу роботи, далі - конвертеру
+    try:
+        probe = probe_file(args.input_file, EXTENSION_KINDS[file_extension])
+        print(f"Розмір файлу: {probe['size'] / 1024 ** 2:.1f} МБ"
+              + (f", сторінок: {probe['pages']}" if 'pages' in probe else '')
+              + f", орієнтовна тривалість конвертації: {probe['work']:.0f} с")
+    except (ValueError, OSError) as e:
+        print(f"Не вдалося проаналізувати файл: {e}")
+        probe = None
+
     # Запитуємо додаткові параметри, якщо вони не вказані
 
     # Назва курсу
     if not args.title:
-        default_title = os.path.splitext(os.path.basename(args.input_file))[0]
-
-        # Спроба отримати заголовок з HTML-файлу
-        if file_extension in ['.html', '.htm']:
-            try:
-                from bs4 import BeautifulSoup
-                with open(args.input_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    html_content = f.read()
-                soup = BeautifulSoup(html_content, 'html.parser')
-                title_tag = soup.find('title')
-                if title_tag and title_tag.string:
-                    default_title = title_tag.string.strip()
-            except:
-                pass
-
-        title_input = input(f"Введіть назву курсу [{default_title}]: ").strip()
-        args.title = title_input or default_title
+        suggested_title = default_title(args.input_file, probe)
+        title_input = input(f"Введіть назву курсу [{suggested_title}]: ").strip()
+        args.title = title_input or suggested_title
 
     # Вихідний файл
     if not args.output:
@@ -113,12 +194,19 @@ def main():
 
     # Виклик відповідного конвертера залежно від типу файлу
     if file_extension == '.pdf':
-        result = convert_pdf_to_scorm(args.input_file, args.output, args.title, args.scorm_version)
+        try:
+            result = convert_pdf_to_scorm(args.input_file, args.output, args.title, args.scorm_version,
+                                          probe=probe, zoom=args.zoom or DEFAULT_ZOOM, minify=args.minify)
+        except MemoryError:
+            print("\nНедостатньо пам'яті для рендерингу сторінок PDF")
+            result = False
     elif file_extension in ['.docx', '.doc']:
-        result = convert_docx_to_scorm(args.input_file, args.output, args.title, args.scorm_version)
+        result = convert_docx_to_scorm(args.input_file, args.output, args.title, args.scorm_version, probe=probe,
+                                      minify=args.minify)
     elif file_extension in ['.html', '.htm']:
         result = convert_html_to_scorm(args.input_file, args.output, args.title, args.scorm_version,
-                                       not args.no_resources)
+                                       not args.no_resources, probe=probe, minify=args.minify,
+                                       **html_options(args))
 
     if result:
         print(f"\nУспішно створено SCORM-пакет: {args.output}")
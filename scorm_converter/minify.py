@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Мініфікація CSS, JavaScript та HTML у пакеті
+
+Мініфікатори написані на чистому Python і не потребують мережі чи Node.js. Режими:
+
+    'off'   файли не змінюються
+    'safe'  видаляються лише коментарі та зайві пробіли; переноси рядків у JavaScript
+            зберігаються, тому автоматична вставка крапок з комою працює як раніше
+    'full'  додатково прибираються пробіли навколо розділових знаків, переноси рядків
+            після ';', '{' і ',', останні ';' перед '}' у CSS та окремі інструкції
+            console.log/debug/info
+
+Коментарі виду /*! ... */ (ліцензії) зберігаються в обох режимах. Рядки, шаблонні
+рядки та регулярні вирази JavaScript не змінюються.
+"""
+
+import os
+import re
+
+from cancellation import check_cancelled
+
+MINIFY_MODES = ('off', 'safe', 'full')
+
+# Режим за замовчуванням: лише коментарі та пробіли
+DEFAULT_MINIFY_MODE = 'safe'
+
+# Розширення файлів, що мініфікуються
+MINIFY_EXTENSIONS = {'.css': 'css', '.js': 'js', '.mjs': 'js', '.html': 'html', '.htm': 'html'}
+
+# Ключові слова, після яких '/' починає регулярний вираз, а не ділення
+REGEX_PRECEDING_KEYWORDS = ('return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                            'case', 'do', 'else', 'yield', 'await')
+
+# Ключові слова, після заголовка яких у дужках може йти регулярний вираз
+CONTROL_KEYWORDS = ('if', 'for', 'while', 'with')
+
+# Виклики console, що видаляються в режимі 'full' (warn та error залишаються)
+CONSOLE_CALL_RE = re.compile(r'console\s*\.\s*(?:log|debug|info)\s*\(')
+
+CSS_TOKEN_RE = re.compile(r'(?P<comment>/\*.*?(?:\*/|$))|(?P<string>"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')'
+                          r'|(?P<space>\s+)', re.DOTALL)
+CSS_PROTECTED_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*!.*?\*/)', re.DOTALL)
+CSS_TIGHT_RE = re.compile(r' ?([{};,>~]) ?|(:) ')
+
+HTML_BLOCK_RE = re.compile(r'<!--(?!\s*\[if|<!).*?-->|<(script|style|pre|textarea)\b([^>]*)>(.*?)</\1\s*>',
+                           re.IGNORECASE | re.DOTALL)
+HTML_SCRIPT_TYPES = ('', 'text/javascript', 'application/javascript', 'module', 'text/ecmascript')
+HTML_TYPE_RE = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]*)', re.IGNORECASE)
+
+JS_WORD_RE = re.compile(r'[\w$\\]')
+
+
+def minify_css(css_text, mode=DEFAULT_MINIFY_MODE):
+    """
+    Мініфікує CSS
+
+    Args:
+        css_text (str): Текст CSS
+        mode (str): Режим мініфікації (див. MINIFY_MODES)
+
+    Returns:
+        str: Мініфікований текст
+    """
+    if mode == 'off':
+        return css_text
+
+    def replace(match):
+        if match.group('string') or (match.group('comment') and match.group(0).startswith('/*!')):
+            return match.group(0)
+        return ' '
+
+    pieces = CSS_PROTECTED_RE.split(CSS_TOKEN_RE.sub(replace, css_text))
+    # Непарні елементи - рядки та коментарі-ліцензії, вони не змінюються
+    for number in range(0, len(pieces), 2):
+        piece = re.sub(r'\s+', ' ', pieces[number])
+        if mode == 'full':
+            piece = CSS_TIGHT_RE.sub(lambda m: m.group(1) or m.group(2), piece).replace(';}', '}')
+        pieces[number] = piece
+    return ''.join(pieces).strip()
+
+
+class _JavaScriptScanner:
+    """Розбиває JavaScript на код, рядки, шаблонні рядки, регулярні вирази та коментарі"""
+
+    def __init__(self, text):
+        self.text = text
+
+    def previous_token(self, start, position):
+        """Повертає останню лексему коду в text[start:position] (слово або символ) чи ''"""
+        text = self.text
+        position -= 1
+        while position >= start and text[position].isspace():
+            position -= 1
+        if position < start:
+            return ''
+        end = position + 1
+        while position >= start and re.match(r'[\w$]', text[position]):
+            position -= 1
+        return text[position + 1:end] or text[end - 1]
+
+    def skip_string(self, position):
+        quote, text = self.text[position], self.text
+        position += 1
+        while position < len(text):
+            char = text[position]
+            if char == '\\':
+                position += 2
+            elif char == quote or char == '\n':
+                return position + 1
+            else:
+                position += 1
+        return len(text)
+
+    def skip_template(self, position):
+        text = self.text
+        position += 1
+        while position < len(text):
+            char = text[position]
+            if char == '\\':
+                position += 2
+            elif char == '`':
+                return position + 1
+            elif text.startswith('${', position):
+                position = self.skip_code(position + 2, '{', '}')
+            else:
+                position += 1
+        return len(text)
+
+    def skip_regex(self, position):
+        text, in_class = self.text, False
+        position += 1
+        while position < len(text):
+            char = text[position]
+            if char == '\\':
+                position += 2
+                continue
+            if char == '\n':
+                return position
+            if char == '[':
+                in_class = True
+            elif char == ']':
+                in_class = False
+            elif char == '/' and not in_class:
+                position += 1
+                while position < len(text) and JS_WORD_RE.match(text[position]):
+                    position += 1
+                return position
+            position += 1
+        return len(text)
+
+    def skip_code(self, position, opening, closing):
+        """Пропускає код до парної закриваючої дужки; повертає позицію після неї"""
+        depth = 0
+        for kind, start, end in self.tokens(position):
+            if kind != 'code':
+                continue
+            for offset in range(start, end):
+                char = self.text[offset]
+                if char == opening:
+                    depth += 1
+                elif char == closing:
+                    if depth == 0:
+                        return offset + 1
+                    depth -= 1
+        return len(self.text)
+
+    def tokens(self, position=0):
+        """
+        Yields:
+            tuple: (вид: 'code', 'string', 'template', 'regex', 'comment' або 'license'; початок; кінець)
+        """
+        text = self.text
+        start = position
+        # Остання значуща лексема перед поточним фрагментом коду (рядок чи регулярний вираз - '"')
+        previous = ''
+        # Для відкритих дужок - чи це заголовок if/for/while: після нього '/' починає регулярний вираз
+        parens, closed_control = [], False
+        while position < len(text):
+            char = text[position]
+            kind = None
+            if char in '"\'':
+                kind, end = 'string', self.skip_string(position)
+            elif char == '`':
+                kind, end = 'template', self.skip_template(position)
+            elif text.startswith('//', position):
+                end = text.find('\n', position)
+                kind, end = 'comment', len(text) if end < 0 else end
+            elif text.startswith('/*', position):
+                end = text.find('*/', position + 2)
+                end = len(text) if end < 0 else end + 2
+                kind = 'license' if text.startswith('/*!', position) else 'comment'
+            elif char == '/':
+                token = self.previous_token(start, position) or previous
+                if token == ')':
+                    regex = closed_control
+                else:
+                    regex = not token or token[-1] not in ')]}"' and not (re.match(r'[\w$]', token[-1])
+                                                                         and token not in REGEX_PRECEDING_KEYWORDS)
+                if regex:
+                    kind, end = 'regex', self.skip_regex(position)
+            elif char == '(':
+                parens.append((self.previous_token(start, position) or previous) in CONTROL_KEYWORDS)
+            elif char == ')':
+                closed_control = parens.pop() if parens else False
+            if kind is None:
+                position += 1
+                continue
+            if start < position:
+                previous = self.previous_token(start, position) or previous
+                yield 'code', start, position
+            if kind not in ('comment', 'license'):
+                previous = '"'
+            yield kind, position, end
+            start = position = end
+        if start < len(text):
+            yield 'code', start, len(text)
+
+
+def _remove_console_calls(js_text):
+    """Видаляє окремі інструкції console.log/debug/info"""
+    scanner = _JavaScriptScanner(js_text)
+    removals = []
+    previous = ''
+    for kind, start, end in scanner.tokens():
+        if kind == 'code':
+            for match in CONSOLE_CALL_RE.finditer(js_text, start, end):
+                # Лише інструкція на початку блоку чи після ';' / '}', а не частина виразу
+                before = scanner.previous_token(start, match.start()) or previous
+                if before and before not in '{};':
+                    continue
+                close = scanner.skip_code(match.end(), '(', ')')
+                after = re.match(r'[ \t]*(;|\r?\n|$|(?=\}))', js_text[close:close + 64])
+                if after:
+                    removals.append((match.start(), close + (1 if after.group(1) == ';' else 0)))
+            previous = scanner.previous_token(start, end) or previous
+        elif kind not in ('comment', 'license'):
+            previous = '"'
+    if not removals:
+        return js_text
+    parts, position = [], 0
+    for start, end in removals:
+        if start < position:
+            # Виклик усередині аргументів уже видаленого виклику
+            continue
+        parts.append(js_text[position:start])
+        position = end
+    parts.append(js_text[position:])
+    return ''.join(parts)
+
+
+def _space_needed(code, position):
+    before = code[position - 1] if position else ''
+    after = code[position + 1] if position + 1 < len(code) else ''
+    if JS_WORD_RE.match(before) and JS_WORD_RE.match(after):
+        return True
+    # a - -b, a + +b, 1 .toString()
+    return (before in ('+', '-') and after in ('+', '-')) or (before.isdigit() and after == '.')
+
+
+def _squeeze_js(code, mode):
+    code = re.sub(r'[ \t]*\n\s*', '\n', code)
+    code = re.sub(r'[^\S\n]+', ' ', code)
+    if mode == 'full':
+        code = re.sub(r' ', lambda m: ' ' if _space_needed(code, m.start()) else '', code)
+        code = re.sub(r'(?<=[;{,])\n|\n(?=[})\],;])', '', code)
+    return code
+
+
+def minify_js(js_text, mode=DEFAULT_MINIFY_MODE):
+    """
+    Мініфікує JavaScript
+
+    Args:
+        js_text (str): Текст скрипту
+        mode (str): Режим мініфікації (див. MINIFY_MODES)
+
+    Returns:
+        str: Мініфікований текст
+    """
+    if mode == 'off':
+        return js_text
+    if mode == 'full':
+        js_text = _remove_console_calls(js_text)
+
+    # Сусідні фрагменти коду та коментарів об'єднуються, щоб пробіли між ними схлопнулись
+    runs = []
+    for kind, start, end in _JavaScriptScanner(js_text).tokens():
+        value = js_text[start:end]
+        if kind == 'comment':
+            # Коментар міг розділяти лексеми
+            value = '\n' if '\n' in value or value.startswith('//') else ' '
+        is_code = kind in ('code', 'comment')
+        if is_code and runs and runs[-1][0]:
+            runs[-1][1].append(value)
+        else:
+            runs.append((is_code, [value]))
+    return ''.join(_squeeze_js(''.join(values), mode) if is_code else ''.join(values)
+                   for is_code, values in runs).strip()
+
+
+def minify_html(html_text, mode=DEFAULT_MINIFY_MODE):
+    """
+    Мініфікує HTML: коментарі (крім умовних), пробіли між тегами, вбудовані <style> та <script>
+
+    Вміст <pre> і <textarea> не змінюється. У режимі 'full' пробіли в тексті між тегами
+    також схлопуються до одного.
+
+    Args:
+        html_text (str): HTML-документ
+        mode (str): Режим мініфікації (див. MINIFY_MODES)
+
+    Returns:
+        str: Мініфікований документ
+    """
+    if mode == 'off':
+        return html_text
+
+    def squeeze(markup):
+        markup = re.sub(r'>\s+<', lambda m: '>\n<' if '\n' in m.group(0) else '> <', markup)
+        if mode == 'full':
+            markup = re.sub(r'>([^<]+)<', lambda m: '>' + re.sub(r'\s+', ' ', m.group(1)) + '<', markup)
+        return markup
+
+    parts, position = [], 0
+    for match in HTML_BLOCK_RE.finditer(html_text):
+        parts.append(squeeze(html_text[position:match.start()]))
+        position = match.end()
+        if match.group(1) is None:
+            # Коментар
+            continue
+        tag, attributes, content = match.group(1).lower(), match.group(2), match.group(3)
+        if tag == 'style':
+            content = minify_css(content, mode)
+        elif tag == 'script' and content.strip():
+            script_type = HTML_TYPE_RE.search(attributes)
+            if (script_type.group(1).lower() if script_type else '') in HTML_SCRIPT_TYPES:
+                content = minify_js(content, mode)
+        parts.append(html_text[match.start():match.start(3)] + content + html_text[match.end(3):match.end()])
+    parts.append(squeeze(html_text[position:]))
+    return ''.join(parts)
+
+
+MINIFIERS = {'css': minify_css, 'js': minify_js, 'html': minify_html}
+
+
+def minify_package(content_dir, mode=DEFAULT_MINIFY_MODE, cancel_token=None, progress=None):
+    """
+    Мініфікує CSS, JavaScript та HTML у директорії контенту пакету
+
+    Файли *.min.css та *.min.js пропускаються. Файл перезаписується, лише якщо він став меншим.
+
+    Args:
+        content_dir (str): Директорія контенту SCORM-пакету
+        mode (str): Режим мініфікації (див. MINIFY_MODES)
+        cancel_token (CancellationToken): Токен скасування; перевіряється між файлами
+        progress (ProgressReporter): Отримувач події етапу 'package' зі звітом (поле 'report')
+
+    Returns:
+        dict: Звіт: 'minified_files' - шлях файлу (posix, відносно директорії контенту) ->
+            заощаджені байти, 'minify_bytes_saved' - загальна економія
+
+    Raises:
+        ValueError: Якщо режим невідомий
+        ConversionCancelled: Якщо конвертацію скасовано
+    """
+    if mode not in MINIFY_MODES:
+        raise ValueError(f"Невідомий режим мініфікації: {mode}")
+    report = {'minified_files': {}, 'minify_bytes_saved': 0}
+    if mode == 'off':
+        return report
+
+    for root, dirs, files in os.walk(content_dir):
+        dirs.sort()
+        for name in sorted(files):
+            kind = MINIFY_EXTENSIONS.get(os.path.splitext(name)[1].lower())
+            if kind is None or name.lower().endswith(('.min.css', '.min.js')):
+                continue
+            check_cancelled(cancel_token)
+            path = os.path.join(root, name)
+            try:
+                with open(path, 'r', encoding='utf-8', newline='') as f:
+                    original = f.read()
+            except UnicodeDecodeError:
+                continue
+            minified = MINIFIERS[kind](original, mode)
+            saved = len(original.encode('utf-8')) - len(minified.encode('utf-8'))
+            if saved <= 0:
+                continue
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write(minified)
+            relative = os.path.relpath(path, content_dir).replace(os.sep, '/')
+            report['minified_files'][relative] = saved
+            report['minify_bytes_saved'] += saved
+
+    if progress is not None and report['minify_bytes_saved']:
+        progress.emit('package', f"Мініфікація ({mode}): заощаджено {report['minify_bytes_saved'] / 1024:.1f} КБ "
+                                 f"у файлах: {len(report['minified_files'])}",
+                      current=1, total=1, report=report)
+    return report
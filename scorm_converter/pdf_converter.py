@@ -14,19 +14,30 @@
 """
 
 import argparse
+import hashlib
 import os
 import tempfile
 import shutil
-import zipfile
 import xml.etree.ElementTree as ET
 import xml.dom.minidom as minidom
 from datetime import datetime
-from uuid import uuid4
 import base64
 import sys
 import re
+import queue
+import struct
+import threading
+import zlib
 from pathlib import Path
 from bs4 import BeautifulSoup
+from cancellation import ConversionCancelled, check_cancelled, discard_partial
+from checkpoint import ConversionJournal, WorkDirError
+from html_parsing import parse_html
+from archive import content_course_id, write_scorm_zip
+from minify import DEFAULT_MINIFY_MODE, minify_package
+from probe import DEFAULT_ZOOM, default_title, probe_pdf
+from progress import ProgressReporter
+from scheduler import estimate_page_bytes, get_memory_budget
 
 try:
     import fitz  # PyMuPDF для роботи з PDF
@@ -35,8 +46,30 @@ except ImportError:
     print("Встановіть її за допомогою команди: pip install PyMuPDF")
     sys.exit(1)
 
+# Фрагменти повідомлень MuPDF про невдале виділення пам'яті
+MUPDF_ALLOCATION_ERRORS = ('out of memory', 'malloc', 'calloc', 'realloc', 'cannot allocate')
 
-def convert_pdf_to_html(pdf_path, output_dir=None, extract_images=True, page_break=True):
+
+def as_memory_error(error):
+    """
+    Повертає MemoryError для помилки виділення пам'яті (Python або MuPDF) або None
+
+    Args:
+        error (Exception): Виняток рендерингу чи кодування сторінки
+
+    Returns:
+        MemoryError: Виняток нестачі пам'яті або None для інших помилок
+    """
+    if isinstance(error, MemoryError):
+        return error
+    message = str(error).lower()
+    if any(marker in message for marker in MUPDF_ALLOCATION_ERRORS):
+        return MemoryError(str(error))
+    return None
+
+
+def convert_pdf_to_html(pdf_path, output_dir=None, extract_images=True, page_break=True, split_chapters=False,
+                        journal=None, progress=None, zoom=DEFAULT_ZOOM, cancel_token=None):
     """
     Конвертує PDF у простий HTML з відображенням сторінок послідовно одна за одною
     для можливості простого прокручування
@@ -46,12 +79,19 @@ def convert_pdf_to_html(pdf_path, output_dir=None, extract_images=True, page_bre
         output_dir (str): Директорія для збереження HTML та зображень
         extract_images (bool): Чи видобувати зображення з PDF
         page_break (bool): Чи додавати розриви сторінок між сторінками PDF
+        split_chapters (bool): Створити окремий переглядач для кожного розділу верхнього рівня
+            зі змісту PDF замість одного переглядача на весь документ
+        journal (ConversionJournal): Журнал для збереження прогресу та відновлення конвертації
+        progress (ProgressReporter): Отримувач подій прогресу (за замовчуванням - друк у консоль)
+        zoom (float): Масштаб рендерингу сторінок
+        cancel_token (CancellationToken): Токен скасування, що перевіряється між сторінками
 
     Returns:
         tuple: (Шлях до HTML, словник з метаданими)
     """
+    progress = progress or ProgressReporter()
     try:
-        print(f"Конвертування PDF файлу: {pdf_path}")
+        progress.emit('parse', f"Конвертування PDF файлу: {pdf_path}")
 
         # Створюємо тимчасову директорію, якщо не вказана
         if not output_dir:
@@ -73,17 +113,311 @@ def convert_pdf_to_html(pdf_path, output_dir=None, extract_images=True, page_bre
         metadata = doc.metadata
         if metadata is None:
             metadata = {}
+        doc_title = metadata.get('title', pdf_title)
+
+        # Рендеримо сторінки один раз - зображення спільні для всіх переглядачів
+        if journal:
+            page_images = render_pdf_pages(doc, images_dir, zoom=zoom,
+                                           completed_pages=journal.completed_pages(output_dir),
+                                           on_page_written=journal.record_page, progress=progress,
+                                           cancel_token=cancel_token)
+        else:
+            page_images = render_pdf_pages(doc, images_dir, zoom=zoom, progress=progress,
+                                           cancel_token=cancel_token)
+        page_count = doc.page_count
+
+        chapters = get_pdf_chapters(doc) if split_chapters else []
+        if split_chapters and not chapters:
+            progress.emit('render', "У PDF немає змісту з розділами верхнього рівня, створюємо один переглядач")
+        doc.close()
+
+        if chapters:
+            # Окремий невеликий переглядач для кожного розділу
+            for chapter in chapters:
+                chapter['html'] = f"chapter_{chapter['number']}.html"
+                chapter['images'] = [page_images[num] for num in range(chapter['start'], chapter['end'] + 1)
+                                     if page_images.get(num)]
+                chapter_content = build_pdf_viewer_html(
+                    chapter['title'],
+                    range(chapter['start'], chapter['end'] + 1),
+                    page_images,
+                    f"Сторінки {chapter['start']}–{chapter['end']} з {page_count}"
+                )
+                with open(os.path.join(output_dir, chapter['html']), 'w', encoding='utf-8') as f:
+                    f.write(chapter_content)
+                progress.emit('render', f"Створено переглядач розділу '{chapter['title']}': {chapter['html']}",
+                              current=page_count, total=page_count,
+                              bytes_written=len(chapter_content.encode('utf-8')))
+
+            html_path = os.path.join(output_dir, chapters[0]['html'])
+        else:
+            # Створюємо HTML файл
+            html_path = os.path.join(output_dir, 'index.html')
+            html_content = build_pdf_viewer_html(doc_title, range(1, page_count + 1), page_images,
+                                                 f"PDF документ • {page_count} сторінок")
+
+            # Зберігаємо HTML файл
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(html_content)
+
+            progress.emit('render', f"HTML файл створено: {html_path}", current=page_count, total=page_count,
+                          bytes_written=len(html_content.encode('utf-8')))
+
+        return (html_path, {
+            'title': doc_title,
+            'author': metadata.get('author', 'Не вказано'),
+            'pages': page_count,
+            'images_dir': images_dir,
+            'output_dir': output_dir,
+            'is_temp': is_temp,
+            'chapters': chapters
+        })
+
+    except (ConversionCancelled, MemoryError):
+        raise
+    except Exception as e:
+        print(f"Помилка при конвертації PDF в HTML: {e}")
+        import traceback
+        traceback.print_exc()
+        return None, None
+
+
+def render_pdf_pages(doc, images_dir, zoom=DEFAULT_ZOOM, workers=None, max_inflight=None, completed_pages=None,
+                     on_page_written=None, progress=None, budget=None, cancel_token=None):
+    """
+    Рендерить усі сторінки PDF у PNG-зображення конвеєром рендеринг -> кодування/запис
+
+    Поточний потік лише рендерить pixmap-и (документ MuPDF не можна ділити між потоками),
+    а пул потоків кодує їх у PNG та записує на диск. Кодування через zlib відпускає GIL,
+    тому рендеринг наступних сторінок іде паралельно з кодуванням і записом попередніх.
+    Кожна сторінка перед рендерингом резервує оцінений розмір свого pixmap у бюджеті
+    пам'яті (scheduler.MemoryBudget) і звільняє його після запису, тож кількість сторінок
+    у роботі залежить від їх розміру: дрібні сторінки обробляються паралельно, великі -
+    по одній. Додатково не більше max_inflight сторінок одночасно чекають на запис.
+
+    Args:
+        doc (fitz.Document): Відкритий PDF-документ
+        images_dir (str): Директорія для збереження зображень
+        zoom (float): Масштаб рендерингу сторінок
+        workers (int): Кількість потоків кодування/запису (за замовчуванням - за кількістю ядер)
+        max_inflight (int): Максимальна кількість сторінок у пам'яті, що очікують на запис
+            (за замовчуванням - вдвічі більше за кількість потоків)
+        completed_pages (dict): Вже створені та перевірені сторінки (номер -> відносний шлях),
+            які не рендеряться повторно
+        on_page_written (callable): Викликається як on_page_written(номер, відносний шлях, sha256)
+            після запису кожної сторінки (з потоку запису)
+        progress (ProgressReporter): Отримувач подій прогресу (подія 'render' на кожну сторінку)
+        budget (MemoryBudget): Бюджет пам'яті (за замовчуванням - спільний для процесу)
+        cancel_token (CancellationToken): Токен скасування, що перевіряється перед кожною сторінкою
+
+    Returns:
+        dict: Номер сторінки (з 1) -> відносний шлях до зображення або None у разі помилки
+
+    Raises:
+        ConversionCancelled: Якщо конвертацію скасовано (вже записані сторінки залишаються)
+        MemoryError: Якщо для рендерингу чи кодування сторінки не вистачило пам'яті -
+            пакет без частини сторінок не створюється
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_inflight is None:
+        max_inflight = workers * 2
+    budget = budget or get_memory_budget()
+    progress = progress or ProgressReporter()
+
+    page_images = dict(completed_pages or {})
+    done_lock = threading.Lock()
+    done = [len(page_images)]
+    pending = queue.Queue()
+    # Перша нестача пам'яті в потоці запису - рендеринг зупиняється, виняток передається далі
+    memory_errors = []
+
+    # Прибираємо недописані файли, що могли залишитися після перерваної конвертації
+    for file in os.listdir(images_dir):
+        if file.endswith('.part'):
+            os.remove(os.path.join(images_dir, file))
+    inflight = threading.BoundedSemaphore(max(1, max_inflight))
+
+    def encode_worker():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+
+            page_num, page_pixmap, page_bytes = item
+            try:
+                page_image_path = os.path.join(images_dir, f"page{page_num}.png")
+                png_data = encode_png(page_pixmap)
+
+                # Запис через тимчасовий файл, щоб після збою не лишалося частково записаних сторінок
+                with open(page_image_path + '.part', 'wb') as f:
+                    f.write(png_data)
+                os.replace(page_image_path + '.part', page_image_path)
+
+                page_images[page_num] = f"images/page{page_num}.png"
+
+                if on_page_written:
+                    on_page_written(page_num, page_images[page_num], hashlib.sha256(png_data).hexdigest())
+
+                with done_lock:
+                    done[0] += 1
+                    current = done[0]
+                progress.emit('render', f"  Створено зображення сторінки {page_num}, шлях: {page_image_path}",
+                              current=current, total=doc.page_count, bytes_written=len(png_data), page=page_num)
+            except Exception as e:
+                memory_error = as_memory_error(e)
+                if memory_error is not None:
+                    memory_errors.append(memory_error)
+                    continue
+                print(f"Помилка при створенні зображення сторінки {page_num}: {e}")
+                page_images[page_num] = None
+            finally:
+                # Звільняємо pixmap до того, як дозволити рендеринг наступної сторінки
+                del page_pixmap, item
+                budget.release(page_bytes)
+                inflight.release()
+
+    threads = [threading.Thread(target=encode_worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for page_num, page in enumerate(doc):
+            if page_num + 1 in page_images:
+                progress.emit('render', f"Сторінка {page_num + 1}/{doc.page_count} вже створена, пропускаємо",
+                              current=done[0], total=doc.page_count)
+                continue
+            check_cancelled(cancel_token)
+            if memory_errors:
+                break
+
+            progress.emit('render', f"Обробка сторінки {page_num + 1}/{doc.page_count}",
+                          current=done[0], total=doc.page_count)
+
+            # Чекаємо, поки кількість сторінок у черзі на запис не опуститься нижче ліміту
+            # і в бюджеті не звільниться пам'ять для pixmap цієї сторінки
+            page_bytes = estimate_page_bytes(page.rect, zoom)
+            inflight.acquire()
+            budget.acquire(page_bytes)
+            try:
+                # Високоякісне зображення для відображення
+                page_pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            except Exception as e:
+                budget.release(page_bytes)
+                inflight.release()
+                memory_error = as_memory_error(e)
+                if memory_error is not None:
+                    memory_errors.append(memory_error)
+                    break
+                print(f"Помилка при створенні зображення сторінки {page_num + 1}: {e}")
+                page_images[page_num + 1] = None
+                continue
+
+            pending.put((page_num + 1, page_pixmap, page_bytes))
+            del page_pixmap
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+
+    if memory_errors:
+        raise memory_errors[0]
+    return page_images
+
+
+def encode_png(pixmap, compress_level=6):
+    """
+    Кодує pixmap у PNG засобами zlib
+
+    На відміну від Pixmap.tobytes()/save(), zlib.compress відпускає GIL, тож кілька
+    сторінок можна кодувати паралельно у потоках. Результат за розміром відповідає PNG від MuPDF.
+
+    Args:
+        pixmap (fitz.Pixmap): Відрендерена сторінка (Gray/RGB з альфа-каналом або без)
+        compress_level (int): Рівень стиснення zlib (0-9)
+
+    Returns:
+        bytes: Вміст PNG-файлу
+    """
+    color_types = {1: 0, 2: 4, 3: 2, 4: 6}
+    if pixmap.n not in color_types:
+        # Нестандартні колірні простори (CMYK тощо) кодуємо засобами MuPDF
+        return pixmap.tobytes('png')
+
+    samples = pixmap.samples
+    stride = pixmap.stride
+    row_length = pixmap.width * pixmap.n
+    # Кожен рядок зображення PNG починається з байта фільтра (0 - без фільтра)
+    raw = b''.join(b'\x00' + samples[offset:offset + row_length]
+                   for offset in range(0, stride * pixmap.height, stride))
+
+    def chunk(chunk_type, data):
+        return (struct.pack('>I', len(data)) + chunk_type + data +
+                struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', pixmap.width, pixmap.height, 8, color_types[pixmap.n], 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(raw, compress_level)) + chunk(b'IEND', b''))
 
-        # Створюємо HTML файл
-        html_path = os.path.join(output_dir, 'index.html')
 
-        # Генеруємо HTML вміст - максимально простий вертикальний перегляд PDF
-        html_content = f"""<!DOCTYPE html>
+def get_pdf_chapters(doc):
+    """
+    Визначає розділи верхнього рівня за змістом (outline) PDF
+
+    Сторінки перед першим розділом додаються до першого розділу,
+    кожен розділ триває до сторінки перед початком наступного.
+
+    Args:
+        doc (fitz.Document): Відкритий PDF-документ
+
+    Returns:
+        list: Список словників {'number', 'title', 'start', 'end'} (сторінки з 1),
+              порожній список, якщо змісту немає
+    """
+    starts = []
+    for level, chapter_title, page in doc.get_toc(simple=True):
+        if level != 1 or page < 1 or page > doc.page_count:
+            continue
+        # Розділи, що починаються на тій самій або попередній сторінці, об'єднуємо з попереднім
+        if starts and page <= starts[-1][1]:
+            continue
+        starts.append((chapter_title.strip() or f"Розділ {len(starts) + 1}", page))
+
+    chapters = []
+    for index, (chapter_title, start) in enumerate(starts):
+        end = starts[index + 1][1] - 1 if index + 1 < len(starts) else doc.page_count
+        chapters.append({
+            'number': index + 1,
+            'title': chapter_title,
+            'start': 1 if index == 0 else start,
+            'end': end
+        })
+
+    return chapters
+
+
+def build_pdf_viewer_html(title, page_numbers, page_images, page_info):
+    """
+    Генерує HTML переглядача для набору сторінок PDF - максимально простий вертикальний перегляд
+
+    Args:
+        title (str): Заголовок переглядача
+        page_numbers (iterable): Номери сторінок (з 1), що показуються у переглядачі
+        page_images (dict): Номер сторінки -> відносний шлях до зображення (див. render_pdf_pages)
+        page_info (str): Підпис під заголовком
+
+    Returns:
+        str: HTML-вміст
+    """
+    page_numbers = list(page_numbers)
+
+    html_content = f"""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{metadata.get('title', pdf_title)}</title>
+    <title>{title}</title>
     <style>
         /* Базові стилі */
         body, html {{
@@ -161,43 +495,33 @@ def convert_pdf_to_html(pdf_path, output_dir=None, extract_images=True, page_bre
 <body>
     <!-- Заголовок -->
     <div id="header">
-        <h1 id="title">{metadata.get('title', pdf_title)}</h1>
-        <div id="pageInfo">PDF документ • {doc.page_count} сторінок</div>
+        <h1 id="title">{title}</h1>
+        <div id="pageInfo">{page_info}</div>
     </div>
 
     <!-- Контейнер для всіх сторінок -->
     <div id="pages-container">
 """
 
-        # Додаємо всі сторінки послідовно
-        for page_num, page in enumerate(doc):
-            print(f"Обробка сторінки {page_num + 1}/{doc.page_count}")
-
-            # Створюємо зображення сторінки
-            try:
-                # Високоякісне зображення для відображення
-                page_pixmap = page.get_pixmap(matrix=fitz.Matrix(2.5, 2.5))
-                page_image_path = os.path.join(images_dir, f"page{page_num + 1}.png")
-                page_pixmap.save(page_image_path)
-
-                page_img_rel_path = f"images/page{page_num + 1}.png"
-                html_content += f"""        <div class="page-container" id="page-{page_num + 1}" data-page="{page_num + 1}">
-            <div class="page-header">Сторінка {page_num + 1}</div>
-            <img src="{page_img_rel_path}" class="page-image" alt="Сторінка {page_num + 1}" 
-                 onload="trackPageLoad({page_num + 1})" onerror="trackPageError({page_num + 1})">
+    # Додаємо сторінки послідовно
+    for page_num in page_numbers:
+        page_img_rel_path = page_images.get(page_num)
+        if page_img_rel_path:
+            html_content += f"""        <div class="page-container" id="page-{page_num}" data-page="{page_num}">
+            <div class="page-header">Сторінка {page_num}</div>
+            <img src="{page_img_rel_path}" class="page-image" alt="Сторінка {page_num}" 
+                 onload="trackPageLoad({page_num})" onerror="trackPageError({page_num})">
         </div>
 """
-                print(f"  Створено зображення сторінки {page_num + 1}, шлях: {page_image_path}")
-            except Exception as e:
-                print(f"Помилка при створенні зображення сторінки {page_num + 1}: {e}")
-                html_content += f"""        <div class="page-container" id="page-{page_num + 1}" data-page="{page_num + 1}">
-            <div class="page-header">Сторінка {page_num + 1}</div>
-            <div style="padding: 20px; color: red;">Помилка завантаження сторінки {page_num + 1}</div>
+        else:
+            html_content += f"""        <div class="page-container" id="page-{page_num}" data-page="{page_num}">
+            <div class="page-header">Сторінка {page_num}</div>
+            <div style="padding: 20px; color: red;">Помилка завантаження сторінки {page_num}</div>
         </div>
 """
 
-        # Додаємо футер
-        html_content += """    </div>
+    # Додаємо футер
+    html_content += """    </div>
 
     <!-- Футер -->
     <div id="footer">
@@ -206,7 +530,7 @@ def convert_pdf_to_html(pdf_path, output_dir=None, extract_images=True, page_bre
 
     <script>
         // Глобальні змінні
-        var totalPages = """ + str(doc.page_count) + """;
+        var totalPages = """ + str(len(page_numbers)) + """;
         var pagesLoaded = 0;
         var visiblePages = new Set();
         var startTime = Date.now();
@@ -352,36 +676,15 @@ def convert_pdf_to_html(pdf_path, output_dir=None, extract_images=True, page_bre
 </html>
 """
 
-        # Зберігаємо HTML файл
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+    return html_content
 
-        print(f"HTML файл створено: {html_path}")
 
-        return (html_path, {
-            'title': metadata.get('title', pdf_title),
-            'author': metadata.get('author', 'Не вказано'),
-            'pages': doc.page_count,
-            'images_dir': images_dir,
-            'output_dir': output_dir,
-            'is_temp': is_temp
-        })
-
-    except Exception as e:
-        print(f"Помилка при конвертації PDF в HTML: {e}")
-        import traceback
-        traceback.print_exc()
-        return None, None
-
-
-def process_html_file(html_path, content_dir, resources_dir, include_resources=True):
+def process_html_file(html_path, content_dir, resources_dir, include_resources=True, progress=None):
     """
     Обробляє HTML-файл та копіює пов'язані ресурси
     """
-    print(f"Почато обробку HTML-файлу: {html_path}")
-    print(f"Директорія контенту: {content_dir}")
-    print(f"Директорія ресурсів: {resources_dir}")
-    print(f"Включення ресурсів: {include_resources}")
+    progress = progress or ProgressReporter()
+    progress.emit('package', f"Почато обробку HTML-файлу: {html_path}")
 
     resources = {
         'html': [],
@@ -395,29 +698,27 @@ def process_html_file(html_path, content_dir, resources_dir, include_resources=T
     # Копіювання HTML-файлу
     html_filename = os.path.basename(html_path)
     html_dest = os.path.join(resources_dir, html_filename)
-    print(f"Копіювання HTML-файлу з {html_path} в {html_dest}")
 
     try:
         # Читаємо HTML-вміст
         with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
             html_content = f.read()
-        print(f"Успішно прочитано HTML-файл довжиною {len(html_content)} символів")
+        progress.emit('package', f"Успішно прочитано HTML-файл довжиною {len(html_content)} символів")
 
         # Парсимо HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        print("HTML успішно розібрано за допомогою BeautifulSoup")
+        soup = parse_html(html_content)
+        progress.emit('package', f"HTML успішно розібрано за допомогою BeautifulSoup ({soup.builder.NAME})")
 
         # Обробка для локальних ресурсів
         if include_resources:
             # Обробка локальних зображень
             images = soup.find_all('img')
-            print(f"Знайдено {len(images)} зображень")
+            progress.emit('package', f"Знайдено {len(images)} зображень")
 
             for img in images:
                 src = img.get('src')
                 if src and not src.startswith(('http://', 'https://', 'data:', '//')):
                     original_path = os.path.normpath(os.path.join(os.path.dirname(html_path), src))
-                    print(f"Обробка зображення: {src} -> {original_path}")
 
                     if os.path.exists(original_path) and os.path.isfile(original_path):
                         # Створюємо структуру директорій, якщо потрібно
@@ -429,15 +730,12 @@ def process_html_file(html_path, content_dir, resources_dir, include_resources=T
                         dest_file = os.path.join(resources_dir, src)
 
                         # Перевіряємо чи не копіюємо файл сам у себе
-                        if os.path.abspath(original_path) == os.path.abspath(dest_file):
-                            print(f"  Пропускаємо копіювання {original_path} - файл вже знаходиться в потрібному місці")
-                        else:
-                            print(f"  Копіювання {original_path} в {dest_file}")
+                        if os.path.abspath(original_path) != os.path.abspath(dest_file):
                             shutil.copy2(original_path, dest_file)
 
                         resources['images'].append(src)
                     else:
-                        print(f"  Файл {original_path} не існує або не є файлом")
+                        progress.emit('package', f"  Файл {original_path} не існує або не є файлом")
 
         # Додаємо meta тег для запобігання зовнішніх запитів
         head = soup.find('head')
@@ -447,27 +745,25 @@ def process_html_file(html_path, content_dir, resources_dir, include_resources=T
             meta_csp[
                 'content'] = "default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'; img-src 'self' data:;"
             head.insert(0, meta_csp)
-            print("Додано Content-Security-Policy для захисту від зовнішніх запитів")
+            progress.emit('package', "Додано Content-Security-Policy для захисту від зовнішніх запитів")
 
         # Зберігаємо оновлений HTML-вміст
-        print(f"Збереження оновленого HTML в {html_dest}")
         with open(html_dest, 'w', encoding='utf-8') as f:
             f.write(str(soup))
 
         # Додаємо HTML до списку ресурсів
         resources['html'].append(html_filename)
-        print(f"Додано HTML-файл {html_filename} до списку ресурсів")
 
     except Exception as e:
         # Перевіряємо чи це помилка копіювання того самого файлу
         if isinstance(e, shutil.SameFileError):
-            print(f"Попередження: {e}")
-            print("Пропускаємо спробу копіювання файлу самого в себе")
+            progress.emit('package', f"Попередження: {e}")
+            progress.emit('package', "Пропускаємо спробу копіювання файлу самого в себе")
 
             # Якщо файл HTML вже існує, просто додаємо його до списку ресурсів
             if os.path.exists(html_dest):
                 resources['html'].append(html_filename)
-                print(f"Використовуємо вже наявний HTML-файл: {html_filename}")
+                progress.emit('package', f"Використовуємо вже наявний HTML-файл: {html_filename}")
 
                 # Також шукаємо всі зображення в директорії
                 for img_dir, _, files in os.walk(os.path.join(resources_dir, 'images')):
@@ -475,10 +771,9 @@ def process_html_file(html_path, content_dir, resources_dir, include_resources=T
                         if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
                             img_rel_path = os.path.join('images', file)
                             resources['images'].append(img_rel_path)
-                            print(f"  Додано зображення до ресурсів: {img_rel_path}")
             else:
                 # На випадок якщо файл не існує, створюємо запасний варіант
-                create_fallback_html(html_dest, resources)
+                create_fallback_html(html_dest, resources, progress=progress)
         else:
             print(f"Помилка при обробці HTML-файлу: {e}")
             import traceback
@@ -502,19 +797,18 @@ def process_html_file(html_path, content_dir, resources_dir, include_resources=T
 
                             img_rel_path = os.path.join('images', file)
                             resources['images'].append(img_rel_path)
-                            print(f"  Додано зображення до ресурсів: {img_rel_path}")
 
                 pdf_info['pages'] = page_count
 
             # Створюємо замість проблемного HTML простий чистий HTML без зовнішніх ресурсів
-            create_fallback_html(html_dest, resources, pdf_info)
+            create_fallback_html(html_dest, resources, pdf_info, progress)
 
-    print("Завершено обробку HTML-файлу")
     return resources
 
 
-def create_fallback_html(html_dest, resources, pdf_info=None):
+def create_fallback_html(html_dest, resources, pdf_info=None, progress=None):
     """Створює запасний простий HTML-файл у випадку помилки"""
+    progress = progress or ProgressReporter()
     # Базова інформація про PDF, якщо доступна
     pdf_title = "PDF документ"
     author = "Невідомий"
@@ -647,16 +941,23 @@ def create_fallback_html(html_dest, resources, pdf_info=None):
         f.write(clean_html)
 
     resources['html'].append(html_filename)
-    print(f"Створено HTML-файл з переглядом сторінок")
+    progress.emit('package', f"Створено HTML-файл з переглядом сторінок")
 
     return resources
 
 
-def create_scorm_wrapper(content_dir, title, html_filename, html_files):
+def create_scorm_wrapper(content_dir, title, html_filename, html_files, index_filename='index.html'):
     """
     Створює безпечну HTML-обгортку для SCORM
+
+    Args:
+        content_dir (str): Директорія контенту
+        title (str): Заголовок обгортки
+        html_filename (str): HTML-файл у resources/, що відкривається в iframe
+        html_files (list): Список HTML-ресурсів
+        index_filename (str): Назва файлу обгортки (окрема для кожного SCO)
     """
-    index_path = os.path.join(content_dir, 'index.html')
+    index_path = os.path.join(content_dir, index_filename)
 
     # Очищення title від потенційно небезпечних HTML-тегів
     title = BeautifulSoup(title, "html.parser").get_text()
@@ -853,7 +1154,7 @@ def create_scorm_wrapper(content_dir, title, html_filename, html_files):
     with open(index_path, 'w', encoding='utf-8') as f:
         f.write(html_content)
 
-    return 'index.html'
+    return index_filename
 
 
 def create_scorm_api_js(content_dir, scorm_version):
@@ -1311,7 +1612,8 @@ function checkSCORMStatus() {
         f.write(js_content)
 
 
-def create_scorm_manifest(content_dir, title, resources, index_file, course_id, scorm_version):
+def create_scorm_manifest(content_dir, title, resources, index_file, course_id, scorm_version, scos=None,
+                          progress=None):
     """
     Створює маніфест SCORM
 
@@ -1322,14 +1624,16 @@ def create_scorm_manifest(content_dir, title, resources, index_file, course_id,
         index_file (str): Назва індексного HTML-файлу
         course_id (str): Ідентифікатор курсу
         scorm_version (str): Версія SCORM ('1.2' або '2004')
+        scos (list): Необов'язковий список SCO {'title', 'href', 'files'} - по одному
+            елементу організації та ресурсу на кожен розділ замість одного спільного
+        progress (ProgressReporter): Отримувач подій прогресу
     """
+    progress = progress or ProgressReporter()
     manifest_path = os.path.join(content_dir, 'imsmanifest.xml')
-    print(f"Створення маніфесту SCORM у {manifest_path}")
-    print(f"Отримані ресурси: {resources}")
 
     # Перевірка типу resources
     if not isinstance(resources, dict):
-        print(f"УВАГА: resources не є словником: {type(resources)}")
+        progress.emit('package', f"УВАГА: resources не є словником: {type(resources)}")
         # Створення порожнього словника ресурсів для запобігання помилкам
         resources = {
             'html': [],
@@ -1380,10 +1684,71 @@ def create_scorm_manifest(content_dir, title, resources, index_file, course_id,
     org_title = ET.SubElement(organization, 'title')
     org_title.text = title
 
+    if scos:
+        # Окремий елемент та ресурс для кожного SCO
+        resources_elem = ET.SubElement(manifest, 'resources')
+        for number, sco in enumerate(scos, 1):
+            create_manifest_item(organization, f'item_{number}', f'resource_{number}', sco['title'], scorm_version)
+            resource = create_manifest_resource(resources_elem, f'resource_{number}', sco['href'], scorm_version)
+            for file_path in sco['files']:
+                file_elem = ET.SubElement(resource, 'file')
+                file_elem.set('href', file_path)
+
+        write_manifest(manifest, manifest_path, progress)
+        return
+
     # Створення елемента item
+    create_manifest_item(organization, 'item_1', 'resource_1', title, scorm_version)
+
+    # Ресурси
+    resources_elem = ET.SubElement(manifest, 'resources')
+
+    # Створення основного ресурсу
+    resource = create_manifest_resource(resources_elem, 'resource_1', index_file, scorm_version)
+
+    # Додавання файлів
+    file_list = [index_file, 'scorm_api.js']
+
+    # Додаємо шляхи до ресурсів
+    for res_type in ['html', 'css', 'js', 'images', 'fonts', 'other']:
+        if res_type in resources and isinstance(resources[res_type], list):
+            for res_file in resources[res_type]:
+                file_path = f"resources/{res_file}"
+                if file_path not in file_list:
+                    file_list.append(file_path)
+
+    # Рекурсивно додаємо всі файли з директорії ресурсів
+    for root, dirs, files in os.walk(os.path.join(content_dir, 'resources')):
+        for file in files:
+            rel_path = os.path.relpath(os.path.join(root, file), content_dir)
+            if rel_path not in file_list:
+                file_list.append(rel_path)
+
+    # Додаємо всі файли в ресурс
+    for file_path in file_list:
+        file_elem = ET.SubElement(resource, 'file')
+        file_elem.set('href', file_path)
+
+    write_manifest(manifest, manifest_path, progress)
+
+
+def create_manifest_item(organization, identifier, identifierref, title, scorm_version):
+    """
+    Додає елемент item до організації маніфесту
+
+    Args:
+        organization (ET.Element): Елемент organization
+        identifier (str): Ідентифікатор елемента
+        identifierref (str): Ідентифікатор ресурсу, на який посилається елемент
+        title (str): Назва елемента
+        scorm_version (str): Версія SCORM ('1.2' або '2004')
+
+    Returns:
+        ET.Element: Створений елемент item
+    """
     item = ET.SubElement(organization, 'item')
-    item.set('identifier', 'item_1')
-    item.set('identifierref', 'resource_1')
+    item.set('identifier', identifier)
+    item.set('identifierref', identifierref)
 
     item_title = ET.SubElement(item, 'title')
     item_title.text = title
@@ -1406,76 +1771,185 @@ def create_scorm_manifest(content_dir, title, resources, index_file, course_id,
         # Додатковий функціонал для SCORM 2004
         pass
 
-    # Ресурси
-    resources_elem = ET.SubElement(manifest, 'resources')
+    return item
 
-    # Створення основного ресурсу
+
+def create_manifest_resource(resources_elem, identifier, href, scorm_version):
+    """
+    Додає SCO-ресурс до елемента resources маніфесту
+
+    Returns:
+        ET.Element: Створений елемент resource
+    """
     resource = ET.SubElement(resources_elem, 'resource')
-    resource.set('identifier', 'resource_1')
+    resource.set('identifier', identifier)
     resource.set('type', 'webcontent')
-    resource.set('href', index_file)
+    resource.set('href', href)
 
     if scorm_version == '1.2':
         resource.set('adlcp:scormtype', 'sco')
     else:
         resource.set('adlcp:scormType', 'sco')
 
-    # Додавання файлів
-    file_list = [index_file, 'scorm_api.js']
-
-    # Додаємо шляхи до ресурсів
-    print("Обробка ресурсів для включення в маніфест:")
-    for res_type in ['html', 'css', 'js', 'images', 'fonts', 'other']:
-        if res_type in resources and isinstance(resources[res_type], list):
-            print(f"  Тип {res_type}: {resources[res_type]}")
-            for res_file in resources[res_type]:
-                file_path = f"resources/{res_file}"
-                print(f"    Додавання ресурсу: {file_path}")
-                if file_path not in file_list:
-                    file_list.append(file_path)
-        else:
-            print(f"  Пропуск типу {res_type}: відсутній у словнику або не є списком")
+    return resource
 
-    # Рекурсивно додаємо всі файли з директорії ресурсів
-    for root, dirs, files in os.walk(os.path.join(content_dir, 'resources')):
-        for file in files:
-            rel_path = os.path.relpath(os.path.join(root, file), content_dir)
-            if rel_path not in file_list:
-                file_list.append(rel_path)
-                print(f"    Додано ресурс (через сканування директорії): {rel_path}")
-
-    # Додаємо всі файли в ресурс
-    print(f"Всього файлів для включення в ресурс: {len(file_list)}")
-    for file_path in file_list:
-        file_elem = ET.SubElement(resource, 'file')
-        file_elem.set('href', file_path)
-        print(f"  Додано файл: {file_path}")
 
+def write_manifest(manifest, manifest_path, progress=None):
+    """
+    Форматує та записує XML маніфесту
+    """
     # Форматування XML для кращої читабельності
     rough_string = ET.tostring(manifest, 'utf-8')
     reparsed = minidom.parseString(rough_string)
+    manifest_content = reparsed.toprettyxml(indent="  ")
     with open(manifest_path, 'w', encoding='utf-8') as f:
-        f.write(reparsed.toprettyxml(indent="  "))
+        f.write(manifest_content)
 
-    print("Маніфест SCORM успішно створено")
+    progress = progress or ProgressReporter()
+    progress.emit('package', "Маніфест SCORM успішно створено", bytes_written=len(manifest_content.encode('utf-8')))
+
+
+def build_single_sco(content_dir, resources_dir, html_path, title, course_id, scorm_version, progress=None):
+    """
+    Створює обгортку, SCORM API та маніфест для пакету з одним SCO на весь документ
+
+    Args:
+        content_dir (str): Директорія контенту
+        resources_dir (str): Директорія ресурсів
+        html_path (str): Шлях до HTML переглядача PDF
+        title (str): Назва курсу
+        course_id (str): Ідентифікатор курсу
+        scorm_version (str): Версія SCORM ('1.2' або '2004')
+        progress (ProgressReporter): Отримувач подій прогресу
+    """
+    progress = progress or ProgressReporter()
+    # Обробка HTML-файлу та пов'язаних ресурсів
+    progress.emit('package', "Обробка HTML-файлу та копіювання ресурсів...")
+    resource_data = process_html_file(html_path, content_dir, resources_dir, True, progress)
+
+    # Переконуємося, що ми отримали валідний словник ресурсів
+    if not resource_data:
+        progress.emit('package', "Отримано порожній список ресурсів, створюємо базовий словник ресурсів")
+        resource_data = {
+            'html': [os.path.basename(html_path)],
+            'css': [],
+            'js': [],
+            'images': [],
+            'fonts': [],
+            'other': []
+        }
+
+        # Додаємо всі знайдені зображення
+        if os.path.exists(os.path.join(resources_dir, 'images')):
+            for img_dir, _, files in os.walk(os.path.join(resources_dir, 'images')):
+                for file in files:
+                    if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
+                        img_rel_path = os.path.join('images', file)
+                        resource_data['images'].append(img_rel_path)
+
+    # Перевірка, чи є html ресурси
+    if not resource_data.get('html'):
+        progress.emit('package', "Попередження: Не знайдено HTML ресурсів, додаємо HTML-файл до списку вручну")
+        resource_data['html'] = [os.path.basename(html_path)]
+
+        # Перевіряємо наявність файлу і створюємо простий HTML, якщо його немає
+        if not os.path.exists(os.path.join(resources_dir, os.path.basename(html_path))):
+            progress.emit('package', "HTML-файл не знайдено, створюємо запасний HTML")
+            pdf_info = {'title': title, 'pages': 0}
+
+            # Підраховуємо кількість сторінок по зображеннях
+            if os.path.exists(os.path.join(resources_dir, 'images')):
+                page_count = 0
+                for file in os.listdir(os.path.join(resources_dir, 'images')):
+                    if file.lower().startswith('page') and file.lower().endswith('.png'):
+                        try:
+                            page_num = int(file.lower().replace('page', '').split('.')[0])
+                            page_count = max(page_count, page_num)
+                        except:
+                            pass
+                pdf_info['pages'] = page_count
+
+            create_fallback_html(os.path.join(resources_dir, os.path.basename(html_path)), resource_data, pdf_info,
+                                 progress)
+
+    # Створення обгортки для SCORM
+    progress.emit('package', "Створення SCORM-обгортки...")
+    index_path = create_scorm_wrapper(content_dir, title, os.path.basename(html_path), resource_data['html'])
+
+    # Створення JavaScript для SCORM API
+    progress.emit('package', "Створення JavaScript для SCORM API...")
+    create_scorm_api_js(content_dir, scorm_version)
+
+    # Створення маніфесту SCORM
+    progress.emit('package', "Створення маніфесту SCORM...")
+    create_scorm_manifest(content_dir, title, resource_data, index_path, course_id, scorm_version,
+                          progress=progress)
+
+
+def create_chapter_scos(content_dir, resources_dir, chapters, progress=None):
+    """
+    Створює окрему SCORM-обгортку для кожного розділу PDF
+
+    Args:
+        content_dir (str): Директорія контенту
+        resources_dir (str): Директорія ресурсів з переглядачами розділів
+        chapters (list): Розділи з convert_pdf_to_html (з ключами 'html' та 'images')
+        progress (ProgressReporter): Отримувач подій прогресу
+
+    Returns:
+        list: Список SCO {'title', 'href', 'files'} для create_scorm_manifest
+    """
+    scos = []
+    for chapter in chapters:
+        viewer_path = os.path.join(resources_dir, chapter['html'])
+        chapter_resources = process_html_file(viewer_path, content_dir, resources_dir, False, progress)
+
+        wrapper = create_scorm_wrapper(content_dir, chapter['title'], chapter['html'],
+                                       chapter_resources['html'], index_filename=f"sco_{chapter['number']}.html")
+
+        files = [wrapper, 'scorm_api.js', f"resources/{chapter['html']}"]
+        files.extend(f"resources/{image}" for image in chapter['images'])
+        scos.append({'title': chapter['title'], 'href': wrapper, 'files': files})
+
+    return scos
 
 
 def convert_pdf_to_scorm(pdf_path, output_path=None, title=None, scorm_version='2004', extract_images=True,
-                         debug=False):
+                         debug=False, split_chapters=False, work_dir=None, resume=False, progress_callback=None,
+                         zoom=DEFAULT_ZOOM, cancel_token=None, probe=None, minify=DEFAULT_MINIFY_MODE):
     """
     Конвертує PDF файл у SCORM-пакет
 
     Args:
         pdf_path (str): Шлях до PDF файлу
         output_path (str): Шлях для збереження SCORM-пакету (.zip)
-        title (str): Назва курсу (за замовчуванням - назва PDF-файлу)
+        title (str): Назва курсу (за замовчуванням - з метаданих PDF або назва PDF-файлу)
         scorm_version (str): Версія SCORM ('1.2' або '2004')
         extract_images (bool): Чи видобувати зображення з PDF
         debug (bool): Режим налагодження - зберігає тимчасові файли
+        split_chapters (bool): Створити окремий SCO для кожного розділу верхнього рівня зі змісту PDF
+        work_dir (str): Робоча директорія з журналом прогресу; зберігається у разі помилки,
+            щоб конвертацію можна було продовжити
+        resume (bool): Продовжити конвертацію з робочої директорії (за замовчуванням - <output>.work),
+            перевіривши вже створені сторінки замість повторного рендерингу
+        progress_callback (callable): Отримувач подій прогресу (див. progress.py);
+            за замовчуванням повідомлення друкуються в консоль
+        zoom (float): Масштаб рендерингу сторінок
+        cancel_token (CancellationToken): Токен скасування або ліміту часу; перевіряється між
+            сторінками та між файлами пакету
+        probe (dict): Готовий результат проби файлу (див. probe.probe_pdf); інакше проба
+            виконується для визначення назви курсу
+        minify (str): Режим мініфікації CSS, JavaScript та HTML пакету (див. minify.MINIFY_MODES)
 
     Returns:
         bool: True у разі успіху, False - у разі помилки
+
+    Raises:
+        ConversionCancelled: Якщо конвертацію скасовано - тимчасові файли та частковий пакет
+            видаляються (журнальована робоча директорія зберігається для --resume)
+        MemoryError: Якщо для рендерингу сторінок не вистачило пам'яті (пакет не створюється)
     """
+    progress = ProgressReporter(progress_callback)
     try:
         # Перевірка існування PDF-файлу
         if not os.path.exists(pdf_path):
@@ -1488,23 +1962,29 @@ def convert_pdf_to_scorm(pdf_path, output_path=None, title=None, scorm_version='
             output_name = os.path.splitext(os.path.basename(pdf_path))[0]
             output_path = os.path.join(output_dir, f"{output_name}_scorm.zip")
 
-        # Визначення назви курсу, якщо не вказано
+        # Визначення назви курсу з метаданих PDF або назви файлу, якщо не вказано
         if not title:
-            # Використовуємо назву PDF файлу
-            title = os.path.splitext(os.path.basename(pdf_path))[0]
-
-            # Спроба отримати заголовок з метаданих PDF
             try:
-                doc = fitz.open(pdf_path)
-                metadata = doc.metadata
-                if metadata and 'title' in metadata and metadata['title']:
-                    title = metadata['title']
-                doc.close()
-            except:
-                pass
+                title = default_title(pdf_path, probe or probe_pdf(pdf_path, zoom))
+            except (ValueError, OSError):
+                title = default_title(pdf_path)
 
-        # Створення тимчасової директорії для роботи
-        temp_dir = tempfile.mkdtemp()
+        # Створення робочої директорії: журнальованої для відновлення або тимчасової
+        if resume and not work_dir:
+            work_dir = output_path + '.work'
+
+        journal = None
+        if work_dir:
+            try:
+                journal = ConversionJournal(work_dir, pdf_path, {'split_chapters': split_chapters, 'zoom': zoom},
+                                            resume)
+            except WorkDirError as e:
+                # Чужу директорію не очищуємо і не пропонуємо --resume - воно теж не допоможе
+                print(f"Помилка: {e}. Вкажіть нову або порожню директорію в --work-dir")
+                return False
+            temp_dir = work_dir
+        else:
+            temp_dir = tempfile.mkdtemp()
         content_dir = os.path.join(temp_dir, 'content')
         resources_dir = os.path.join(content_dir, 'resources')
 
@@ -1512,114 +1992,71 @@ def convert_pdf_to_scorm(pdf_path, output_path=None, title=None, scorm_version='
         os.makedirs(content_dir, exist_ok=True)
         os.makedirs(resources_dir, exist_ok=True)
 
-        # Генерація ідентифікатора курсу
-        course_id = str(uuid4())
+        # Ідентифікатор курсу виводиться з вмісту, щоб пакет був відтворюваним
+        course_id = content_course_id(pdf_path, title=title, scorm_version=scorm_version,
+                                      split_chapters=split_chapters, zoom=zoom, minify=minify)
 
         # Конвертація PDF в HTML
-        print(f"Конвертація PDF в HTML: {pdf_path}")
-        html_path, pdf_meta = convert_pdf_to_html(pdf_path, resources_dir, extract_images)
+        progress.emit('start', f"Конвертація PDF в HTML: {pdf_path}")
+        html_path, pdf_meta = convert_pdf_to_html(pdf_path, resources_dir, extract_images,
+                                                  split_chapters=split_chapters, journal=journal,
+                                                  progress=progress, zoom=zoom, cancel_token=cancel_token)
 
         if not html_path:
             print("Помилка при конвертації PDF в HTML")
             return False
 
-        # Обробка HTML-файлу та пов'язаних ресурсів
-        print("Обробка HTML-файлу та копіювання ресурсів...")
-        resource_data = process_html_file(html_path, content_dir, resources_dir, True)
-
-        # Переконуємося, що ми отримали валідний словник ресурсів
-        if not resource_data:
-            print("Отримано порожній список ресурсів, створюємо базовий словник ресурсів")
-            resource_data = {
-                'html': [os.path.basename(html_path)],
-                'css': [],
-                'js': [],
-                'images': [],
-                'fonts': [],
-                'other': []
-            }
-
-            # Додаємо всі знайдені зображення
-            if os.path.exists(os.path.join(resources_dir, 'images')):
-                for img_dir, _, files in os.walk(os.path.join(resources_dir, 'images')):
-                    for file in files:
-                        if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                            img_rel_path = os.path.join('images', file)
-                            resource_data['images'].append(img_rel_path)
-                            print(f"  Додано зображення до ресурсів вручну: {img_rel_path}")
-
-        # Перевірка структури даних resources
-        print("Отримані ресурси:")
-        for key, value in resource_data.items():
-            print(f"{key}: {value}")
-
-        # Перевірка, чи є html ресурси
-        if not resource_data.get('html'):
-            print("Попередження: Не знайдено HTML ресурсів, додаємо HTML-файл до списку вручну")
-            resource_data['html'] = [os.path.basename(html_path)]
-
-            # Перевіряємо наявність файлу і створюємо простий HTML, якщо його немає
-            if not os.path.exists(os.path.join(resources_dir, os.path.basename(html_path))):
-                print("HTML-файл не знайдено, створюємо запасний HTML")
-                pdf_info = {'title': title, 'pages': 0}
-
-                # Підраховуємо кількість сторінок по зображеннях
-                if os.path.exists(os.path.join(resources_dir, 'images')):
-                    page_count = 0
-                    for file in os.listdir(os.path.join(resources_dir, 'images')):
-                        if file.lower().startswith('page') and file.lower().endswith('.png'):
-                            try:
-                                page_num = int(file.lower().replace('page', '').split('.')[0])
-                                page_count = max(page_count, page_num)
-                            except:
-                                pass
-                    pdf_info['pages'] = page_count
-
-                create_fallback_html(os.path.join(resources_dir, os.path.basename(html_path)), resource_data, pdf_info)
-
-        # Створення обгортки для SCORM
-        print("Створення SCORM-обгортки...")
-        index_path = create_scorm_wrapper(content_dir, title, os.path.basename(html_path), resource_data['html'])
-
-        # Створення JavaScript для SCORM API
-        print("Створення JavaScript для SCORM API...")
-        create_scorm_api_js(content_dir, scorm_version)
+        check_cancelled(cancel_token)
+        if pdf_meta.get('chapters'):
+            # Багато-SCO пакет: окрема обгортка та переглядач для кожного розділу
+            progress.emit('package', f"Створення {len(pdf_meta['chapters'])} SCO за розділами PDF...")
+            scos = create_chapter_scos(content_dir, resources_dir, pdf_meta['chapters'], progress)
+            create_scorm_api_js(content_dir, scorm_version)
+            create_scorm_manifest(content_dir, title, None, scos[0]['href'], course_id, scorm_version, scos=scos,
+                                  progress=progress)
+        else:
+            progress.emit('package', "Створення SCORM-структури...")
+            build_single_sco(content_dir, resources_dir, html_path, title, course_id, scorm_version, progress)
 
-        # Створення маніфесту SCORM
-        print("Створення маніфесту SCORM...")
-        create_scorm_manifest(content_dir, title, resource_data, index_path, course_id, scorm_version)
+        # Мініфікація CSS, JavaScript та HTML пакету
+        minify_package(content_dir, minify, cancel_token, progress)
 
         # Створення ZIP-архіву
-        print("Створення ZIP-архіву...")
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(content_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    zipf.write(
-                        file_path,
-                        os.path.relpath(file_path, content_dir)
-                    )
+        progress.emit('zip', "Створення ZIP-архіву...")
+        write_scorm_zip(content_dir, output_path, cancel_token)
 
         # Очищення тимчасових файлів (якщо не режим налагодження)
         if not debug:
             shutil.rmtree(temp_dir)
-            print("Тимчасові файли видалено")
+            progress.emit('zip', "Тимчасові файли видалено")
         else:
-            print(f"Режим налагодження: тимчасові файли збережено в {temp_dir}")
+            progress.emit('zip', f"Режим налагодження: тимчасові файли збережено в {temp_dir}")
 
-        print(f"SCORM-пакет успішно створено: {output_path}")
+        progress.emit('done', f"SCORM-пакет успішно створено: {output_path}",
+                      output_path=output_path, package_bytes=os.path.getsize(output_path))
         return True
 
+    except ConversionCancelled as e:
+        print(e)
+        discard_partial(output_path, None if work_dir else locals().get('temp_dir'))
+        raise
     except Exception as e:
         print(f"Помилка при конвертації PDF в SCORM: {e}")
         import traceback
         traceback.print_exc()
-        # Спроба очистити тимчасові файли у випадку помилки
-        try:
-            if 'temp_dir' in locals() and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-        except:
-            pass
+        # Журнальовану робочу директорію зберігаємо для відновлення
+        if work_dir:
+            print(f"Робочу директорію збережено: {work_dir}. Для продовження запустіть конвертацію з --resume")
+        else:
+            # Спроба очистити тимчасові файли у випадку помилки
+            try:
+                if 'temp_dir' in locals() and os.path.exists(temp_dir):
+                    shutil.rmtree(temp_dir)
+            except:
+                pass
+        if isinstance(e, MemoryError):
+            # Нестача пам'яті - виклик може повторити конвертацію зі зниженою роздільністю
+            raise
         return False
 
 
@@ -1637,6 +2074,14 @@ def main():
                         help='Не видобувати зображення з PDF')
     parser.add_argument('--debug', '-d', action='store_true',
                         help='Режим налагодження - зберігає тимчасові файли')
+    parser.add_argument('--split-chapters', '-s', action='store_true',
+                        help='Окремий SCO для кожного розділу зі змісту PDF')
+    parser.add_argument('--work-dir', '-w',
+                        help='Робоча директорія з журналом прогресу (зберігається у разі збою)')
+    parser.add_argument('--resume', '-r', action='store_true',
+                        help='Продовжити перервану конвертацію з робочої директорії')
+    parser.add_argument('--zoom', '-z', type=float, default=DEFAULT_ZOOM,
+                        help=f'Масштаб рендерингу сторінок (за замовчуванням - {DEFAULT_ZOOM})')
 
     args = parser.parse_args()
 
@@ -1692,14 +2137,11 @@ def main():
     # Запитуємо назву курсу, якщо не вказано
     if not args.title:
         try:
-            doc = fitz.open(args.input_file)
-            metadata = doc.metadata
-            default_title = metadata.get('title', os.path.splitext(os.path.basename(args.input_file))[0])
-            doc.close()
-        except:
-            default_title = os.path.splitext(os.path.basename(args.input_file))[0]
+            suggested_title = default_title(args.input_file, probe_pdf(args.input_file, args.zoom))
+        except (ValueError, OSError):
+            suggested_title = default_title(args.input_file)
 
-        args.title = input(f"Назва курсу [{default_title}]: ").strip() or default_title
+        args.title = input(f"Назва курсу [{suggested_title}]: ").strip() or suggested_title
 
     print(f"\nКонвертація PDF-файлу {args.input_file} в SCORM-пакет...")
     result = convert_pdf_to_scorm(
@@ -1708,7 +2150,11 @@ def main():
         args.title,
         args.scorm_version,
         not args.no_images,
-        args.debug
+        args.debug,
+        args.split_chapters,
+        args.work_dir,
+        args.resume,
+        zoom=args.zoom
     )
 
     if result:
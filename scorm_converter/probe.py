@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Швидка оцінка вхідних файлів перед конвертацією
+
+Проба читає лише те, що потрібно для назви курсу та оцінки обсягу роботи: метадані та
+розміри сторінок PDF, <head> HTML (потоково, до кінця заголовка), docProps/core.xml у
+DOCX - без рендерингу та повного розбору документа. Розміри зображень так само
+читаються із заголовків файлів, без розкодування пікселів. Одна проба на вхідний файл
+передається далі (CLI, застосунок, планувальник, конвертер), щоб файл не аналізувався
+кілька разів.
+"""
+
+import codecs
+import os
+import struct
+import xml.etree.ElementTree as ET
+import zipfile
+from html.parser import HTMLParser
+
+# Масштаб рендерингу сторінок PDF (див. pdf_converter.render_pdf_pages)
+DEFAULT_ZOOM = 2.5
+
+# Розмір частини при потоковому читанні HTML
+HTML_CHUNK_SIZE = 64 * 1024
+
+# Скільки байтів HTML переглядати в пошуках заголовка, якщо <head> не закривається
+HTML_HEAD_SCAN_LIMIT = 1024 * 1024
+
+# Приблизна швидкість конвертації для оцінки тривалості (один процес)
+PDF_PIXELS_PER_SECOND = 20 * 1000 ** 2
+HTML_BYTES_PER_SECOND = 1024 ** 2
+DOCX_BYTES_PER_SECOND = 50 * 1024 ** 2
+BASE_WORK_SECONDS = 0.5
+
+# Маркери JPEG, що починають кадр (SOF) і містять його розмір
+JPEG_SOF_MARKERS = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+
+# Теги, допустимі в <head>; будь-який інший тег починає тіло документа
+HEAD_TAGS = frozenset(('html', 'head', 'title', 'meta', 'link', 'style', 'script', 'base', 'noscript', 'template'))
+
+# Простори імен docProps/core.xml
+CORE_NAMESPACES = {
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'cp': 'http://schemas.openxmlformats.org/package/2006/metadata/core-properties'
+}
+
+
+def estimate_work(probe):
+    """
+    Оцінює тривалість конвертації за результатом проби
+
+    Оцінка груба і потрібна для порядку величини (черга, попередження про великі файли).
+
+    Args:
+        probe (dict): Результат проби без поля 'work'
+
+    Returns:
+        float: Тривалість у секундах
+    """
+    if probe['type'] == 'pdf':
+        seconds = probe['pixel_area'] / PDF_PIXELS_PER_SECOND
+    elif probe['type'] == 'html':
+        seconds = probe['size'] / HTML_BYTES_PER_SECOND
+    else:
+        seconds = probe['size'] / DOCX_BYTES_PER_SECOND
+    return round(BASE_WORK_SECONDS + seconds, 2)
+
+
+def clean_title(title):
+    """Повертає назву без зайвих пробілів або None, якщо вона порожня"""
+    title = ' '.join((title or '').split())
+    return title or None
+
+
+def probe_pdf(path, zoom=DEFAULT_ZOOM):
+    """
+    Оцінює PDF-файл: кількість сторінок, сумарну та найбільшу площу зображень сторінок після рендерингу
+
+    Args:
+        path (str): Шлях до PDF-файлу
+        zoom (float): Масштаб рендерингу сторінок
+
+    Returns:
+        dict: {'type', 'size', 'title', 'author', 'pages', 'pixel_area', 'max_page_pixels',
+            'encrypted', 'work'}
+
+    Raises:
+        ValueError: Якщо файл не вдається відкрити як PDF
+    """
+    import fitz
+
+    try:
+        doc = fitz.open(path, filetype='pdf')
+    except Exception as e:
+        raise ValueError(f"Файл не є коректним PDF: {e}")
+
+    try:
+        pixel_area = 0
+        max_page_pixels = 0
+        for page_num in range(doc.page_count):
+            # Розмір сторінки без завантаження її вмісту
+            rect = doc.page_cropbox(page_num)
+            page_pixels = int(rect.width * zoom) * int(rect.height * zoom)
+            pixel_area += page_pixels
+            max_page_pixels = max(max_page_pixels, page_pixels)
+
+        metadata = doc.metadata or {}
+        probe = {
+            'type': 'pdf',
+            'size': os.path.getsize(path),
+            'title': clean_title(metadata.get('title')),
+            'author': clean_title(metadata.get('author')),
+            'pages': doc.page_count,
+            'pixel_area': pixel_area,
+            'max_page_pixels': max_page_pixels,
+            'encrypted': bool(doc.needs_pass)
+        }
+        probe['work'] = estimate_work(probe)
+        return probe
+    finally:
+        doc.close()
+
+
+class _HeadScanner(HTMLParser):
+    """Читає <title> і кодування з <head>, позначаючи, коли заголовок документа закінчився"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.charset = None
+        self.done = False
+        self._title_parts = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title' and self.title is None:
+            self._title_parts = []
+        elif tag == 'meta':
+            attrs = {name: value or '' for name, value in attrs}
+            if 'charset' in attrs:
+                self.charset = attrs['charset'].strip() or self.charset
+            elif attrs.get('http-equiv', '').lower() == 'content-type' and 'charset=' in attrs.get('content', ''):
+                self.charset = attrs['content'].split('charset=', 1)[1].strip() or self.charset
+        elif tag not in HEAD_TAGS:
+            # <body> або вміст, що неявно відкриває тіло документа
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self._title_parts is not None:
+            self.title = clean_title(''.join(self._title_parts))
+            self._title_parts = None
+        elif tag == 'head':
+            self.done = True
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+
+
+def probe_html(path, scan_limit=HTML_HEAD_SCAN_LIMIT):
+    """
+    Оцінює HTML-файл, потоково читаючи лише <head>
+
+    Читання зупиняється на </head> або на першому тезі тіла документа, тож розмір
+    документа не впливає на тривалість проби.
+
+    Args:
+        path (str): Шлях до HTML-файлу
+        scan_limit (int): Максимальна кількість байтів для перегляду
+
+    Returns:
+        dict: {'type', 'size', 'title', 'charset', 'work'}
+    """
+    scanner = _HeadScanner()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    scanned = 0
+    with open(path, 'rb') as f:
+        while not scanner.done and scanned < scan_limit:
+            chunk = f.read(HTML_CHUNK_SIZE)
+            if not chunk:
+                break
+            scanned += len(chunk)
+            scanner.feed(decoder.decode(chunk))
+
+    probe = {
+        'type': 'html',
+        'size': os.path.getsize(path),
+        'title': scanner.title,
+        'charset': scanner.charset
+    }
+    probe['work'] = estimate_work(probe)
+    return probe
+
+
+def probe_docx(path):
+    """
+    Оцінює DOCX-файл, читаючи лише docProps/core.xml
+
+    Returns:
+        dict: {'type', 'size', 'title', 'author', 'work'}
+
+    Raises:
+        ValueError: Якщо файл не є ZIP-архівом
+    """
+    title = author = None
+    try:
+        with zipfile.ZipFile(path) as archive:
+            try:
+                core = ET.fromstring(archive.read('docProps/core.xml'))
+            except (KeyError, ET.ParseError):
+                # Властивості документа необов'язкові
+                core = None
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Файл не є коректним DOCX: {e}")
+    if core is not None:
+        title = clean_title(core.findtext('dc:title', namespaces=CORE_NAMESPACES))
+        author = clean_title(core.findtext('dc:creator', namespaces=CORE_NAMESPACES))
+
+    probe = {'type': 'docx', 'size': os.path.getsize(path), 'title': title, 'author': author}
+    probe['work'] = estimate_work(probe)
+    return probe
+
+
+def _jpeg_orientation(exif):
+    """Повертає орієнтацію з даних TIFF сегмента EXIF JPEG або None"""
+    if exif[:2] not in (b'II', b'MM'):
+        return None
+    order = '<' if exif[:2] == b'II' else '>'
+    try:
+        offset = struct.unpack(order + 'I', exif[4:8])[0]
+        count = struct.unpack(order + 'H', exif[offset:offset + 2])[0]
+        for number in range(count):
+            entry = offset + 2 + number * 12
+            tag, _, _, value = struct.unpack(order + 'HHIH', exif[entry:entry + 10])
+            if tag == 0x0112:
+                return value
+    except struct.error:
+        return None
+    return None
+
+
+def _jpeg_size(f):
+    orientation = None
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        while marker[:1] == b'\xff' and marker[1:] == b'\xff':
+            # Байти заповнення між сегментами
+            marker = marker[1:] + f.read(1)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if length < 2:
+            return None
+        if code in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>xHH', f.read(5))
+            # Браузери повертають зображення за орієнтацією EXIF
+            return (height, width) if orientation in (5, 6, 7, 8) else (width, height)
+        if code == 0xE1 and orientation is None:
+            segment = f.read(length - 2)
+            if segment[:6] == b'Exif\0\0':
+                orientation = _jpeg_orientation(segment[6:])
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_size(f):
+    """
+    Визначає розмір зображення за заголовком файлу, не розкодовуючи його
+
+    Підтримуються PNG, GIF, JPEG (з урахуванням орієнтації EXIF), WebP та BMP.
+
+    Args:
+        f (file): Файл, відкритий у двійковому режимі, з можливістю позиціювання
+
+    Returns:
+        tuple: (ширина, висота) в пікселях або None, якщо формат не розпізнано
+    """
+    header = f.read(30)
+    try:
+        if header[:8] == b'\x89PNG\r\n\x1a\n' and header[12:16] == b'IHDR':
+            return struct.unpack('>II', header[16:24])
+        if header[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', header[6:10])
+        if header[:2] == b'\xff\xd8':
+            return _jpeg_size(f)
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            chunk = header[12:16]
+            if chunk == b'VP8 ' and header[23:26] == b'\x9d\x01\x2a':
+                width, height = struct.unpack('<HH', header[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b'VP8L' and header[20:21] == b'\x2f':
+                bits = struct.unpack('<I', header[21:25])[0]
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b'VP8X':
+                width = int.from_bytes(header[24:27], 'little') + 1
+                height = int.from_bytes(header[27:30], 'little') + 1
+                return width, height
+            return None
+        if header[:2] == b'BM':
+            width, height = struct.unpack('<ii', header[18:26])
+            return width, abs(height)
+    except struct.error:
+        return None
+    return None
+
+
+def probe_image_size(path):
+    """
+    Визначає розмір зображення за заголовком файлу (див. read_image_size)
+
+    Returns:
+        tuple: (ширина, висота) або None, якщо формат не розпізнано чи файл недоступний
+    """
+    try:
+        with open(path, 'rb') as f:
+            return read_image_size(f)
+    except OSError:
+        return None
+
+
+def default_title(path, probe=None):
+    """
+    Визначає назву курсу за замовчуванням
+
+    Args:
+        path (str): Шлях до вхідного файлу
+        probe (dict): Результат проби файлу
+
+    Returns:
+        str: Назва з метаданих документа або ім'я файлу без розширення
+    """
+    return (probe or {}).get('title') or os.path.splitext(os.path.basename(path))[0]
+
+
+def probe_file(path, kind):
+    """
+    Оцінює вхідний файл відповідно до його типу
+
+    Args:
+        path (str): Шлях до файлу
+        kind (str): Тип файлу ('pdf', 'html' або 'docx')
+
+    Returns:
+        dict: Результат проби (див. probe_pdf, probe_html, probe_docx)
+    """
+    probes = {'pdf': probe_pdf, 'html': probe_html, 'docx': probe_docx}
+    if kind not in probes:
+        raise ValueError(f"Непідтримуваний тип файлу: {kind}")
+    return probes[kind](path)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Структуровані події прогресу конвертації
+
+Конвертери повідомляють про прогрес через callback, який отримує словник події:
+
+    {
+        'stage': 'render',          # етап конвертації (див. STAGES)
+        'message': 'Обробка сторінки 3/12',
+        'current': 3,               # номер кроку в межах етапу (або None)
+        'total': 12,                # кількість кроків етапу (або None)
+        'bytes_written': 524288,    # скільки байтів записано з початку конвертації
+        'elapsed': 1.25             # секунд від початку конвертації
+    }
+
+Завершальна подія 'done' містить розмір готового пакету в полі 'package_bytes' - до
+'bytes_written' він не додається, бо архів складається з уже записаних файлів.
+
+Події можуть містити поле 'report' - показники для звіту конвертації (наприклад, кількість
+запитів до ресурсів до та після вбудовування); ConversionJobs накопичує їх у полі 'report'
+стану завдання.
+
+Друк у консоль - лише один із підписників (print_progress), той самий callback
+може оновлювати індикатор прогресу в інтерфейсі чи збирати метрики.
+"""
+
+import threading
+import time
+
+# Етапи конвертації у порядку виконання та їх частка у загальному прогресі
+STAGES = [
+    ('start', 0.0),
+    ('parse', 0.05),
+    ('render', 0.1),
+    ('resources', 0.1),
+    ('package', 0.8),
+    ('zip', 0.9),
+    ('done', 1.0),
+]
+
+
+def print_progress(event):
+    """Підписник за замовчуванням - друкує повідомлення події в консоль"""
+    if event.get('message'):
+        print(event['message'])
+
+
+def estimate_fraction(event):
+    """
+    Оцінює загальний прогрес конвертації (0.0-1.0) за подією
+
+    Args:
+        event (dict): Подія прогресу
+
+    Returns:
+        float: Частка виконаної роботи
+    """
+    bounds = dict(STAGES)
+    if event.get('stage') not in bounds:
+        return 0.0
+
+    # Етап триває до першої більшої позначки (render та resources ділять один проміжок)
+    start = bounds[event['stage']]
+    end = next((bound for _, bound in STAGES if bound > start), 1.0)
+
+    if event.get('current') and event.get('total'):
+        return start + (end - start) * min(1.0, event['current'] / event['total'])
+    return start
+
+
+class ProgressReporter:
+    """
+    Формує події прогресу для однієї конвертації та передає їх у callback
+
+    Безпечний для виклику з кількох потоків (наприклад, з потоків запису сторінок).
+    Подія формується під блокуванням, а callback викликається вже поза ним, тому
+    callback може викликатися одночасно з різних потоків.
+
+    Args:
+        callback (callable): Отримувач подій; за замовчуванням - print_progress
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback or print_progress
+        self.started = time.monotonic()
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+
+    def emit(self, stage, message='', current=None, total=None, bytes_written=0, **extra):
+        """
+        Надсилає подію прогресу
+
+        Args:
+            stage (str): Етап конвертації
+            message (str): Повідомлення для людини
+            current (int): Номер кроку в межах етапу
+            total (int): Кількість кроків етапу
+            bytes_written (int): Кількість байтів, записаних з попередньої події
+            **extra: Додаткові поля події
+        """
+        with self._lock:
+            self.bytes_written += bytes_written
+            event = {
+                'stage': stage,
+                'message': message,
+                'current': current,
+                'total': total,
+                'bytes_written': self.bytes_written,
+                'elapsed': round(time.monotonic() - self.started, 3)
+            }
+            event.update(extra)
+
+        try:
+            self.callback(event)
+        except Exception as e:
+            # Помилка підписника не повинна переривати конвертацію
+            print(f"Помилка у обробнику прогресу: {e}")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Планування конвертацій з урахуванням пам'яті
+
+Замість фіксованої кількості потоків і завдань робота допускається в межах бюджету
+пам'яті: кожна сторінка PDF перед рендерингом резервує оцінений розмір свого pixmap,
+кожне завдання - оцінений піковий обсяг пам'яті. На документі з дрібними сторінками
+одночасно обробляється багато сторінок, на плакатах великого формату - по одній, і
+жодна комбінація не виходить за бюджет.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from probe import DEFAULT_ZOOM, probe_file
+
+# Кількість каналів pixmap без альфа-каналу (RGB)
+DEFAULT_CHANNELS = 3
+
+# Під час кодування в пам'яті одночасно pixmap, рядки PNG та стиснутий результат
+ENCODE_OVERHEAD = 3
+
+# Базова пам'ять завдання: документ MuPDF, розібраний HTML, буфери пакування
+JOB_BASE_BYTES = 256 * 1024 ** 2
+
+# Розбір HTML/DOCX займає в пам'яті в кілька разів більше за розмір файлу
+DOCUMENT_OVERHEAD = 10
+
+
+def estimate_pixmap_bytes(rect, zoom=DEFAULT_ZOOM, channels=DEFAULT_CHANNELS):
+    """
+    Оцінює розмір pixmap сторінки
+
+    Args:
+        rect (fitz.Rect): Розмір сторінки (page.rect або doc.page_cropbox)
+        zoom (float): Масштаб рендерингу
+        channels (int): Кількість каналів кольору
+
+    Returns:
+        int: Розмір у байтах
+    """
+    return int(rect.width * zoom) * int(rect.height * zoom) * channels
+
+
+def estimate_page_bytes(rect, zoom=DEFAULT_ZOOM, channels=DEFAULT_CHANNELS):
+    """Оцінює пікову пам'ять рендерингу та кодування однієї сторінки"""
+    return estimate_pixmap_bytes(rect, zoom, channels) * ENCODE_OVERHEAD
+
+
+def estimate_job_bytes(kind, path, zoom=DEFAULT_ZOOM, max_inflight=4, probe=None):
+    """
+    Оцінює пікову пам'ять завдання конвертації
+
+    Args:
+        kind (str): Тип вхідного файлу ('pdf', 'html' або 'docx')
+        path (str): Шлях до вхідного файлу
+        zoom (float): Масштаб рендерингу сторінок PDF
+        max_inflight (int): Кількість сторінок, що одночасно можуть бути в пам'яті
+        probe (dict): Готовий результат проби файлу (інакше проба виконується)
+
+    Returns:
+        int: Розмір у байтах
+    """
+    probe = probe or probe_file(path, kind)
+    if kind == 'pdf':
+        page_bytes = probe['max_page_pixels'] * (zoom / DEFAULT_ZOOM) ** 2 * DEFAULT_CHANNELS * ENCODE_OVERHEAD
+        return JOB_BASE_BYTES + int(page_bytes * min(max(1, probe['pages']), max_inflight))
+    return JOB_BASE_BYTES + probe['size'] * DOCUMENT_OVERHEAD
+
+
+def default_budget_bytes(fraction=0.5):
+    """
+    Визначає бюджет пам'яті за замовчуванням
+
+    Бюджет можна задати змінною оточення SCORM_MEMORY_BUDGET (у байтах), інакше це
+    частка фізичної пам'яті машини.
+
+    Args:
+        fraction (float): Частка фізичної пам'яті
+
+    Returns:
+        int: Бюджет у байтах
+    """
+    configured = os.environ.get('SCORM_MEMORY_BUDGET')
+    if configured:
+        return int(configured)
+    try:
+        physical = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        physical = 4 * 1024 ** 3
+    return int(physical * fraction)
+
+
+class MemoryBudget:
+    """
+    Бюджет пам'яті, у межах якого допускаються рендеринг сторінок та завдання
+
+    Запит, більший за весь бюджет, допускається, коли бюджет повністю вільний, -
+    інакше такий документ не оброблявся б ніколи.
+
+    Args:
+        limit_bytes (int): Розмір бюджету в байтах (за замовчуванням - default_budget_bytes())
+    """
+
+    def __init__(self, limit_bytes=None):
+        self.limit_bytes = limit_bytes or default_budget_bytes()
+        self._condition = threading.Condition()
+        self._used = 0
+        self._peak = 0
+        self._active = 0
+        self._waiting = 0
+
+    def acquire(self, nbytes, timeout=None):
+        """
+        Резервує пам'ять, очікуючи, поки вона звільниться
+
+        Args:
+            nbytes (int): Обсяг у байтах
+            timeout (float): Максимальний час очікування в секундах; None - без обмеження
+
+        Returns:
+            bool: True, якщо пам'ять зарезервовано
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self._used and self._used + nbytes > self.limit_bytes:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            self._used += nbytes
+            self._active += 1
+            self._peak = max(self._peak, self._used)
+            return True
+
+    def release(self, nbytes):
+        """Звільняє зарезервовану пам'ять"""
+        with self._condition:
+            self._used = max(0, self._used - nbytes)
+            self._active = max(0, self._active - 1)
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes):
+        """Резервує пам'ять на час виконання блоку with"""
+        self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+    def snapshot(self):
+        """
+        Повертає поточне використання бюджету
+
+        Returns:
+            dict: {'limit', 'used', 'available', 'peak', 'active', 'waiting'}
+        """
+        with self._condition:
+            return {
+                'limit': self.limit_bytes,
+                'used': self._used,
+                'available': max(0, self.limit_bytes - self._used),
+                'peak': self._peak,
+                'active': self._active,
+                'waiting': self._waiting
+            }
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_memory_budget():
+    """Повертає спільний для процесу бюджет пам'яті рендерингу сторінок"""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = MemoryBudget()
+        return _budget
+
+
+def set_memory_budget(limit_bytes):
+    """
+    Замінює спільний для процесу бюджет пам'яті рендерингу сторінок
+
+    Args:
+        limit_bytes (int): Розмір бюджету в байтах
+
+    Returns:
+        MemoryBudget: Новий бюджет
+    """
+    global _budget
+    with _budget_lock:
+        _budget = MemoryBudget(limit_bytes)
+        return _budget
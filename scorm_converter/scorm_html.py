@@ -9,7 +9,7 @@ import shutil
 import argparse
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from bs4 import BeautifulSoup
+from html_parsing import parse_html
 import re
 import base64
 
@@ -413,13 +413,14 @@ def create_combined_html(scorm_dir, content_info):
     return '\n'.join(html_parts)
 
 
-def process_html_content(html_path, scorm_dir):
+def process_html_content(html_path, scorm_dir, parser=None):
     """
     Обробляє HTML-вміст для об'єднаного документу
 
     Args:
         html_path (str): Шлях до HTML-файлу
         scorm_dir (str): Директорія з розпакованим SCORM-пакетом
+        parser (str): Парсер HTML (див. html_parsing.resolve_parser)
 
     Returns:
         str: Оброблений HTML-вміст
@@ -428,7 +429,7 @@ def process_html_content(html_path, scorm_dir):
         html_content = f.read()
 
     # Парсимо HTML
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = parse_html(html_content, parser)
 
     # Видаляємо скрипти, які можуть конфліктувати з основним документом
     for script in soup.find_all(['script']):
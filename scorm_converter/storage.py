@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Дискове сховище файлів завдань конвертації
+
+Кожне завдання отримує власну директорію для вхідного файлу та готового пакету.
+Старі директорії видаляються автоматично - за віком та за загальним розміром сховища,
+тож тимчасові файли не накопичуються на сервері.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+def directory_size(path):
+    """Повертає сумарний розмір файлів у директорії (рекурсивно)"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+def directory_mtime(path):
+    """Повертає час останньої зміни директорії або будь-якого файлу в ній"""
+    latest = os.path.getmtime(path)
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                latest = max(latest, os.path.getmtime(os.path.join(root, file)))
+            except OSError:
+                pass
+    return latest
+
+
+class ArtifactStore:
+    """
+    Директорії завдань з автоматичним очищенням
+
+    Args:
+        root (str): Коренева директорія сховища
+        max_age (int): Максимальний вік директорії завдання в секундах
+        max_bytes (int): Максимальний загальний розмір сховища в байтах
+        cleanup_interval (int): Мінімальний інтервал між очищеннями в секундах
+        min_age (int): Директорії, змінені за останні min_age секунд, не видаляються навіть
+            при перевищенні розміру - у них можуть працювати активні завдання
+        in_use (callable): Повертає шляхи файлів активних завдань (наприклад,
+            ConversionJobs.active_paths); директорії з ними не видаляються незалежно від віку
+    """
+
+    def __init__(self, root=None, max_age=60 * 60, max_bytes=2 * 1024 ** 3, cleanup_interval=60, min_age=5 * 60,
+                 in_use=None):
+        self.root = root or os.path.join(tempfile.gettempdir(), 'scorm_converter_jobs')
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.cleanup_interval = cleanup_interval
+        self.min_age = min_age
+        self.in_use = in_use
+        self._last_cleanup = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def create_job_dir(self):
+        """
+        Створює нову директорію завдання (попередньо прибравши застарілі)
+
+        Returns:
+            str: Шлях до директорії
+        """
+        self.cleanup()
+        return tempfile.mkdtemp(dir=self.root)
+
+    def cleanup(self, force=False):
+        """
+        Видаляє застарілі директорії завдань, а потім найстаріші - поки сховище більше за max_bytes
+
+        Args:
+            force (bool): Виконати очищення незалежно від cleanup_interval
+
+        Returns:
+            int: Кількість видалених директорій
+        """
+        with self._lock:
+            now = time.time()
+            if not force and now - self._last_cleanup < self.cleanup_interval:
+                return 0
+            self._last_cleanup = now
+
+            entries = []
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if os.path.isdir(path):
+                    try:
+                        entries.append((directory_mtime(path), directory_size(path), path))
+                    except OSError:
+                        # Директорію видалили паралельно
+                        continue
+
+            active = self._active_dirs()
+            removed = 0
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in sorted(entries):
+                if now - mtime <= self.max_age and (total <= self.max_bytes or now - mtime < self.min_age):
+                    break
+                if path in active:
+                    # Довга конвертація не змінює файлів директорії, доки не запише пакет
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+                removed += 1
+
+            if removed:
+                print(f"Видалено {removed} застарілих директорій завдань зі сховища {self.root}")
+            return removed
+
+    def _active_dirs(self):
+        """Директорії сховища, в яких лежать файли активних завдань"""
+        active = set()
+        for path in (self.in_use() if self.in_use else ()):
+            relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+            if relative != '.' and not relative.startswith(os.pardir):
+                active.add(os.path.join(self.root, relative.split(os.sep)[0]))
+        return active
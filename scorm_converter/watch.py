@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Відстеження папки з автоматичною конвертацією
+
+Папка періодично сканується; нові та змінені документи конвертуються в пулі процесів.
+Файл вважається дописаним, коли його розмір і час зміни не змінювались протягом
+settle секунд, - так не конвертуються файли, які ще копіюються. Стан (підпис кожного
+обробленого файлу) зберігається у JSON-файлі, тож після перезапуску конвертуються лише
+файли, що змінилися. Коли змін немає, інтервал сканування поступово збільшується, а пул
+процесів запускається лише з появою першого завдання.
+
+Використання:
+    python main.py --watch inbox/ --output-dir out --jobs 2
+"""
+
+import json
+import os
+import signal
+import threading
+import time
+
+from batch import BATCH_EXTENSIONS, batch_output_path, conversion_options
+from ingest import IngestionError, detect_file_kind
+from jobs import ConversionJobs
+from minify import DEFAULT_MINIFY_MODE
+from worker_pool import WorkerPool
+
+# Ім'я файлу стану за замовчуванням (у папці з пакетами)
+STATE_FILENAME = '.scorm_watch_state.json'
+
+
+def scan_folder(root):
+    """
+    Збирає підписи документів у папці (рекурсивно)
+
+    Args:
+        root (str): Папка для сканування
+
+    Returns:
+        dict: Шлях -> [розмір, час зміни в наносекундах]
+    """
+    signatures = {}
+    pending_dirs = [root]
+    while pending_dirs:
+        try:
+            entries = os.scandir(pending_dirs.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending_dirs.append(entry.path)
+                    elif entry.name.lower().endswith(BATCH_EXTENSIONS):
+                        stat = entry.stat()
+                        signatures[entry.path] = [stat.st_size, stat.st_mtime_ns]
+                except OSError:
+                    # Файл видалили під час сканування
+                    continue
+    return signatures
+
+
+class FolderWatcher:
+    """
+    Конвертує нові та змінені документи з папки
+
+    Args:
+        folder (str): Папка, що відстежується
+        output_dir (str): Директорія для пакетів (за замовчуванням - поруч із документами)
+        state_path (str): Файл стану (за замовчуванням - STATE_FILENAME у директорії пакетів)
+        jobs (int): Кількість паралельних конвертацій
+        interval (float): Початковий інтервал сканування в секундах
+        max_interval (float): Максимальний інтервал сканування, коли змін немає
+        settle (float): Скільки секунд файл має залишатися незмінним, щоб вважатися дописаним
+        scorm_version (str): Версія SCORM ('1.2' або '2004')
+        include_resources (bool): Чи включати пов'язані ресурси для HTML
+        zoom (float): Масштаб рендерингу сторінок PDF; None - стандартний
+        minify (str): Режим мініфікації пакетів (див. minify.MINIFY_MODES)
+        html_options (dict): Додаткові аргументи конвертації HTML (див. batch.conversion_options)
+    """
+
+    def __init__(self, folder, output_dir=None, state_path=None, jobs=1, interval=2.0, max_interval=30.0,
+                 settle=5.0, scorm_version='2004', include_resources=True, zoom=None, minify=DEFAULT_MINIFY_MODE,
+                 html_options=None):
+        self.folder = folder
+        self.output_dir = output_dir
+        self.state_path = state_path or os.path.join(output_dir or folder, STATE_FILENAME)
+        self.jobs = jobs
+        self.interval = interval
+        self.max_interval = max_interval
+        self.settle = settle
+        self.scorm_version = scorm_version
+        self.include_resources = include_resources
+        self.zoom = zoom
+        self.minify = minify
+        self.html_options = html_options
+
+        self.state = self._load_state()
+        # Файли, що змінилися, але ще не стабілізувалися: шлях -> (підпис, коли помічено)
+        self._settling = {}
+        # Активні завдання: ідентифікатор -> (шлях, запис стану)
+        self._pending = {}
+        self._pool = None
+        self._conversions = None
+        self._running = False
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Не вдалося прочитати файл стану {self.state_path}, починаємо з порожнього: {e}")
+            return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = self.state_path + '.part'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _ensure_pool(self):
+        # Пул запускається лише коли з'являється робота - порожня папка не тримає процеси
+        if self._conversions is None:
+            self._pool = WorkerPool(processes=self.jobs, quiet=True)
+            self._conversions = ConversionJobs(max_workers=self.jobs, max_pending=10 ** 6, pool=self._pool)
+        return self._conversions
+
+    def scan_once(self):
+        """
+        Виконує одне сканування: ставить у чергу дописані змінені файли та збирає результати
+
+        Returns:
+            bool: True, якщо в папці щось змінилося або є активні завдання
+        """
+        now = time.monotonic()
+        signatures = scan_folder(self.folder)
+        changed = self._collect_results()
+        active = changed or bool(self._pending)
+        in_progress = {path for path, _ in self._pending.values()}
+
+        # Видалені файли більше не відстежуються
+        for path in list(self.state):
+            if path not in signatures:
+                del self.state[path]
+                changed = True
+        for path in list(self._settling):
+            if path not in signatures:
+                del self._settling[path]
+
+        for path, signature in signatures.items():
+            known = self.state.get(path)
+            if (known and known['signature'] == signature) or path in in_progress:
+                continue
+            active = True
+
+            settling = self._settling.get(path)
+            if not settling or settling[0] != signature:
+                # Файл новий або ще змінюється - чекаємо, поки він стабілізується
+                self._settling[path] = (signature, now)
+                continue
+            if now - settling[1] < self.settle:
+                continue
+
+            del self._settling[path]
+            changed = self._submit(path, signature) or changed
+
+        # Стан записується лише при змінах - у спокійному стані сканування не пише на диск
+        if changed:
+            self._save_state()
+        return active or bool(self._settling)
+
+    def _submit(self, path, signature):
+        """Ставить файл у чергу; повертає True, якщо стан змінився одразу (файл не підтримується)"""
+        entry = {'signature': signature, 'kind': None, 'output': None, 'status': None,
+                 'error': None, 'converted_at': time.time()}
+        try:
+            entry['kind'] = detect_file_kind(path)
+            if entry['kind'] is None:
+                raise IngestionError("Формат файлу не підтримується")
+        except (IngestionError, OSError) as e:
+            entry['status'], entry['error'] = 'unsupported', str(e)
+            self.state[path] = entry
+            print(f"[unsupported] {path} - {e}")
+            return True
+
+        entry['output'] = batch_output_path(path, self.folder, self.output_dir)
+        os.makedirs(os.path.dirname(entry['output']) or '.', exist_ok=True)
+        options = conversion_options(entry['kind'], self.scorm_version, self.include_resources, self.zoom,
+                                     self.minify, self.html_options)
+
+        print(f"Конвертація {path}...")
+        job_id = self._ensure_pool().submit(entry['kind'], path, entry['output'], **options)
+        self._pending[job_id] = (path, entry)
+        return False
+
+    def _collect_results(self):
+        collected = False
+        for job_id in list(self._pending):
+            status = self._conversions.status(job_id)
+            if status['state'] in ('queued', 'running'):
+                continue
+            path, entry = self._pending.pop(job_id)
+            self._conversions.forget(job_id)
+            entry['status'], entry['error'] = status['state'], status['error']
+            entry['converted_at'] = time.time()
+            self.state[path] = entry
+            collected = True
+            error = f" - {entry['error']}" if entry['error'] else ''
+            print(f"[{entry['status']}] {path} -> {entry['output']}{error}")
+        return collected
+
+    def stop(self, *_):
+        """Зупиняє цикл відстеження після поточного сканування"""
+        self._running = False
+
+    def run(self):
+        """Відстежує папку, поки не буде викликано stop() або натиснуто Ctrl+C"""
+        self._running = True
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+        print(f"Відстеження папки {self.folder} (стан: {self.state_path}). Для зупинки натисніть Ctrl+C")
+
+        interval = self.interval
+        try:
+            while self._running:
+                if self.scan_once():
+                    interval = self.interval
+                else:
+                    # Без змін скануємо все рідше
+                    interval = min(self.max_interval, interval * 1.5)
+                time.sleep(min(interval, self.settle) if self._settling else interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self._conversions is not None:
+                for job_id in list(self._pending):
+                    self._conversions.cancel(job_id)
+                self._pool.close()
+            self._save_state()
+            print("Відстеження папки зупинено")
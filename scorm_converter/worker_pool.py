@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Пул довгоживучих процесів конвертації
+
+Процеси запускаються заздалегідь і імпортують конвертери (PyMuPDF, BeautifulSoup) один
+раз, тож завдання не платить за запуск інтерпретатора та імпорти. Завдання й події
+прогресу передаються через канал між процесами. Після заданої кількості завдань або при
+перевищенні порогу пам'яті (RSS) процес замінюється новим - так обмежується ріст
+пам'яті PyMuPDF.
+
+Процеси також ізолюють збої: пошкоджений PDF може аварійно завершити MuPDF або
+вичерпати пам'ять, але це зупиняє лише процес пулу, а не застосунок. Пам'ять і
+процесорний час процесу обмежуються через RLIMIT_AS/RLIMIT_CPU, тривалість завдання -
+таймаутом; процес, що не вклався в таймаут, примусово завершується.
+
+Скасування передається процесу через спільну подію multiprocessing.Event, на якій
+побудовано токен скасування конвертера в дочірньому процесі.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import traceback
+
+from cancellation import CancellationToken, ConversionCancelled, discard_partial
+
+try:
+    import resource
+except ImportError:
+    # Windows - ліміти ресурсів недоступні
+    resource = None
+
+# Типи файлів, для яких процес імпортує конвертери під час запуску
+WARM_KINDS = ('pdf', 'html', 'docx')
+
+# Час, за який процес має зупинитися після скасування, перш ніж його буде завершено примусово
+CANCEL_GRACE = 10
+
+# Інтервал перевірки токена скасування під час очікування результату
+CANCEL_POLL_INTERVAL = 0.25
+
+
+class WorkerError(RuntimeError):
+    """
+    Конвертація в процесі пулу завершилась помилкою
+
+    Args:
+        message (str): Опис помилки
+        reason (str): Причина: 'error' (виняток конвертера), 'crash' (аварійне завершення
+            процесу), 'timeout' (перевищено таймаут), 'cpu_limit' (перевищено ліміт
+            процесорного часу) або 'memory_limit' (конвертеру не вистачило пам'яті)
+    """
+
+    def __init__(self, message, reason='error'):
+        super().__init__(message)
+        self.reason = reason
+
+
+def current_rss():
+    """
+    Повертає поточний обсяг резидентної пам'яті процесу в байтах
+
+    Returns:
+        int: RSS або None, якщо платформа не надає /proc/self/statm
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _set_soft_limit(limit, value):
+    """Встановлює м'який ліміт ресурсу, не перевищуючи жорсткий"""
+    _, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(limit, (value, hard))
+
+
+def _worker_main(conn, cancel_event, max_jobs, max_rss_bytes, memory_limit=None, cpu_limit=None, quiet=False,
+                 processes=1):
+    """Цикл процесу пулу: отримує завдання з каналу та надсилає прогрес і результат"""
+    from jobs import get_converter
+    from scheduler import set_memory_budget
+
+    if quiet:
+        # Повідомлення конвертерів не потрібні - стан передається подіями прогресу
+        sys.stdout = open(os.devnull, 'w')
+
+    if resource is not None and memory_limit:
+        try:
+            _set_soft_limit(resource.RLIMIT_AS, memory_limit)
+        except (ValueError, OSError) as e:
+            print(f"Не вдалося обмежити пам'ять процесу пулу: {e}")
+    if memory_limit:
+        # Сторінки рендеряться в межах половини ліміту - решта для MuPDF, HTML та пакування
+        set_memory_budget(memory_limit // 2)
+
+    try:
+        from image_optimization import IMAGE_WORKERS, set_image_workers
+        # Процеси пулу кодують зображення одночасно - кожен використовує свою частку ядер
+        set_image_workers(min(IMAGE_WORKERS, (os.cpu_count() or 1) // max(1, processes)))
+    except ImportError:
+        pass
+
+    converters = {}
+    for kind in WARM_KINDS:
+        try:
+            converters[kind] = get_converter(kind)
+        except ImportError as e:
+            print(f"Конвертер {kind} недоступний у процесі пулу: {e}")
+
+    send_lock = threading.Lock()
+    jobs_done = 0
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            # Батьківський процес завершився
+            break
+        if message[0] == 'stop':
+            break
+
+        _, kind, input_path, output_path, options = message
+
+        if resource is not None and cpu_limit:
+            # RLIMIT_CPU рахує весь час процесу, тож ліміт відраховується від уже використаного
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            try:
+                _set_soft_limit(resource.RLIMIT_CPU, int(usage.ru_utime + usage.ru_stime) + cpu_limit)
+            except (ValueError, OSError) as e:
+                print(f"Не вдалося обмежити процесорний час процесу пулу: {e}")
+
+        def on_progress(event):
+            # Конвертер може надсилати події з кількох потоків
+            with send_lock:
+                conn.send(('progress', event))
+
+        error = None
+        reason = 'error'
+        cancelled = False
+        try:
+            convert = converters.get(kind) or get_converter(kind)
+            result = bool(convert(input_path, output_path, progress_callback=on_progress,
+                                  cancel_token=CancellationToken(event=cancel_event), **options))
+        except ConversionCancelled:
+            result, cancelled = False, True
+        except MemoryError as e:
+            result, error, reason = False, str(e) or "Конвертації не вистачило пам'яті", 'memory_limit'
+        except Exception as e:
+            traceback.print_exc()
+            result, error = False, str(e)
+
+        jobs_done += 1
+        rss = current_rss()
+        # Після нестачі пам'яті купа процесу фрагментована - процес замінюється новим
+        recycle = (jobs_done >= max_jobs or reason == 'memory_limit'
+                   or bool(max_rss_bytes and rss and rss > max_rss_bytes))
+        with send_lock:
+            conn.send(('result', result, error, reason, recycle, cancelled))
+        if recycle:
+            break
+
+    conn.close()
+
+
+def _crash_error(exitcode):
+    """Описує аварійне завершення процесу пулу за кодом завершення"""
+    if exitcode is not None and exitcode < 0:
+        try:
+            name = signal.Signals(-exitcode).name
+        except ValueError:
+            name = str(-exitcode)
+        if name == 'SIGXCPU':
+            return WorkerError("Конвертація перевищила ліміт процесорного часу", 'cpu_limit')
+        return WorkerError(f"Процес конвертації аварійно завершився (сигнал {name})", 'crash')
+    return WorkerError(f"Процес конвертації аварійно завершився (код {exitcode})", 'crash')
+
+
+class _Worker:
+    """Процес пулу, кінець каналу зв'язку з ним та подія скасування поточного завдання"""
+
+    def __init__(self, process, conn, cancel_event):
+        self.process = process
+        self.conn = conn
+        self.cancel_event = cancel_event
+
+
+class WorkerPool:
+    """
+    Пул заздалегідь запущених процесів конвертації
+
+    Args:
+        processes (int): Кількість процесів
+        max_jobs_per_worker (int): Кількість завдань, після якої процес замінюється
+        max_rss_bytes (int): Поріг резидентної пам'яті процесу, після якого він замінюється
+        memory_limit (int): Ліміт віртуальної пам'яті процесу (RLIMIT_AS) в байтах; None - без ліміту
+        cpu_limit (int): Ліміт процесорного часу на одне завдання (RLIMIT_CPU) в секундах
+        job_timeout (float): Максимальна тривалість одного завдання в секундах
+        quiet (bool): Не виводити повідомлення конвертерів у stdout (помилки в stderr залишаються)
+    """
+
+    def __init__(self, processes=2, max_jobs_per_worker=50, max_rss_bytes=1536 * 1024 ** 2,
+                 memory_limit=None, cpu_limit=None, job_timeout=None, quiet=False):
+        self.processes = processes
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_rss_bytes = max_rss_bytes
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self.job_timeout = job_timeout
+        self.quiet = quiet
+        # spawn не успадковує потоки батьківського процесу (Streamlit, пул завдань),
+        # а шлях до модулів передається дочірньому процесу разом з sys.path
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._closed = False
+        for _ in range(processes):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self):
+        parent_conn, child_conn = self._context.Pipe()
+        cancel_event = self._context.Event()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, cancel_event, self.max_jobs_per_worker, self.max_rss_bytes,
+                  self.memory_limit, self.cpu_limit, self.quiet, self.processes),
+            name='scorm-worker',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn, cancel_event)
+
+    def _replace(self, worker):
+        """Зупиняє процес і запускає замість нього новий (у фоні, щоб не затримувати результат)"""
+
+        def replace():
+            worker.conn.close()
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            if not self._closed:
+                self._idle.put(self._start_worker())
+
+        threading.Thread(target=replace, name='scorm-worker-replace', daemon=True).start()
+
+    def run(self, kind, input_path, output_path, progress_callback=None, cancel_token=None, **options):
+        """
+        Виконує конвертацію у вільному процесі пулу (блокує до завершення)
+
+        Args:
+            kind (str): Тип вхідного файлу ('pdf', 'html' або 'docx')
+            input_path (str): Шлях до вхідного файлу
+            output_path (str): Шлях до вихідного SCORM-пакету
+            progress_callback (callable): Функція, що отримує події прогресу
+            cancel_token (CancellationToken): Токен скасування; при спрацюванні процес отримує
+                сигнал скасування, а якщо не зупиниться за CANCEL_GRACE секунд - завершується
+            **options: Додаткові аргументи функції конвертації
+
+        Returns:
+            bool: Результат функції конвертації
+
+        Raises:
+            WorkerError: Якщо конвертер викинув виняток або процес аварійно завершився
+            ConversionCancelled: Якщо конвертацію скасовано
+        """
+        if self._closed:
+            raise WorkerError("Пул процесів конвертації зупинено")
+
+        worker = self._idle.get()
+        healthy = False
+        deadline = time.monotonic() + self.job_timeout if self.job_timeout else None
+        cancel_deadline = None
+        try:
+            worker.cancel_event.clear()
+            worker.conn.send(('job', kind, input_path, output_path, options))
+            while True:
+                if cancel_token is not None and cancel_deadline is None and cancel_token.cancelled:
+                    worker.cancel_event.set()
+                    cancel_deadline = time.monotonic() + CANCEL_GRACE
+
+                wait = [d - time.monotonic() for d in (deadline, cancel_deadline) if d is not None]
+                if cancel_token is not None and cancel_deadline is None:
+                    wait.append(CANCEL_POLL_INTERVAL)
+                if wait and not worker.conn.poll(max(0, min(wait))):
+                    now = time.monotonic()
+                    if cancel_deadline is not None and now >= cancel_deadline:
+                        worker.process.kill()
+                        worker.process.join()
+                        discard_partial(output_path)
+                        raise ConversionCancelled(cancel_token.reason)
+                    if deadline is not None and now >= deadline:
+                        worker.process.kill()
+                        worker.process.join()
+                        raise WorkerError(f"Конвертація перевищила ліміт часу ({self.job_timeout} с)", 'timeout')
+                    continue
+                message = worker.conn.recv()
+                if message[0] == 'progress':
+                    if progress_callback:
+                        try:
+                            progress_callback(message[1])
+                        except Exception:
+                            traceback.print_exc()
+                    continue
+
+                _, result, error, reason, recycle, cancelled = message
+                healthy = not recycle
+                break
+        except (EOFError, OSError):
+            worker.process.join(timeout=1)
+            raise _crash_error(worker.process.exitcode)
+        finally:
+            if healthy:
+                self._idle.put(worker)
+            else:
+                self._replace(worker)
+
+        if cancelled:
+            raise ConversionCancelled(cancel_token.reason if cancel_token is not None else 'cancelled')
+        if error:
+            raise WorkerError(error, reason)
+        return result
+
+    def close(self):
+        """Зупиняє вільні процеси пулу"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(('stop',))
+            except OSError:
+                pass
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()